@@ -0,0 +1,189 @@
+import re
+import json
+import time
+import uuid
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+API_PREFIX = '/pipeline/apis/v1beta1'
+DEX_PREFIX = '/dex'
+TOKEN_EXPIRES_IN = 3600
+
+
+class FakeDeployKFHandler(BaseHTTPRequestHandler):
+    """
+    Serves the Dex OIDC endpoints and the parts of the KFP v1beta1 API used to submit a task.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, data, status=200, headers=None):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+    def _handle(self, method: str):
+        self.server.count_request()
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        url = urlparse(self.path)
+        body = self._read_body() if method == 'POST' else b''
+        route = getattr(self, f"_{method.lower()}_{self.server.route(url.path)}", None)
+        if route is None:
+            self._send_json({'error': f'{method} {url.path} not found'}, status=404)
+            return
+        route(url, body)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def _get_discovery(self, url, body):
+        etag = self.server.discovery_etag
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        issuer = f"{self.server.base_url}{DEX_PREFIX}"
+        self._send_json({
+            'issuer': issuer,
+            'authorization_endpoint': f"{issuer}/auth",
+            'token_endpoint': f"{issuer}/token",
+        }, headers={'ETag': etag})
+
+    def _post_token(self, url, body):
+        form = parse_qs(body.decode('utf-8'))
+        if form.get('grant_type') != ['refresh_token'] or not form.get('refresh_token'):
+            self._send_json({'error': 'unsupported_grant_type'}, status=400)
+            return
+        token = fake_token()
+        del token['expires_at']
+        self._send_json(token)
+
+    def _get_healthz(self, url, body):
+        self._send_json({'multi_user': True})
+
+    def _get_experiments(self, url, body):
+        predicates = json.loads(parse_qs(url.query).get('filter', ['{}'])[0]).get('predicates', [])
+        names = {predicate.get('stringValue') for predicate in predicates if predicate.get('key') == 'name'}
+        with self.server.lock:
+            experiments = [e for e in self.server.experiments.values() if not names or e['name'] in names]
+        self._send_json({'experiments': experiments, 'total_size': len(experiments)})
+
+    def _post_experiments(self, url, body):
+        experiment = json.loads(body)
+        experiment['id'] = str(uuid.uuid4())
+        with self.server.lock:
+            self.server.experiments[experiment['id']] = experiment
+        self._send_json(experiment)
+
+    def _post_runs(self, url, body):
+        run = json.loads(body)
+        run.update({'id': str(uuid.uuid4()), 'status': 'Pending'})
+        run.pop('pipeline_spec', None)
+        with self.server.lock:
+            self.server.runs[run['id']] = run
+        self._send_json({'run': run, 'pipeline_runtime': {'workflow_manifest': '{}'}})
+
+    def _get_run(self, url, body):
+        with self.server.lock:
+            run = self.server.runs.get(url.path.rsplit('/', 1)[-1])
+        if run is None:
+            self._send_json({'error': 'run not found'}, status=404)
+            return
+        self._send_json({'run': run, 'pipeline_runtime': {'workflow_manifest': '{}'}})
+
+
+class FakeDeployKF(ThreadingHTTPServer):
+    """
+    A local stand-in for a deployKF cluster, serving the Dex OIDC discovery and token endpoints and the KFP API
+    on 127.0.0.1, so the submission path runs without network access.
+
+    Only the refresh token grant is supported, clients are expected to start from stored credentials holding a
+    refresh token, see `fake_token`.
+
+    Args:
+        latency (float, optional): Seconds every request is delayed by, to model the round trip to a cluster. Defaults to 0.
+    """
+    daemon_threads = True
+
+    ROUTES = (
+        (re.compile(rf'^{DEX_PREFIX}/\.well-known/openid-configuration$'), 'discovery'),
+        (re.compile(rf'^{DEX_PREFIX}/token$'), 'token'),
+        (re.compile(rf'^{API_PREFIX}/healthz$'), 'healthz'),
+        (re.compile(rf'^{API_PREFIX}/experiments$'), 'experiments'),
+        (re.compile(rf'^{API_PREFIX}/runs$'), 'runs'),
+        (re.compile(rf'^{API_PREFIX}/runs/[^/]+$'), 'run'),
+    )
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__(('127.0.0.1', 0), FakeDeployKFHandler)
+        self.latency = latency
+        self.base_url = f"http://127.0.0.1:{self.server_address[1]}"
+        self.discovery_etag = f'"{uuid.uuid4().hex}"'
+        self.lock = threading.Lock()
+        self.experiments = {}
+        self.runs = {}
+        self.request_count = 0
+        self._thread = None
+
+    def route(self, path: str) -> str:
+        for pattern, name in self.ROUTES:
+            if pattern.match(path):
+                return name
+        return 'unknown'
+
+    def count_request(self):
+        with self.lock:
+            self.request_count += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def fake_token(expires_in: float = TOKEN_EXPIRES_IN) -> dict:
+    """
+    Build a token response of the fake Dex server.
+
+    Args:
+        expires_in (float, optional): The seconds until the token expires, negative for an expired token. Defaults to 3600.
+
+    Returns:
+        dict: The token, with `expires_at` set like requests-oauthlib stores it.
+    """
+    return {
+        'access_token': uuid.uuid4().hex,
+        'id_token': uuid.uuid4().hex,
+        'refresh_token': uuid.uuid4().hex,
+        'token_type': 'Bearer',
+        'expires_in': expires_in,
+        'expires_at': time.time() + expires_in,
+    }
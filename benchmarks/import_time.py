@@ -0,0 +1,81 @@
+"""
+Checks that importing the CLI stays fast, as `simple-kfp-task --help` and every command pay for it.
+
+Runs `python -X importtime -c "import simple_kfp_task.cli"` in a fresh interpreter and fails if kfp, the kubernetes
+client or GitPython are imported (they are imported lazily where they are used) or if the import takes longer than
+the budget. The fastest of several runs is compared, so a busy machine does not fail the check. The exit code is 1 on
+a problem, the check runs in the `import-time` job of `.github/workflows/checks.yml`.
+
+Usage:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --budget-ms 150 --runs 10
+"""
+import os
+import sys
+import subprocess
+from argparse import ArgumentParser
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARK_DIR)
+IMPORT_MODULE = 'simple_kfp_task.cli'
+FORBIDDEN_MODULES = ('kfp', 'kubernetes', 'git')
+DEFAULT_BUDGET_MS = 200
+
+
+def import_times(module: str = IMPORT_MODULE) -> dict:
+    """
+    Import a module in a fresh interpreter with `-X importtime`.
+
+    Args:
+        module (str, optional): The module to import. Defaults to 'simple_kfp_task.cli'.
+
+    Returns:
+        dict: The cumulative import time in microseconds of every module imported.
+
+    Raises:
+        RuntimeError: If the import fails.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT_DIR, os.environ.get('PYTHONPATH')])))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Failed to import {module}:\n{result.stderr}")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main(argv=None):
+    parser = ArgumentParser(description="Check the import time of the simple-kfp-task CLI.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="maximum import time of the CLI")
+    parser.add_argument("--runs", type=int, default=5, help="number of imports, the fastest is compared")
+    args = parser.parse_args(argv)
+
+    runs = [import_times() for _ in range(args.runs)]
+    problems = []
+
+    imported = sorted({name.split('.')[0] for times in runs for name in times if name.split('.')[0] in FORBIDDEN_MODULES})
+    if imported:
+        problems.append(f"{IMPORT_MODULE} imports {', '.join(imported)}, which must be imported lazily")
+
+    import_ms = min(times[IMPORT_MODULE] for times in runs) / 1000
+    print(f"import {IMPORT_MODULE}: {import_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    if import_ms > args.budget_ms:
+        slowest = sorted(((name, us) for name, us in runs[0].items() if name not in (IMPORT_MODULE, 'site')),
+                         key=lambda item: item[1], reverse=True)[:5]
+        problems.append(f"{IMPORT_MODULE} takes {import_ms:.1f} ms, slowest imports: "
+                        + ', '.join(f"{name} {us / 1000:.1f} ms" for name, us in slowest))
+
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,385 @@
+"""
+Offline benchmark of the submission path, from `Task.init` to `Task.run`.
+
+Every stage runs against a synthetic Git repository with a local bare remote and a fake deployKF cluster (Dex and the
+KFP API on 127.0.0.1), in a temporary home directory, so nothing touches the network or the user's caches.
+
+Usage:
+    python benchmarks/submission.py --iterations 50
+    python benchmarks/submission.py --files 5000 --file-size 4096 --save-baseline
+    python benchmarks/submission.py --baseline benchmarks/baseline.json --tolerance 0.2
+    python benchmarks/submission.py --remote-branches 5000
+
+The last stages time `is_commit_available_on_remote` against a remote with --remote-branches feature branches (2000
+by default), for a commit on the branch (ancestry query) and one only on a feature branch (scan of the remote refs),
+with cold and warm caches. They are part of the regression check in CI.
+
+The latency percentiles of each stage are compared against the baseline if it exists, the exit code is 1 if the
+median of a stage regressed by more than the tolerance and more than --min-change-ms. Baselines depend on the
+machine, record them where you compare. The `submission-benchmark` job of `.github/workflows/checks.yml` does so for
+every pull request: it records the baseline of the base branch and fails if the pull request regressed against it.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import platform
+import tempfile
+import warnings
+import subprocess
+from argparse import ArgumentParser
+
+from fake_servers import FakeDeployKF, fake_token
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE_PATH = os.path.join(BENCHMARK_DIR, 'baseline.json')
+PERCENTILES = (50, 90, 99)
+NAMESPACE = 'benchmark'
+EXPERIMENT_NAME = 'benchmark'
+
+
+def git(cwd: str, *args: str) -> str:
+    return subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def synthetic_file(index: int, size: int, revision: int = 0) -> str:
+    """
+    Generate the content of a synthetic source file of about `size` bytes, compressible like real code.
+    """
+    lines = [f'"""module {index} revision {revision}"""\n']
+    line = 0
+    while sum(map(len, lines)) < size:
+        lines.append(f'value_{index}_{line} = {line} * {revision + 1}  # synthetic line {line}\n')
+        line += 1
+    return ''.join(lines)
+
+
+def create_synthetic_repo(root: str, files: int, file_size: int, commits: int, dirty_files: int,
+                          untracked_files: int) -> str:
+    """
+    Create a repository with a local bare remote, `files` files spread over `commits` pushed commits, and
+    uncommitted changes to `dirty_files` files plus `untracked_files` new files.
+
+    Args:
+        root (str): The directory to create the remote and the working copy in.
+        files (int): The number of tracked files.
+        file_size (int): The approximate size of each file in bytes.
+        commits (int): The number of pushed commits, later commits rewrite a share of the files.
+        dirty_files (int): The number of tracked files with uncommitted changes.
+        untracked_files (int): The number of new, untracked files.
+
+    Returns:
+        str: The path of the working copy.
+    """
+    remote = os.path.join(root, 'remote.git')
+    work = os.path.join(root, 'work')
+    git(root, 'init', '--quiet', '--bare', remote)
+    git(root, 'init', '--quiet', '--initial-branch=main', work)
+    git(work, 'remote', 'add', 'origin', remote)
+
+    def write(path, content):
+        path = os.path.join(work, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def source_path(index):
+        return f'src/package_{index // 100}/module_{index}.py'
+
+    write('train.py', 'print("training")\n')
+    write('requirements.txt', 'numpy\n')
+    for commit in range(max(commits, 1)):
+        # the first commit adds all files, each later one rewrites a tenth of them
+        indices = range(files) if commit == 0 else range(commit % 10, files, 10)
+        for index in indices:
+            write(source_path(index), synthetic_file(index, file_size, commit))
+        git(work, 'add', '--all')
+        git(work, 'commit', '--quiet', '-m', f'commit {commit}')
+    git(work, 'push', '--quiet', '--set-upstream', 'origin', 'main')
+
+    for index in range(min(dirty_files, files)):
+        with open(os.path.join(work, source_path(index)), 'a') as f:
+            f.write(f'dirty_{index} = True\n')
+    for index in range(untracked_files):
+        write(f'untracked/new_{index}.py', synthetic_file(files + index, file_size))
+    return work
+
+
+def add_remote_branches(work: str, branches: int, side_commits: int = 50) -> str:
+    """
+    Add `branches` remote branches to a repository, pointing to `side_commits` commits which are not on main,
+    like a remote with many feature branches.
+
+    Args:
+        work (str): The working copy.
+        branches (int): The number of remote branches.
+        side_commits (int, optional): The number of commits the branches point to. Defaults to 50.
+
+    Returns:
+        str: The SHA hash of the last side commit, only reachable from some of the branches.
+    """
+    tree = git(work, 'rev-parse', 'HEAD^{tree}')
+    commits = [git(work, 'commit-tree', tree, '-p', 'HEAD', '-m', f'side {index}') for index in range(side_commits)]
+    updates = ''.join(
+        f'create refs/remotes/origin/feature-{index} {commits[index % len(commits)]}\n' for index in range(branches))
+    subprocess.run(['git', 'update-ref', '--stdin'], cwd=work, input=updates, check=True, text=True)
+    git(work, 'pack-refs', '--all')
+    return commits[-1]
+
+
+def percentile(values, p: float) -> float:
+    """
+    Compute the nearest-rank percentile of a list of values.
+    """
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(p / 100 * len(values) + 0.5)) - 1))]
+
+
+def summarize(samples, requests) -> dict:
+    summary = {f'p{p}': percentile(samples, p) for p in PERCENTILES}
+    summary['mean'] = sum(samples) / len(samples)
+    summary['requests'] = sum(requests) / len(requests)
+    summary['n'] = len(samples)
+    return summary
+
+
+class SubmissionBenchmark:
+    """
+    Runs the stages of the submission path against a synthetic repository and a fake deployKF cluster.
+
+    Args:
+        server (FakeDeployKF): The running fake cluster.
+        work_dir (str): The working copy of the synthetic repository.
+        iterations (int): The number of measured iterations per stage.
+        warmup (int): The number of unmeasured iterations run before.
+        remote_branches (int, optional): The number of remote branches added before the stages checking if a commit
+            is on the remote. Defaults to 0, which skips these stages.
+    """
+
+    def __init__(self, server: FakeDeployKF, work_dir: str, iterations: int, warmup: int, remote_branches: int = 0):
+        self.server = server
+        self.work_dir = work_dir
+        self.iterations = iterations
+        self.warmup = warmup
+        self.remote_branches = remote_branches
+        self.results = {}
+
+    def measure(self, name: str, fn, setup=None):
+        """
+        Time a stage, calling `setup` untimed before every iteration.
+
+        Returns:
+            The result of the last call of `fn`.
+        """
+        samples, requests = [], []
+        result = None
+        for iteration in range(self.warmup + self.iterations):
+            if setup:
+                setup()
+            request_count = self.server.request_count
+            start = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - start
+            if iteration >= self.warmup:
+                samples.append(elapsed)
+                requests.append(self.server.request_count - request_count)
+        self.results[name] = summarize(samples, requests)
+        print(f"  {name:<36}{self.results[name]['p50'] * 1000:>10.2f} ms", file=sys.stderr)
+        return result
+
+    def write_credentials(self, expires_in: float):
+        """
+        Store credentials for the fake issuer, expired ones are refreshed with the refresh token grant.
+        """
+        path = os.path.join(os.path.expanduser('~'), '.config', 'kfp', 'dkf_credentials.json')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({f"{self.server.base_url}/dex": fake_token(expires_in)}, f)
+
+    def clear_oidc_caches(self):
+        self.write_credentials(-60)
+        discovery_cache = os.path.join(os.path.expanduser('~'), '.config', 'kfp', 'dkf_oidc_discovery.json')
+        if os.path.exists(discovery_cache):
+            os.remove(discovery_cache)
+
+    @staticmethod
+    def clear_git_caches():
+        from simple_kfp_task import git_helper
+
+        git_helper._snapshot_cache.clear()
+        git_helper._is_commit_on_remote.cache_clear()
+
+    def task_kwargs(self) -> dict:
+        return {
+            'kfp_host': self.server.base_url,
+            'namespace': NAMESPACE,
+            'experiment_name': EXPERIMENT_NAME,
+            'command': 'train.py',
+            'requirements': 'requirements.txt',
+        }
+
+    def run(self):
+        from simple_kfp_task.deploykf import create_kfp_client, get_kfp_client
+        from simple_kfp_task.git_helper import GitHelper
+        from simple_kfp_task.pipeline import compile_pipeline, get_pipeline_package
+        from simple_kfp_task.task import Task
+        from simple_kfp_task.utils import encode_string_to_base64
+
+        def new_client():
+            return create_kfp_client(host=self.server.base_url, namespace=NAMESPACE)
+
+        self.measure('create_kfp_client (cold)', new_client, setup=self.clear_oidc_caches)
+        self.write_credentials(3600)
+        self.measure('create_kfp_client (warm)', new_client)
+
+        snapshot = self.measure('GitHelper.snapshot (cold)', lambda: GitHelper().snapshot(), setup=self.clear_git_caches)
+        self.measure('GitHelper.snapshot (cached)', lambda: GitHelper().snapshot())
+        git_diff = self.measure('GitHelper.build_git_diff', lambda: GitHelper().build_git_diff(snapshot.remote_commit))
+        self.measure('encode_string_to_base64', lambda: encode_string_to_base64(git_diff))
+
+        task = self.measure('Task.init', lambda: Task.init(**self.task_kwargs()), setup=self.clear_git_caches)
+        with tempfile.TemporaryDirectory() as package_dir:
+            package_path = os.path.join(package_dir, 'pipeline.yaml')
+            self.measure('compile_pipeline', lambda: compile_pipeline(package_path, **task.pipeline_options()))
+        self.measure('get_pipeline_package (cached)', lambda: get_pipeline_package(**task.pipeline_options()))
+
+        kfp_client = get_kfp_client(namespace=NAMESPACE, host=self.server.base_url)
+        self.measure('Task.run', lambda: task.run(kfp_client=kfp_client))
+        self.measure('Task.init -> Task.run', lambda: Task.init(**self.task_kwargs()).run(),
+                     setup=self.clear_git_caches)
+
+        if self.remote_branches:
+            # the branches are added last, so they do not change the stages above
+            side_commit = add_remote_branches(self.work_dir, self.remote_branches)
+            git_helper = GitHelper()
+            self.measure('is_commit_on_remote (ancestor, cold)',
+                         lambda: git_helper.is_commit_available_on_remote(snapshot.head_commit + '~1', branch='main'),
+                         setup=self.clear_git_caches)
+            self.measure('is_commit_on_remote (scan, cold)',
+                         lambda: git_helper.is_commit_available_on_remote(side_commit, branch='main'),
+                         setup=self.clear_git_caches)
+            self.measure('is_commit_on_remote (scan, cached)',
+                         lambda: git_helper.is_commit_available_on_remote(side_commit, branch='main'))
+        return self.results
+
+
+def format_results(results: dict, baseline: dict = None, tolerance: float = 0.25, min_change: float = 0.001):
+    """
+    Format the results as a table in milliseconds, compared against the medians of a baseline.
+
+    A stage regressed if its median grew by more than `tolerance` relative to and `min_change` seconds over the
+    baseline, so the noise of sub-millisecond stages is not reported.
+
+    Returns:
+        tuple: The table and the names of the stages whose median regressed by more than the tolerance.
+    """
+    baseline_stages = (baseline or {}).get('stages', {})
+    header = f"{'stage':<36}{'mean':>10}" + ''.join(f"{f'p{p}':>10}" for p in PERCENTILES) + f"{'requests':>10}"
+    if baseline_stages:
+        header += f"{'base p50':>10}{'change':>9}"
+    lines = [header]
+    regressions = []
+    for name, summary in results.items():
+        line = f"{name:<36}{summary['mean'] * 1000:>10.2f}" + ''.join(
+            f"{summary[f'p{p}'] * 1000:>10.2f}" for p in PERCENTILES) + f"{summary['requests']:>10.1f}"
+        if name in baseline_stages:
+            base = baseline_stages[name]['p50']
+            change = (summary['p50'] - base) / base if base else 0
+            line += f"{base * 1000:>10.2f}{change * 100:>+8.1f}%"
+            if change > tolerance and summary['p50'] - base > min_change:
+                line += '  REGRESSION'
+                regressions.append(name)
+        lines.append(line)
+    return '\n'.join(lines), regressions
+
+
+def main(argv=None):
+    parser = ArgumentParser(description="Offline benchmark of the simple-kfp-task submission path.")
+    parser.add_argument("--iterations", type=int, default=20, help="measured iterations per stage")
+    parser.add_argument("--warmup", type=int, default=2, help="unmeasured iterations before each stage")
+    parser.add_argument("--files", type=int, default=500, help="number of files of the synthetic repository")
+    parser.add_argument("--file-size", type=int, default=2048, help="approximate size of each file in bytes")
+    parser.add_argument("--commits", type=int, default=20, help="number of pushed commits")
+    parser.add_argument("--dirty-files", type=int, default=5, help="number of files with uncommitted changes")
+    parser.add_argument("--untracked-files", type=int, default=0, help="number of untracked files")
+    parser.add_argument("--remote-branches", type=int, default=2000, help="number of remote branches for the "
+                        "is_commit_on_remote stages, 0 to skip them")
+    parser.add_argument("--latency-ms", type=float, default=0, help="delay of every request to the fake cluster")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="the baseline to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression of the median")
+    parser.add_argument("--min-change-ms", type=float, default=1.0, help="smallest regression of the median reported")
+    parser.add_argument("--output", default=None, help="also write the results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    parameters = {key: getattr(args, key) for key in (
+        'files', 'file_size', 'commits', 'dirty_files', 'untracked_files', 'remote_branches', 'latency_ms')}
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory(prefix='simple-kfp-task-bench-') as root:
+        # the credentials, OIDC discovery and pipeline caches live in the home directory,
+        # so it is replaced before the library is imported
+        home = os.path.join(root, 'home')
+        os.makedirs(home)
+        os.environ.update({
+            'HOME': home,
+            'GIT_CONFIG_NOSYSTEM': '1',
+            'GIT_AUTHOR_NAME': 'benchmark',
+            'GIT_AUTHOR_EMAIL': 'benchmark@example.com',
+            'GIT_COMMITTER_NAME': 'benchmark',
+            'GIT_COMMITTER_EMAIL': 'benchmark@example.com',
+        })
+        for name in ('KF_PIPELINES_ENDPOINT', 'KF_PIPELINES_UI_ENDPOINT', 'KF_PIPELINES_OVERRIDE_EXPERIMENT_NAME'):
+            os.environ.pop(name, None)
+
+        print(f"creating synthetic repository {parameters}", file=sys.stderr)
+        work_dir = create_synthetic_repo(root, args.files, args.file_size, args.commits, args.dirty_files,
+                                         args.untracked_files)
+        os.chdir(work_dir)
+        warnings.simplefilter('ignore')
+        logging.getLogger('simple_kfp_task.deploykf').disabled = True
+
+        try:
+            with FakeDeployKF(latency=args.latency_ms / 1000) as server:
+                benchmark = SubmissionBenchmark(server, work_dir, args.iterations, args.warmup, args.remote_branches)
+                results = benchmark.run()
+                from simple_kfp_task.deploykf import close_kfp_clients
+                close_kfp_clients()
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        'parameters': parameters,
+        'iterations': args.iterations,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'stages': results,
+    }
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get('parameters') != parameters:
+            print(f"warning: the baseline was recorded with {baseline.get('parameters')}", file=sys.stderr)
+
+    table, regressions = format_results(results, baseline, args.tolerance, args.min_change_ms / 1000)
+    print(table)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"saved baseline to {args.baseline}", file=sys.stderr)
+    if regressions:
+        print(f"regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+    sys.exit(main())
@@ -1,2 +1,42 @@
-from .task import *
-from .deploykf import create_kfp_client
\ No newline at end of file
+import importlib
+
+# the public API is imported lazily, so importing the package (e.g. for the CLI's --help)
+# does not load kfp, the kubernetes client or GitPython until they are needed
+_LAZY_ATTRIBUTES = {
+    "Task": ".task",
+    "TaskRunResult": ".task",
+    "RunPipelineResult": ".task",
+    "GIT_DIFF_MAX_LENGTH": ".task",
+    "PIP_PACKAGE_NAME": ".task",
+    "RUN_MANY_MAX_WORKERS": ".task",
+    "create_kfp_client": ".deploykf",
+    "get_kfp_client": ".deploykf",
+    "close_kfp_clients": ".deploykf",
+    "KFPClientPool": ".deploykf",
+    "compile_pipeline": ".pipeline",
+    "get_pipeline_package": ".pipeline",
+    "AsyncRun": ".monitor",
+    "RunMonitor": ".monitor",
+    "TaskGraph": ".graph",
+    "expand_sweep": ".sweep",
+    "check_distributed_package": ".distributed",
+    "LogFollower": ".logs",
+    "follow_run_logs": ".logs",
+    "run_phase_timings": ".timings",
+    "LocalExecutor": ".local",
+    "LocalRunResult": ".local",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,218 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from urllib.parse import urlparse, parse_qs
+
+import requests
+
+PRESIGNED_URL_EXPIRATION = 7 * 24 * 60 * 60
+PRESIGNED_URL_REUSE = 6 * 24 * 60 * 60
+PRESIGNED_URL_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "simple-kfp-task", "presigned_urls.json")
+
+
+class ArtifactStore(ABC):
+    """
+    A content-addressed store for blobs shipped to the task pod (e.g. large Git diffs).
+
+    Blobs are stored under their digest, so uploading a blob which is already present is skipped.
+    """
+
+    @abstractmethod
+    def exists(self, digest: str) -> bool:
+        """
+        Checks if a blob is present in the store.
+
+        Args:
+            digest (str): The digest of the blob.
+
+        Returns:
+            bool: True if the blob exists, False otherwise.
+        """
+
+    @abstractmethod
+    def put(self, digest: str, data: bytes):
+        """
+        Uploads a blob to the store.
+
+        Args:
+            digest (str): The digest of the blob.
+            data (bytes): The content of the blob.
+        """
+
+    @abstractmethod
+    def url(self, digest: str) -> str:
+        """
+        Returns the URL the task pod downloads the blob from.
+
+        Args:
+            digest (str): The digest of the blob.
+
+        Returns:
+            str: The download URL of the blob.
+        """
+
+    def upload(self, digest: str, data: bytes) -> str:
+        """
+        Uploads a blob unless it is already present.
+
+        Args:
+            digest (str): The digest of the blob.
+            data (bytes): The content of the blob.
+
+        Returns:
+            str: The download URL of the blob.
+        """
+        if not self.exists(digest):
+            self.put(digest, data)
+        return self.url(digest)
+
+
+class LocalArtifactStore(ArtifactStore):
+    """
+    Stores blobs in a local directory. The task pod cannot read them, so the store is only used by local runs.
+
+    Args:
+        root (str): The directory to store the blobs in.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest)
+
+    def exists(self, digest):
+        return os.path.exists(self._path(digest))
+
+    def put(self, digest, data):
+        os.makedirs(self.root, exist_ok=True)
+        # write to a temporary file first, so concurrent uploads never expose partial blobs
+        with tempfile.NamedTemporaryFile(dir=self.root, delete=False) as f:
+            f.write(data)
+        shutil.move(f.name, self._path(digest))
+
+    def url(self, digest):
+        return f"file://{os.path.abspath(self._path(digest))}"
+
+
+class HTTPArtifactStore(ArtifactStore):
+    """
+    Stores blobs on an HTTP server supporting HEAD, PUT and GET (e.g. a WebDAV share or a test stand-in).
+
+    Args:
+        base_url (str): The URL of the directory to store the blobs in.
+        verify_ssl (bool, optional): Whether to verify the server's certificate. Defaults to True.
+    """
+
+    def __init__(self, base_url: str, verify_ssl: bool = True):
+        self.base_url = base_url.rstrip("/")
+        self.verify_ssl = verify_ssl
+        self.session = requests.Session()
+
+    def exists(self, digest):
+        response = self.session.head(self.url(digest), timeout=15, verify=self.verify_ssl)
+        return response.status_code == 200
+
+    def put(self, digest, data):
+        response = self.session.put(self.url(digest), data=data, timeout=60, verify=self.verify_ssl)
+        response.raise_for_status()
+
+    def url(self, digest):
+        return f"{self.base_url}/{digest}"
+
+
+class S3ArtifactStore(ArtifactStore):
+    """
+    Stores blobs in an S3 compatible bucket (AWS S3 or MinIO).
+
+    The task pod downloads the blobs through presigned URLs, so it needs no S3 credentials. Presigned URLs are reused
+    for a day less than they are valid, so resubmitting the same blob passes the same URL and KFP step caching still hits.
+
+    Args:
+        bucket (str): The name of the bucket.
+        prefix (str, optional): The key prefix of the blobs. Defaults to ''.
+        endpoint_url (str, optional): The endpoint of the S3 API, required for MinIO. Defaults to None.
+    """
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: str = None):
+        try:
+            import boto3
+        except ImportError:
+            raise ImportError("The S3 artifact store requires boto3, install it with `pip install boto3`.")
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+
+    def _key(self, digest):
+        return f"{self.prefix}/{digest}" if self.prefix else digest
+
+    def exists(self, digest):
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(digest))
+            return True
+        except ClientError:
+            return False
+
+    def put(self, digest, data):
+        self.client.put_object(Bucket=self.bucket, Key=self._key(digest), Body=data)
+
+    def url(self, digest):
+        cache_key = f"{self.client.meta.endpoint_url}/{self.bucket}/{self._key(digest)}"
+        try:
+            with open(PRESIGNED_URL_CACHE_PATH, "r") as f:
+                cache_data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            cache_data = {}
+
+        cached = cache_data.get(cache_key)
+        if cached and time.time() - cached["created_at"] < PRESIGNED_URL_REUSE:
+            return cached["url"]
+
+        url = self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self._key(digest)},
+            ExpiresIn=PRESIGNED_URL_EXPIRATION,
+        )
+
+        now = time.time()
+        cache_data = {key: value for key, value in cache_data.items() if now - value["created_at"] < PRESIGNED_URL_REUSE}
+        cache_data[cache_key] = {"url": url, "created_at": now}
+        os.makedirs(os.path.dirname(PRESIGNED_URL_CACHE_PATH), exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(PRESIGNED_URL_CACHE_PATH), delete=False) as f:
+            json.dump(cache_data, f)
+        os.replace(f.name, PRESIGNED_URL_CACHE_PATH)
+        return url
+
+
+def get_artifact_store(url: str, verify_ssl: bool = True) -> ArtifactStore:
+    """
+    Creates an artifact store from its URL.
+
+    Supported URLs are `file:///path` (local runs only), `http(s)://host/path` and `s3://bucket/prefix`
+    (use `s3://bucket/prefix?endpoint_url=http://minio:9000` for MinIO).
+
+    Args:
+        url (str): The URL of the artifact store.
+        verify_ssl (bool, optional): Whether to verify certificates of HTTP stores. Defaults to True.
+
+    Returns:
+        ArtifactStore: The artifact store.
+
+    Raises:
+        ValueError: If the URL scheme is not supported.
+    """
+    parsed_url = urlparse(url)
+    if parsed_url.scheme == "file":
+        return LocalArtifactStore(parsed_url.path)
+    if parsed_url.scheme in ("http", "https"):
+        return HTTPArtifactStore(url, verify_ssl=verify_ssl)
+    if parsed_url.scheme == "s3":
+        endpoint_url = parse_qs(parsed_url.query).get("endpoint_url", [None])[0]
+        return S3ArtifactStore(parsed_url.netloc, parsed_url.path, endpoint_url=endpoint_url)
+    raise ValueError(f"Unsupported artifact store {url}.")
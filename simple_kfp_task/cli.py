@@ -1,18 +1,183 @@
 #!/usr/bin/env python
-from simple_kfp_task.task import Task
+import sys
+import asyncio
+import json
+from simple_kfp_task.task import Task, RUN_MANY_MAX_WORKERS
+from simple_kfp_task.monitor import AsyncRun
+from simple_kfp_task.sweep import load_sweep
+from simple_kfp_task.timings import run_phase_timings, phases_timings, format_breakdown
 from argparse import ArgumentParser
 
 
+def load_task_specs(path):
+    """
+    Loads task specifications from a JSON file.
+
+    The file contains either a list of objects or one object per line, each object
+    holding keyword arguments for `Task.init` (e.g. `command`, `args`, `run_name`).
+
+    Args:
+        path (str): The path to the task specification file.
+
+    Returns:
+        list: The task specifications.
+    """
+    with open(path, "r") as f:
+        content = f.read().strip()
+    if content.startswith("["):
+        return json.loads(content)
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+
+async def wait_for_results(results):
+    """
+    Waits for all successfully submitted runs and prints their final state in input order.
+
+    Args:
+        results (list): The results returned by `Task.run_many`.
+    """
+    from simple_kfp_task.deploykf import get_kfp_client
+
+    async def wait(result):
+        if result.error:
+            return f"{result.task.run_name}: {result.error}"
+        kfp_client = get_kfp_client(namespace=result.task.namespace, host=result.task.kfp_host, verify_ssl=result.task.verify_ssl)
+        return await AsyncRun(result.run, kfp_client).completion()
+
+    for output in await asyncio.gather(*(wait(result) for result in results), return_exceptions=True):
+        print(output)
+
+
+def compile_command(argv):
+    """
+    Compiles the pipeline package offline, without contacting KFP.
+
+    Args:
+        argv (list): The command line arguments following `compile`.
+    """
+    from simple_kfp_task.pipeline import compile_pipeline, get_pipeline_package
+
+    parser = ArgumentParser(prog="simple-kfp-task compile")
+    parser.add_argument("--output", default=None, help="path of the package to write (defaults to the package cache)")
+    parser.add_argument("--git-mirror-pvc", default=None)
+    parser.add_argument("--git-mirror-host-path", default=None)
+    parser.add_argument("--env-cache-pvc", default=None)
+    parser.add_argument("--env-cache-host-path", default=None)
+    parser.add_argument("--env-image-registry-secret", default=None)
+    parser.add_argument("--checkout-mode", choices=["sidecar", "init"], default="sidecar")
+    parser.add_argument("--cache-staleness", default=None)
+    parser.add_argument("--specialize", action="store_true", default=False, help="compile a pipeline specialized for the shape given by --volume, --gpu and --env-image-build")
+    parser.add_argument("--volume", action="store_true", default=False)
+    parser.add_argument("--gpu", action="store_true", default=False)
+    parser.add_argument("--env-image-build", action="store_true", default=False)
+    parser.add_argument("--sweep", action="store_true", default=False, help="compile a sweep pipeline of the shape")
+    parser.add_argument("--sweep-parallelism", type=int, default=None)
+    parser.add_argument("--sweep-workspace-size", default="10Gi")
+    parser.add_argument("--sweep-workspace-storage-class", default=None)
+    parser.add_argument("--sweep-workspace-access-mode", default="ReadWriteOnce")
+    parser.add_argument("--replicas", type=int, default=None, help="compile a distributed pipeline of the shape with this many pods")
+    parser.add_argument("--check", action="store_true", default=False, help="check the rank wiring and resources of the distributed pipeline")
+    args = parser.parse_args(argv)
+
+    options = dict(
+        git_mirror_pvc=args.git_mirror_pvc,
+        git_mirror_host_path=args.git_mirror_host_path,
+        env_cache_pvc=args.env_cache_pvc,
+        env_cache_host_path=args.env_cache_host_path,
+        env_image_registry_secret=args.env_image_registry_secret,
+        checkout_mode=args.checkout_mode,
+        cache_staleness=args.cache_staleness,
+        shape=(args.volume, args.gpu, args.env_image_build) if args.specialize or args.sweep or args.replicas else None,
+        sweep=(args.sweep_parallelism, args.sweep_workspace_size, args.sweep_workspace_storage_class,
+               args.sweep_workspace_access_mode) if args.sweep else None,
+        replicas=args.replicas if args.replicas and args.replicas > 1 else None,
+    )
+    if args.output:
+        compile_pipeline(args.output, **options)
+        package_path = args.output
+    else:
+        package_path = get_pipeline_package(**options)
+
+    if args.check and options["replicas"]:
+        from simple_kfp_task.distributed import check_distributed_package
+
+        check_distributed_package(package_path, options["replicas"], gpu=args.gpu)
+    print(package_path)
+
+
+def timings_command(argv):
+    """
+    Shows the phase timings of runs, for each given run and aggregated across them or the latest runs of an experiment.
+
+    Args:
+        argv (list): The command line arguments following `timings`.
+    """
+    from simple_kfp_task.deploykf import get_kfp_client
+    from simple_kfp_task.timings import format_aggregate
+
+    parser = ArgumentParser(prog="simple-kfp-task timings")
+    parser.add_argument("run_ids", nargs="*", help="ids of the runs to show")
+    parser.add_argument("--local", nargs="+", default=[], help="phase timings files written by local runs to show")
+    parser.add_argument("--namespace")
+    parser.add_argument("--experiment-name", default=None, help="aggregate the latest runs of this experiment")
+    parser.add_argument("--limit", type=int, default=100, help="maximum number of experiment runs to aggregate")
+    parser.add_argument("--kfp-host", default="https://10-101-20-33.sslip.io")
+    parser.add_argument("--verify-ssl", action="store_true", default=False)
+    args = parser.parse_args(argv)
+    if (args.run_ids or args.experiment_name) and not args.namespace:
+        parser.error("--namespace is required to show KFP runs")
+
+    runs_timings = []
+    for path in args.local:
+        with open(path, 'r') as f:
+            runs_timings.append(phases_timings(json.load(f)))
+        print(f"{path} (local)")
+        print(format_breakdown(runs_timings[-1]))
+        print()
+
+    runs = []
+    if args.run_ids or args.experiment_name:
+        kfp_client = get_kfp_client(namespace=args.namespace, host=args.kfp_host, verify_ssl=args.verify_ssl)
+        runs = [kfp_client.get_run(run_id).run for run_id in args.run_ids]
+    for run in runs:
+        print(f"{run.name} ({run.id}, {run.status})")
+        print(format_breakdown(run_phase_timings(run)))
+        print()
+
+    if args.experiment_name:
+        experiment = kfp_client.get_experiment(experiment_name=args.experiment_name, namespace=args.namespace)
+        page_token = ''
+        while len(runs) < len(args.run_ids) + args.limit:
+            response = kfp_client.list_runs(page_token=page_token, page_size=min(100, args.limit),
+                                            sort_by='created_at desc', experiment_id=experiment.id)
+            runs.extend((response.runs or [])[:len(args.run_ids) + args.limit - len(runs)])
+            page_token = response.next_page_token
+            if not page_token:
+                break
+
+    runs_timings += [timings for timings in map(run_phase_timings, runs) if timings]
+    if len(runs_timings) > 1 or args.experiment_name:
+        print(f"{len(runs_timings)} runs with phase timings")
+        print(format_aggregate(runs_timings))
+
+
 def main():
     """
     Entry point of the program.
     
     Parses command line arguments and calls the `run` function with the parsed arguments.
     """
-    
+    if sys.argv[1:2] == ["compile"]:
+        compile_command(sys.argv[2:])
+        return
+
+    if sys.argv[1:2] == ["timings"]:
+        timings_command(sys.argv[2:])
+        return
+
     parser = ArgumentParser()
-    parser.add_argument('command')
-    parser.add_argument("--namespace", required=True)
+    parser.add_argument('command', nargs='?')
+    parser.add_argument("--namespace")
     parser.add_argument("--experiment-name")
     parser.add_argument("--run-name")
     parser.add_argument("--remote", default="origin")
@@ -30,15 +195,50 @@ def main():
     parser.add_argument("--gpu-vendor", default="nvidia.com/gpu")
     parser.add_argument("--container-image", default="python:3.12.3-slim")
     parser.add_argument("--volume-name", default=None)
+    parser.add_argument("--diff-store", default=None, help="artifact store URL (s3://, http(s)://, or file:// with --local) for large Git diffs")
+    parser.add_argument("--git-mirror-pvc", default=None, help="persistent volume claim of a shared git mirror")
+    parser.add_argument("--git-mirror-host-path", default=None, help="host path of a shared git mirror")
+    parser.add_argument("--env-cache-pvc", default=None, help="persistent volume claim of a shared environment cache")
+    parser.add_argument("--env-cache-host-path", default=None, help="host path of a shared environment cache")
+    parser.add_argument("--lock-dependencies", action="store_true", default=False, help="resolve requirements and packages into a hashed lock on the client")
+    parser.add_argument("--lock-python-version", default=None, help="python version to resolve the lock for (defaults to the image tag)")
+    parser.add_argument("--env-image-repository", default=None, help="repository of prebuilt environment images selected by dependency fingerprint")
+    parser.add_argument("--env-image-insecure", action="store_true", default=False, help="the environment image registry is served over plain http")
+    parser.add_argument("--env-image-no-verify-ssl", action="store_true", default=False, help="do not verify the certificate of the environment image registry")
+    parser.add_argument("--env-image-registry-secret", default=None, help="docker config secret used to push environment images")
+    parser.add_argument("--checkout-mode", choices=["sidecar", "init"], default="sidecar", help="check out the repository in a sidecar or an init container")
+    parser.add_argument("--cache-staleness", default=None, help="reuse results of identical runs within this ISO 8601 duration, e.g. P7D")
+    parser.add_argument("--no-cache", action="store_true", default=False, help="rerun even if an identical run is cached")
+    parser.add_argument("--register-pipeline", action="store_true", default=False, help="submit by a pipeline version uploaded once instead of uploading the package with every run")
+    parser.add_argument("--sweep", default=None, help="JSON grid or list of argument sets (or a JSON file) to run as variants in a single run")
+    parser.add_argument("--sweep-parallelism", type=int, default=None, help="maximum number of sweep variants running at once")
+    parser.add_argument("--sweep-workspace-size", default="10Gi", help="size of the sweep workspace volume")
+    parser.add_argument("--sweep-workspace-storage-class", default=None, help="storage class of the sweep workspace volume")
+    parser.add_argument("--sweep-workspace-access-mode", default="ReadWriteOnce", help="access mode of the sweep workspace volume")
+    parser.add_argument("--replicas", type=int, default=1, help="run the task as a coordinated group of this many pods (torch.distributed / TF_CONFIG)")
+    parser.add_argument("--git-bundle", action="store_true", default=False, help="ship unpushed commits as a Git bundle through the diff store")
     parser.add_argument("--disable-git-detection", action="store_true", default=False)
     parser.add_argument("--dry-run", action="store_true", default=False)
     parser.add_argument("--wait-for-run", action="store_true", default=False)
+    parser.add_argument("--follow", action="store_true", default=False, help="stream the logs of the run until it finished")
+    parser.add_argument("--follow-source", choices=["kfp", "kubernetes"], default="kfp", help="read the logs through the KFP UI or the Kubernetes API")
+    parser.add_argument("--local", action="store_true", default=False, help="run the task on this machine in a temporary git worktree instead of on KFP")
+    parser.add_argument("--no-venv-cache", action="store_true", default=False, help="install the dependencies of a local run into a new virtual environment")
+    parser.add_argument("--timings-output", default=None, help="write the phase timings of a local run as JSON to this file")
     parser.add_argument("--kfp-host", default="https://10-101-20-33.sslip.io")
     parser.add_argument("--verify-ssl", action="store_true", default=False)
+    parser.add_argument("--batch", help="JSON file with task specifications to submit together")
+    parser.add_argument("--max-workers", type=int, default=RUN_MANY_MAX_WORKERS)
 
     args, command_args = parser.parse_known_args()
+    if not args.namespace and not args.local:
+        parser.error("the following arguments are required: --namespace")
+    if args.local and args.batch:
+        parser.error("--local runs a single task, it cannot be combined with --batch")
+    if args.follow and args.batch:
+        parser.error("--follow streams the logs of a single run, it cannot be combined with --batch")
 
-    task = Task.init(
+    task_kwargs = dict(
         run_name=args.run_name,
         experiment_name=args.experiment_name,
         namespace=args.namespace,
@@ -57,14 +257,70 @@ def main():
         memory_limit=args.memory_limit,
         memory_request=args.memory_request,
         volume_name=args.volume_name,
+        diff_store=args.diff_store,
+        git_bundle=args.git_bundle,
+        git_mirror_pvc=args.git_mirror_pvc,
+        git_mirror_host_path=args.git_mirror_host_path,
+        env_cache_pvc=args.env_cache_pvc,
+        env_cache_host_path=args.env_cache_host_path,
+        lock_dependencies=args.lock_dependencies,
+        lock_python_version=args.lock_python_version,
+        env_image_repository=args.env_image_repository,
+        env_image_insecure=args.env_image_insecure,
+        env_image_verify_ssl=not args.env_image_no_verify_ssl,
+        env_image_registry_secret=args.env_image_registry_secret,
+        checkout_mode=args.checkout_mode,
+        cache_staleness=args.cache_staleness,
+        no_cache=args.no_cache,
+        register_pipeline=args.register_pipeline,
+        sweep=load_sweep(args.sweep) if args.sweep else None,
+        sweep_parallelism=args.sweep_parallelism,
+        sweep_workspace_size=args.sweep_workspace_size,
+        sweep_workspace_storage_class=args.sweep_workspace_storage_class,
+        sweep_workspace_access_mode=args.sweep_workspace_access_mode,
+        replicas=args.replicas,
         container_image=args.container_image,
         kfp_host=args.kfp_host,
         verify_ssl=args.verify_ssl,
     )
 
+    if args.batch:
+        tasks = [Task.init(**{**task_kwargs, **spec}) for spec in load_task_specs(args.batch)]
+        if args.dry_run:
+            return
+        results = Task.run_many(tasks, max_workers=args.max_workers)
+        if args.wait_for_run:
+            asyncio.run(wait_for_results(results))
+            return
+        for result in results:
+            if result.error:
+                print(f"{result.task.run_name}: {result.error}")
+            else:
+                print(result.run)
+        return
+
+    task = Task.init(**task_kwargs)
+
+    if args.local and not args.dry_run:
+        result = task.run(executor='local', venv_cache=not args.no_venv_cache)
+        if args.timings_output:
+            with open(args.timings_output, 'w') as f:
+                json.dump(result.phases, f)
+        print(format_breakdown(phases_timings(result.phases)))
+        sys.exit(result.exit_code)
+
     if not args.dry_run:
         run = task.run()
-        if args.wait_for_run:
+        if args.follow:
+            from simple_kfp_task.deploykf import get_kfp_client
+            from simple_kfp_task.logs import follow_run_logs
+
+            kfp_client = get_kfp_client(namespace=task.namespace, host=task.kfp_host, verify_ssl=task.verify_ssl)
+            run_response = follow_run_logs(kfp_client, run.run_id, source=args.follow_source)
+            print(f"run {run.run_id} {run_response.run.status}")
+            print(format_breakdown(run_phase_timings(run_response.run)))
+        elif args.wait_for_run:
             run_response = run.wait_for_run_completion()
             run = run_response.run.id
             print(run_response)
+            print(format_breakdown(run_phase_timings(run_response.run)))
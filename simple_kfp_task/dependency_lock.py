@@ -0,0 +1,173 @@
+import os
+import re
+import sys
+import json
+import hashlib
+import tempfile
+import subprocess
+from typing import List, Union
+
+LOCK_PLATFORM = 'manylinux_2_28_x86_64'
+LOCK_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "simple-kfp-task", "locks")
+MANYLINUX_LEGACY_TAGS = {17: 'manylinux2014', 12: 'manylinux2010', 5: 'manylinux1'}
+
+
+def python_version_from_image(container_image: str) -> str:
+    """
+    Guesses the Python version of a container image from its tag (e.g. `python:3.12.3-slim` -> `3.12`).
+
+    Args:
+        container_image (str): The container image.
+
+    Returns:
+        str: The major and minor Python version, or None if the tag does not contain one.
+    """
+    tag = container_image.rsplit('/', 1)[-1].partition(':')[2]
+    match = re.match(r'(?:py(?:thon)?-?)?(3)\.(\d+)', tag)
+    if match is None:
+        return None
+    return f"{match.group(1)}.{match.group(2)}"
+
+
+def platform_tags(platform: Union[str, List[str]]) -> List[str]:
+    """
+    Expands a platform into the tags of the wheels compatible with it, as pip only matches the exact `--platform` tags.
+
+    A `manylinux_2_N_<arch>` platform runs wheels of all older glibc versions, so it expands into the ladder from
+    `manylinux_2_N` down to `manylinux_2_5` including the legacy aliases `manylinux2014`, `manylinux2010` and
+    `manylinux1` (e.g. current numpy wheels are only tagged `manylinux_2_17` and `manylinux2014`). Other platforms
+    and lists of tags are used as given.
+
+    Args:
+        platform (Union[str, List[str]]): The platform or the list of platform tags.
+
+    Returns:
+        List[str]: The platform tags, most specific first.
+    """
+    if not isinstance(platform, str):
+        return list(platform)
+    match = re.fullmatch(r'manylinux_2_(\d+)_(\w+)', platform)
+    if match is None:
+        return [platform]
+
+    glibc_minor, arch = int(match.group(1)), match.group(2)
+    tags = []
+    for minor in range(glibc_minor, 4, -1):
+        tags.append(f'manylinux_2_{minor}_{arch}')
+        if minor in MANYLINUX_LEGACY_TAGS:
+            tags.append(f'{MANYLINUX_LEGACY_TAGS[minor]}_{arch}')
+    return tags
+
+
+def lock_cache_key(requirements: str, packages: List[str], python_version: str, platform: Union[str, List[str]]) -> str:
+    """
+    Computes the cache key of a lock from its inputs and target.
+
+    Args:
+        requirements (str): The content of the requirements file.
+        packages (List[str]): The additional packages.
+        python_version (str): The target Python version.
+        platform (Union[str, List[str]]): The target platform or platform tags.
+
+    Returns:
+        str: The hex encoded cache key.
+    """
+    key = json.dumps([requirements, sorted(packages), python_version, platform_tags(platform)])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def _lock_line(item: dict) -> str:
+    """
+    Formats an entry of a pip installation report as a pinned requirement with its hash.
+    """
+    name = item["metadata"]["name"]
+    version = item["metadata"]["version"]
+    archive_info = item.get("download_info", {}).get("archive_info")
+    if archive_info is None:
+        raise ValueError(f"Cannot lock {name}, only packages from an index or archive URL can be locked.")
+
+    hashes = archive_info.get("hashes") or dict([archive_info["hash"].split("=", 1)])
+    if "sha256" not in hashes:
+        raise ValueError(f"Cannot lock {name}, the index provides no sha256 hash.")
+
+    return f"{name}=={version} --hash=sha256:{hashes['sha256']}"
+
+
+def resolve_lock(requirements: str, packages: List[str], python_version: str,
+                 platform: Union[str, List[str]] = LOCK_PLATFORM) -> str:
+    """
+    Resolves requirements and packages into a fully pinned lock with hashes.
+
+    Resolution runs `pip install --dry-run --report` for the target Python version and platform
+    (pip requires `--target` for those, nothing is installed), so only binary wheels are considered.
+
+    Args:
+        requirements (str): The content of the requirements file.
+        packages (List[str]): The additional packages.
+        python_version (str): The target Python version.
+        platform (Union[str, List[str]], optional): The target platform, expanded with `platform_tags`, or a list of
+            platform tags. Defaults to 'manylinux_2_28_x86_64'.
+
+    Returns:
+        str: The lock in requirements file format, to be installed with `--no-deps --require-hashes`.
+
+    Raises:
+        RuntimeError: If pip fails to resolve the dependencies.
+        ValueError: If a resolved package cannot be pinned by hash.
+    """
+    with tempfile.TemporaryDirectory() as tmpdir:
+        requirements_path = os.path.join(tmpdir, "requirements.txt")
+        report_path = os.path.join(tmpdir, "report.json")
+        target_path = os.path.join(tmpdir, "target")
+        with open(requirements_path, "w") as f:
+            f.write(requirements)
+
+        result = subprocess.run(
+            [
+                sys.executable, "-m", "pip", "install", "--dry-run", "--quiet", "--ignore-installed",
+                "--only-binary=:all:", "--python-version", python_version,
+                *[arg for tag in platform_tags(platform) for arg in ("--platform", tag)],
+                "--target", target_path, "--report", report_path, "-r", requirements_path, *packages
+            ],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Failed to resolve dependencies: {result.stderr.strip()}")
+
+        with open(report_path, "r") as f:
+            report = json.load(f)
+
+    return "\n".join(sorted(_lock_line(item) for item in report["install"])) + "\n"
+
+
+def get_lock(requirements: str, packages: List[str], python_version: str,
+             platform: Union[str, List[str]] = LOCK_PLATFORM, cache_dir: str = LOCK_CACHE_DIR) -> str:
+    """
+    Returns the lock of requirements and packages, resolving it only if it is not cached yet.
+
+    Locks are cached in '~/.cache/simple-kfp-task/locks' by `lock_cache_key`.
+
+    Args:
+        requirements (str): The content of the requirements file.
+        packages (List[str]): The additional packages.
+        python_version (str): The target Python version.
+        platform (Union[str, List[str]], optional): The target platform or platform tags.
+            Defaults to 'manylinux_2_28_x86_64'.
+        cache_dir (str, optional): The directory the locks are cached in.
+
+    Returns:
+        str: The lock in requirements file format.
+    """
+    lock_path = os.path.join(cache_dir, f"{lock_cache_key(requirements, packages, python_version, platform)}.txt")
+    if os.path.exists(lock_path):
+        with open(lock_path, "r") as f:
+            return f.read()
+
+    lock = resolve_lock(requirements, packages, python_version, platform)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # write to a temporary file first, so concurrent resolutions never expose partial locks
+    with tempfile.NamedTemporaryFile("w", dir=cache_dir, delete=False) as f:
+        f.write(lock)
+    os.replace(f.name, lock_path)
+    return lock
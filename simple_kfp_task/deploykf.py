@@ -4,7 +4,9 @@ import json
 import logging
 import os
 import sys
+import threading
 import time
+import weakref
 from typing import Optional
 
 import requests
@@ -21,6 +23,22 @@ except ImportError:
 
 import kfp
 
+OIDC_DISCOVERY_TTL = 24 * 60 * 60
+
+_oidc_http_session = None
+_oidc_http_session_lock = threading.Lock()
+
+
+def get_oidc_http_session() -> requests.Session:
+    """
+    Get the process-wide keep-alive session used for all OIDC traffic.
+    """
+    global _oidc_http_session
+    with _oidc_http_session_lock:
+        if _oidc_http_session is None:
+            _oidc_http_session = requests.Session()
+        return _oidc_http_session
+
 
 class DeployKFCredentialsOutOfBand(TokenCredentialsBase):
     """
@@ -34,14 +52,17 @@ class DeployKFCredentialsOutOfBand(TokenCredentialsBase):
        (this file is indexed by issuer URL, so multiple clusters can be used concurrently)
      - attempts to use the "refresh_token" grant before prompting the user to login again
        (in deployKF, refresh tokens are valid if used at least once every 7 days, and not longer than 90 days in total)
+     - caches the OIDC discovery document in '~/.config/kfp/dkf_oidc_discovery.json'
+       (revalidated with its ETag once the TTL has passed)
     """
 
-    def __init__(self, issuer_url: str, skip_tls_verify: bool = False):
+    def __init__(self, issuer_url: str, skip_tls_verify: bool = False, oidc_discovery_ttl: float = OIDC_DISCOVERY_TTL):
         """
         Initialize a DeployKFTokenCredentials instance.
 
         :param issuer_url: the OIDC issuer URL (e.g. 'https://deploykf.example.com:8443/dex')
         :param skip_tls_verify: if True, skip TLS verification
+        :param oidc_discovery_ttl: seconds the cached OIDC discovery document is used without revalidation
         """
         # oidc configuration
         self.oidc_issuer_url = issuer_url
@@ -55,6 +76,19 @@ class DeployKFCredentialsOutOfBand(TokenCredentialsBase):
         self.local_credentials_path = os.path.join(
             os.path.expanduser("~"), ".config", "kfp", "dkf_credentials.json"
         )
+        self.oidc_discovery_ttl = oidc_discovery_ttl
+        self.oidc_discovery_cache_path = os.path.join(
+            os.path.dirname(self.local_credentials_path), "dkf_oidc_discovery.json"
+        )
+        self.http_session = get_oidc_http_session()
+
+        # in-memory token cache, the credentials file is only re-read when the
+        # cached token is about to expire or the file was modified
+        self.token_refresh_window = 300
+        self._token_lock = threading.RLock()
+        self._cached_token = {}
+        self._cached_token_mtime = None
+        self.token_cache_stats = {"hits": 0, "misses": 0, "refreshes": 0, "logins": 0}
 
         # setup logging
         self.log = logging.getLogger(__name__)
@@ -90,21 +124,78 @@ class DeployKFCredentialsOutOfBand(TokenCredentialsBase):
         Discover the OIDC issuer configuration.
         https://openid.net/specs/openid-connect-discovery-1_0.html
         """
-        oidc_discovery_url = f"{
-            self.oidc_issuer_url}/.well-known/openid-configuration"
-        self.log.info("Discovering OIDC configuration from: %s",
-                      oidc_discovery_url)
-        response = requests.get(
-            url=oidc_discovery_url,
-            timeout=self.http_timeout,
-            verify=not self.skip_tls_verify,
-        )
-        response.raise_for_status()
-        oidc_issuer_config = response.json()
+        oidc_discovery_url = f"{self.oidc_issuer_url}/.well-known/openid-configuration"
+        cache_data = self._read_oidc_discovery_cache()
+        cached = cache_data.get(self.oidc_issuer_url, {})
+
+        if cached and time.time() - cached.get("fetched_at", 0) < self.oidc_discovery_ttl:
+            self.log.debug("Using cached OIDC configuration for: %s",
+                           self.oidc_issuer_url)
+            oidc_issuer_config = cached["config"]
+        else:
+            self.log.info("Discovering OIDC configuration from: %s",
+                          oidc_discovery_url)
+            headers = {}
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            response = self.http_session.get(
+                url=oidc_discovery_url,
+                headers=headers,
+                timeout=self.http_timeout,
+                verify=not self.skip_tls_verify,
+            )
+            if response.status_code == 304:
+                oidc_issuer_config = cached["config"]
+            else:
+                response.raise_for_status()
+                oidc_issuer_config = response.json()
+
+            cache_data[self.oidc_issuer_url] = {
+                "config": oidc_issuer_config,
+                "etag": response.headers.get("ETag", cached.get("etag")),
+                "fetched_at": time.time(),
+            }
+            self._write_oidc_discovery_cache(cache_data)
+
         self.oidc_issuer = oidc_issuer_config["issuer"]
         self.oidc_auth_endpoint = oidc_issuer_config["authorization_endpoint"]
         self.oidc_token_endpoint = oidc_issuer_config["token_endpoint"]
 
+    def _read_oidc_discovery_cache(self) -> dict:
+        """
+        Read the cached OIDC discovery documents (indexed by issuer URL).
+        """
+        try:
+            with open(self.oidc_discovery_cache_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_oidc_discovery_cache(self, cache_data: dict):
+        """
+        Write the OIDC discovery documents, replacing the cache file atomically.
+        """
+        cache_dir = os.path.dirname(self.oidc_discovery_cache_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{self.oidc_discovery_cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(cache_data, f)
+        os.replace(tmp_path, self.oidc_discovery_cache_path)
+
+    def _create_oauth_session(self, token: dict) -> OAuth2Session:
+        """
+        Create an OAuth2 session which shares the connection pools of the OIDC HTTP session.
+        """
+        oauth_session = OAuth2Session(
+            self.oidc_client_id,
+            redirect_uri=self.oidc_redirect_uri,
+            scope=self.oidc_scope,
+            token=token,
+        )
+        for prefix, adapter in self.http_session.adapters.items():
+            oauth_session.mount(prefix, adapter)
+        return oauth_session
+
     def _read_credentials(self) -> dict:
         """
         Read credentials from the JSON file for the current issuer.
@@ -112,11 +203,23 @@ class DeployKFCredentialsOutOfBand(TokenCredentialsBase):
         self.log.debug(
             "Checking for existing credentials in: %s", self.local_credentials_path
         )
+        self._cached_token_mtime = self._credentials_mtime()
         if os.path.exists(self.local_credentials_path):
             with open(self.local_credentials_path, "r") as file:
                 data = json.load(file)
-                return data.get(self.oidc_issuer, {})
-        return {}
+                self._cached_token = data.get(self.oidc_issuer, {})
+                return self._cached_token
+        self._cached_token = {}
+        return self._cached_token
+
+    def _credentials_mtime(self) -> Optional[float]:
+        """
+        Get the modification time of the credentials file, or None if it doesn't exist.
+        """
+        try:
+            return os.stat(self.local_credentials_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
 
     def _write_credentials(self, token: str):
         """
@@ -131,7 +234,7 @@ class DeployKFCredentialsOutOfBand(TokenCredentialsBase):
         credentials_data = {}
         if os.path.exists(self.local_credentials_path):
             with open(self.local_credentials_path, "r") as f:
-                data = json.load(f)
+                credentials_data = json.load(f)
 
         # Update the credentials for the given issuer
         credentials_data[self.oidc_issuer] = token
@@ -140,6 +243,9 @@ class DeployKFCredentialsOutOfBand(TokenCredentialsBase):
         with open(self.local_credentials_path, "w") as f:
             json.dump(credentials_data, f)
 
+        self._cached_token = token
+        self._cached_token_mtime = self._credentials_mtime()
+
     def _generate_pkce_verifier(self) -> (str, str):
         """
         Generate a PKCE code verifier and its derived challenge.
@@ -226,12 +332,28 @@ class DeployKFCredentialsOutOfBand(TokenCredentialsBase):
         Get the current auth token.
         Will attempt to use "refresh_token" before prompting the user to login again.
         """
-        # return the existing token, if it's valid for at least 5 minutes
+        with self._token_lock:
+            return self._get_token()
+
+    def _get_token(self) -> str:
+        # return the in-memory token, if it's valid for at least 5 minutes
+        # and the credentials file was not modified by another process
+        if self._cached_token and self._cached_token_mtime == self._credentials_mtime():
+            expires_in = self._cached_token.get("expires_at", 0) - time.time()
+            if expires_in > self.token_refresh_window:
+                self.token_cache_stats["hits"] += 1
+                self.log.debug(
+                    "Using in-memory auth token (expires in %d seconds)", expires_in
+                )
+                return self._cached_token["id_token"]
+
+        # return the stored token, if it's valid for at least 5 minutes
+        self.token_cache_stats["misses"] += 1
         stored_token = self._read_credentials()
         if stored_token:
             expires_at = stored_token.get("expires_at", 0)
             expires_in = expires_at - time.time()
-            if expires_in > 300:
+            if expires_in > self.token_refresh_window:
                 self.log.info(
                     "Using cached auth token (expires in %d seconds)", expires_in
                 )
@@ -244,16 +366,14 @@ class DeployKFCredentialsOutOfBand(TokenCredentialsBase):
             else:
                 self.log.warning("Existing auth token has expired!")
 
-        oauth_session = OAuth2Session(
-            self.oidc_client_id,
-            redirect_uri=self.oidc_redirect_uri,
-            scope=self.oidc_scope,
-            token=stored_token,
-        )
+        oauth_session = self._create_oauth_session(stored_token)
 
         # try to refresh the token, or start a new login flow
         new_token = self._refresh_token(oauth_session)
-        if not new_token:
+        if new_token:
+            self.token_cache_stats["refreshes"] += 1
+        else:
+            self.token_cache_stats["logins"] += 1
             new_token = self._login(oauth_session)
 
         return new_token["id_token"]
@@ -265,18 +385,22 @@ class DeployKFCredentialsOutOfBand(TokenCredentialsBase):
 
 # creates a patched client that supports disabling SSL verification
 # required before kfp v2: https://github.com/kubeflow/pipelines/pull/7174
-def patched_kfp_client(verify_ssl=True):
-    _original_load_config = kfp.Client._load_config
+_patched_kfp_clients = {}
+
 
-    def _patched_load_config(client_self, *args, **kwargs):
-        config = _original_load_config(client_self, *args, **kwargs)
-        config.verify_ssl = verify_ssl
-        return config
+def patched_kfp_client(verify_ssl=True):
+    # the patched class is created once per verify_ssl value, instead of
+    # re-patching kfp.Client._load_config on every call
+    if verify_ssl not in _patched_kfp_clients:
+        class _PatchedClient(kfp.Client):
+            def _load_config(client_self, *args, **kwargs):
+                config = super()._load_config(*args, **kwargs)
+                config.verify_ssl = verify_ssl
+                return config
 
-    _patched_client = kfp.Client
-    _patched_client._load_config = _patched_load_config
+        _patched_kfp_clients[verify_ssl] = _PatchedClient
 
-    return _patched_client
+    return _patched_kfp_clients[verify_ssl]
 
 
 def create_kfp_client(host="https://10-101-20-33.sslip.io", namespace='kubeflow', verify_ssl=False):
@@ -290,3 +414,105 @@ def create_kfp_client(host="https://10-101-20-33.sslip.io", namespace='kubeflow'
         credentials=credentials,
         namespace=namespace
     )
+
+
+KFP_CLIENT_IDLE_TIMEOUT = 30 * 60
+
+
+class KFPClientPool:
+    """
+    A process-wide pool of authenticated KFP clients.
+
+    Keeps one client per (host, namespace, verify_ssl), so repeated submissions skip the
+    OIDC discovery, credential lookup and client construction. Clients that were not looked
+    up for `idle_timeout` seconds are evicted from the pool. An evicted client is closed once
+    the last reference to it is dropped, so clients still used by a `RunMonitor` or a
+    `LogFollower` keep working.
+    """
+
+    def __init__(self, idle_timeout: float = KFP_CLIENT_IDLE_TIMEOUT):
+        """
+        Initialize a KFPClientPool instance.
+
+        :param idle_timeout: seconds after which an unused client is evicted
+        """
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._clients = {}
+
+    def get(self, host="https://10-101-20-33.sslip.io", namespace='kubeflow', verify_ssl=False) -> kfp.Client:
+        """
+        Get the pooled client for the given host and namespace, creating it if necessary.
+        """
+        self.evict_idle()
+
+        key = (host, namespace, verify_ssl)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # only one thread performs the handshake for a given key
+        with key_lock:
+            with self._lock:
+                if key in self._clients:
+                    client, _ = self._clients[key]
+                    self._clients[key] = (client, time.monotonic())
+                    return client
+
+            client = create_kfp_client(host=host, namespace=namespace, verify_ssl=verify_ssl)
+            weakref.finalize(client, _close_api_client, client._run_api.api_client)
+            with self._lock:
+                self._clients[key] = (client, time.monotonic())
+            return client
+
+    def evict_idle(self):
+        """
+        Remove all clients that were not looked up within the idle timeout.
+
+        The clients are not closed here, as they may still be in use, each is closed once it is no longer referenced.
+        """
+        now = time.monotonic()
+        with self._lock:
+            idle_keys = [
+                key for key, (_, last_used) in self._clients.items()
+                if now - last_used > self.idle_timeout
+            ]
+            for key in idle_keys:
+                del self._clients[key]
+
+    def close(self):
+        """
+        Close and remove all pooled clients.
+        """
+        with self._lock:
+            clients = [client for client, _ in self._clients.values()]
+            self._clients.clear()
+
+        for client in clients:
+            _close_kfp_client(client)
+
+
+def _close_api_client(api_client):
+    api_client.close()
+    api_client.rest_client.pool_manager.clear()
+
+
+def _close_kfp_client(client: kfp.Client):
+    _close_api_client(client._run_api.api_client)
+
+
+_kfp_client_pool = KFPClientPool()
+
+
+def get_kfp_client(host="https://10-101-20-33.sslip.io", namespace='kubeflow', verify_ssl=False):
+    """
+    Get an authenticated KFP client from the process-wide pool.
+    """
+    return _kfp_client_pool.get(host=host, namespace=namespace, verify_ssl=verify_ssl)
+
+
+def close_kfp_clients():
+    """
+    Close all clients held by the process-wide pool.
+    """
+    _kfp_client_pool.close()
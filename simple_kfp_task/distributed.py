@@ -0,0 +1,197 @@
+import json
+
+import yaml
+
+DISTRIBUTED_MASTER_PORT = 29500
+DISTRIBUTED_TF_PORT = 2222
+RANK_LABEL = 'simple-kfp-task/rank'
+WORKFLOW_LABEL = 'workflows.argoproj.io/workflow'
+RESOURCE_NAMES = ('cpu', 'memory')
+
+
+def rank_service_name(rank: int) -> str:
+    """
+    Returns the name of the headless service addressing the pod of a rank, unique per run.
+
+    Args:
+        rank (int): The rank.
+
+    Returns:
+        str: The service name, with the workflow name filled in by Argo.
+    """
+    return f'{{{{workflow.name}}}}-rank-{rank}'
+
+
+def rank_service_manifest(rank: int) -> dict:
+    """
+    Builds the headless service addressing the pod of a rank.
+
+    The service selects the pod by its workflow and rank labels and publishes it before it is ready, as the
+    pod is never ready once its git-clone sidecar has exited. It is owned by the workflow, so it is deleted with the run.
+
+    Args:
+        rank (int): The rank.
+
+    Returns:
+        dict: The service manifest.
+    """
+    return {
+        'apiVersion': 'v1',
+        'kind': 'Service',
+        'metadata': {
+            'name': rank_service_name(rank),
+            'ownerReferences': [{
+                'apiVersion': 'argoproj.io/v1alpha1',
+                'kind': 'Workflow',
+                'name': '{{workflow.name}}',
+                'uid': '{{workflow.uid}}',
+            }],
+        },
+        'spec': {
+            'clusterIP': 'None',
+            'publishNotReadyAddresses': True,
+            'selector': {WORKFLOW_LABEL: '{{workflow.name}}', RANK_LABEL: str(rank)},
+            'ports': [
+                {'name': 'torch', 'port': DISTRIBUTED_MASTER_PORT},
+                {'name': 'tensorflow', 'port': DISTRIBUTED_TF_PORT},
+            ],
+        },
+    }
+
+
+def distributed_env(rank: int, replicas: int) -> dict:
+    """
+    Builds the rendezvous environment of a rank, for torch.distributed (`init_method='env://'`) and TensorFlow
+    (`TF_CONFIG`, e.g. for `tf.distribute.MultiWorkerMirroredStrategy`, with rank 0 as chief).
+
+    Args:
+        rank (int): The rank.
+        replicas (int): The number of ranks.
+
+    Returns:
+        dict: The environment variables.
+    """
+    return {
+        'MASTER_ADDR': rank_service_name(0),
+        'MASTER_PORT': str(DISTRIBUTED_MASTER_PORT),
+        'WORLD_SIZE': str(replicas),
+        'RANK': str(rank),
+        'TF_CONFIG': json.dumps({
+            'cluster': {'worker': [f'{rank_service_name(worker)}:{DISTRIBUTED_TF_PORT}' for worker in range(replicas)]},
+            'task': {'type': 'worker', 'index': rank},
+        }),
+    }
+
+
+def _container_resources(template: dict) -> dict:
+    """
+    Returns the requests and limits of the main container of a template, including those set from pipeline
+    parameters, which KFP compiles into a pod spec patch.
+    """
+    resources = template['container'].get('resources') or {}
+    result = {kind: dict(resources.get(kind) or {}) for kind in ('requests', 'limits')}
+    if 'podSpecPatch' in template:
+        for container in json.loads(template['podSpecPatch']).get('containers', []):
+            if container.get('name') == 'main':
+                for kind in result:
+                    result[kind].update(container.get('resources', {}).get(kind) or {})
+    return result
+
+
+def check_distributed_package(package_path: str, replicas: int, gpu: bool = False):
+    """
+    Checks the rank wiring and resource settings of a compiled distributed pipeline package offline.
+
+    Every rank 0..N-1 must run exactly once with a consistent rendezvous environment, be selected by its own
+    headless service, start after all services exist, and request the same CPU, memory and (if `gpu` is set)
+    GPU resources as the other ranks.
+
+    Args:
+        package_path (str): The path of the pipeline package.
+        replicas (int): The expected number of ranks.
+        gpu (bool, optional): Whether the ranks are expected to request GPUs. Defaults to False.
+
+    Raises:
+        ValueError: If the package does not match, listing all problems found.
+    """
+    with open(package_path, 'r') as f:
+        workflow = yaml.safe_load(f)
+
+    templates = {template['name']: template for template in workflow['spec']['templates']}
+    dag_tasks = [task for template in templates.values() for task in template.get('dag', {}).get('tasks', [])]
+    problems = []
+
+    services = {}
+    for name, template in templates.items():
+        manifest = yaml.safe_load(template['resource']['manifest']) if 'resource' in template else None
+        if manifest and manifest.get('kind') == 'Service':
+            services[manifest['metadata']['name']] = (name, manifest)
+
+    ranks = {}
+    for name, template in templates.items():
+        env = {var['name']: var.get('value') for var in (template.get('container') or {}).get('env') or []}
+        if 'RANK' in env:
+            if env['RANK'] in ranks:
+                problems.append(f"rank {env['RANK']} is run by {ranks[env['RANK']][0]} and {name}")
+            ranks[env['RANK']] = (name, template, env)
+
+    if sorted(ranks) != sorted(str(rank) for rank in range(replicas)):
+        problems.append(f"expected ranks 0..{replicas - 1}, found {sorted(ranks, key=int)}")
+
+    workers = [f'{rank_service_name(rank)}:{DISTRIBUTED_TF_PORT}' for rank in range(replicas)]
+    service_tasks = {task['name'] for task in dag_tasks if task['template'] in {name for name, _ in services.values()}}
+    reference_resources = None
+
+    for rank, (name, template, env) in sorted(ranks.items(), key=lambda item: int(item[0])):
+        if env.get('WORLD_SIZE') != str(replicas):
+            problems.append(f"{name}: WORLD_SIZE is {env.get('WORLD_SIZE')}, expected {replicas}")
+        if env.get('MASTER_ADDR') != rank_service_name(0):
+            problems.append(f"{name}: MASTER_ADDR is {env.get('MASTER_ADDR')}, expected {rank_service_name(0)}")
+        if env.get('MASTER_PORT') != str(DISTRIBUTED_MASTER_PORT):
+            problems.append(f"{name}: MASTER_PORT is {env.get('MASTER_PORT')}, expected {DISTRIBUTED_MASTER_PORT}")
+
+        try:
+            tf_config = json.loads(env.get('TF_CONFIG') or '')
+            if tf_config['cluster']['worker'] != workers or tf_config['task'] != {'type': 'worker', 'index': int(rank)}:
+                problems.append(f"{name}: TF_CONFIG does not match rank {rank} of {replicas}")
+        except (ValueError, KeyError, TypeError):
+            problems.append(f"{name}: TF_CONFIG is missing or invalid")
+
+        labels = template.get('metadata', {}).get('labels', {})
+        if labels.get(RANK_LABEL) != rank:
+            problems.append(f"{name}: pod label {RANK_LABEL} is {labels.get(RANK_LABEL)}, expected {rank}")
+
+        service = services.get(rank_service_name(int(rank)))
+        if service is None:
+            problems.append(f"{name}: no service {rank_service_name(int(rank))}")
+        else:
+            spec = service[1]['spec']
+            if spec.get('selector') != {WORKFLOW_LABEL: '{{workflow.name}}', RANK_LABEL: rank}:
+                problems.append(f"{name}: service {rank_service_name(int(rank))} does not select rank {rank}")
+            if spec.get('clusterIP') != 'None' or not spec.get('publishNotReadyAddresses'):
+                problems.append(f"{name}: service {rank_service_name(int(rank))} is not headless or hides unready pods")
+
+        dependencies = set()
+        for task in dag_tasks:
+            if task['template'] == name:
+                dependencies.update(task.get('dependencies') or [])
+        if not service_tasks <= dependencies:
+            problems.append(f"{name}: does not wait for the services {sorted(service_tasks - dependencies)}")
+
+        resources = _container_resources(template)
+        for kind in ('requests', 'limits'):
+            for resource in RESOURCE_NAMES:
+                if resource not in resources[kind]:
+                    problems.append(f"{name}: no {resource} {kind[:-1]}")
+        gpu_resources = [resource for resource in resources['limits'] if resource not in RESOURCE_NAMES]
+        if gpu and not gpu_resources:
+            problems.append(f"{name}: no GPU limit")
+        if not gpu and gpu_resources:
+            problems.append(f"{name}: unexpected GPU limit {gpu_resources}")
+        if reference_resources is None:
+            reference_resources = resources
+        elif resources != reference_resources:
+            problems.append(f"{name}: resources differ from rank 0")
+
+    if problems:
+        raise ValueError("Invalid distributed pipeline:\n" + "\n".join(problems))
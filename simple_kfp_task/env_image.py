@@ -0,0 +1,183 @@
+import os
+import re
+import json
+import base64
+import hashlib
+from typing import List
+
+import requests
+
+from simple_kfp_task.utils import compress_string
+
+ENV_IMAGE_TAG_PREFIX = 'env-'
+DOCKER_HUB_REGISTRY = 'registry-1.docker.io'
+DOCKER_HUB_CONFIG_KEYS = ('index.docker.io/v1', 'index.docker.io', 'docker.io')
+MANIFEST_MEDIA_TYPES = ', '.join([
+    'application/vnd.oci.image.index.v1+json',
+    'application/vnd.oci.image.manifest.v1+json',
+    'application/vnd.docker.distribution.manifest.list.v2+json',
+    'application/vnd.docker.distribution.manifest.v2+json',
+])
+
+
+def build_env_dockerfile(container_image: str, requirements: str, packages: List[str], locked: bool = False) -> str:
+    """
+    Generates a Dockerfile installing the requirements and packages on top of the container image.
+
+    The requirements are inlined, so the Dockerfile needs no build context.
+
+    Args:
+        container_image (str): The base image.
+        requirements (str): The content of the requirements file (or the lock of requirements and packages).
+        packages (List[str]): The additional packages, ignored if `locked` is set.
+        locked (bool, optional): Whether `requirements` is a lock, which is installed without resolving. Defaults to False.
+
+    Returns:
+        str: The Dockerfile.
+    """
+    if not locked:
+        requirements = "\n".join([requirements.rstrip("\n"), *packages]).lstrip("\n")
+    encoded = base64.b64encode(compress_string(requirements)).decode('utf-8')
+    pip_options = "--no-deps --require-hashes " if locked else ""
+
+    return (
+        f"FROM {container_image}\n"
+        f"RUN python -c \"import base64, gzip; open('/tmp/requirements.txt', 'wb')"
+        f".write(gzip.decompress(base64.b64decode('{encoded}')))\" \\\n"
+        f"    && pip install --no-cache-dir {pip_options}-r /tmp/requirements.txt \\\n"
+        f"    && rm /tmp/requirements.txt\n"
+    )
+
+
+def env_image_fingerprint(dockerfile: str) -> str:
+    """
+    Computes the fingerprint of an environment image from its Dockerfile, which holds the base
+    image, the requirements and the packages.
+
+    Args:
+        dockerfile (str): The Dockerfile of the image.
+
+    Returns:
+        str: The fingerprint.
+    """
+    return hashlib.sha256(dockerfile.encode('utf-8')).hexdigest()[:32]
+
+
+def parse_image_reference(image: str):
+    """
+    Splits an image reference into registry, repository and tag.
+
+    Args:
+        image (str): The image reference, e.g. `localhost:5000/envs/app:env-1234`.
+
+    Returns:
+        tuple: The registry host, the repository and the tag (defaults to 'latest').
+    """
+    name, _, tag = image.rpartition(':') if ':' in image.rsplit('/', 1)[-1] else (image, '', 'latest')
+    first, _, rest = name.partition('/')
+    if rest and ('.' in first or ':' in first or first == 'localhost'):
+        registry, repository = first, rest
+    else:
+        registry, repository = DOCKER_HUB_REGISTRY, name
+        if '/' not in repository:
+            repository = f'library/{repository}'
+    return registry, repository, tag
+
+
+def registry_credentials(registry: str, docker_config: str = None):
+    """
+    Looks up the credentials of a registry in the docker config written by `docker login`.
+
+    Credential helpers (`credsStore`, `credHelpers`) are not supported.
+
+    Args:
+        registry (str): The registry host.
+        docker_config (str, optional): The path of the docker config. Defaults to 'config.json' in `$DOCKER_CONFIG`
+            or '~/.docker'.
+
+    Returns:
+        tuple: The username and password, or None if the config holds no credentials for the registry.
+    """
+    if docker_config is None:
+        docker_config = os.path.join(os.environ.get('DOCKER_CONFIG', os.path.join(os.path.expanduser('~'), '.docker')),
+                                     'config.json')
+    try:
+        with open(docker_config, 'r') as f:
+            auths = json.load(f).get('auths', {})
+    except (OSError, ValueError):
+        return None
+
+    # keys are written as host or as URL, e.g. 'https://index.docker.io/v1/' for Docker Hub
+    auths = {key.split('://')[-1].rstrip('/'): entry for key, entry in auths.items()}
+    for key in (registry, *(DOCKER_HUB_CONFIG_KEYS if registry == DOCKER_HUB_REGISTRY else ())):
+        entry = auths.get(key) or {}
+        if entry.get('auth'):
+            username, _, password = base64.b64decode(entry['auth']).decode('utf-8').partition(':')
+            return username, password
+        if entry.get('username'):
+            return entry['username'], entry.get('password', '')
+    return None
+
+
+def _registry_token(session: requests.Session, challenge: str, verify_ssl: bool, credentials=None):
+    """
+    Fetches a bearer token for a `WWW-Authenticate: Bearer ...` challenge, anonymous if no credentials are given.
+    """
+    params = dict(re.findall(r'(\w+)="([^"]*)"', challenge))
+    realm = params.pop('realm', None)
+    if realm is None:
+        return None
+    response = session.get(realm, params=params, auth=credentials, timeout=15, verify=verify_ssl)
+    response.raise_for_status()
+    token = response.json()
+    return token.get('token') or token.get('access_token')
+
+
+def image_exists(image: str, insecure: bool = False, verify_ssl: bool = True, docker_config: str = None) -> bool:
+    """
+    Checks if an image is present in its registry through the registry HTTP API v2.
+
+    Registries requiring authentication are queried with the credentials of the docker config (see
+    `registry_credentials`), or anonymously if it holds none for the registry.
+
+    Args:
+        image (str): The image reference.
+        insecure (bool, optional): Whether to query the registry over plain HTTP. Defaults to False.
+        verify_ssl (bool, optional): Whether to verify the registry's certificate. Defaults to True.
+        docker_config (str, optional): The path of the docker config holding the registry credentials.
+            Defaults to '~/.docker/config.json'.
+
+    Returns:
+        bool: True if the manifest of the image exists, False otherwise.
+
+    Raises:
+        ValueError: If the registry denies access to the image.
+    """
+    registry, repository, tag = parse_image_reference(image)
+    url = f"{'http' if insecure else 'https'}://{registry}/v2/{repository}/manifests/{tag}"
+    headers = {'Accept': MANIFEST_MEDIA_TYPES}
+    credentials = registry_credentials(registry, docker_config)
+
+    with requests.Session() as session:
+        response = session.head(url, headers=headers, timeout=15, verify=verify_ssl)
+        challenge = response.headers.get('WWW-Authenticate', '')
+        if response.status_code == 401 and challenge.lower().startswith('bearer'):
+            token = _registry_token(session, challenge, verify_ssl, credentials)
+            if token:
+                headers['Authorization'] = f'Bearer {token}'
+                response = session.head(url, headers=headers, timeout=15, verify=verify_ssl)
+        elif response.status_code == 401 and credentials:
+            response = session.head(url, headers=headers, auth=credentials, timeout=15, verify=verify_ssl)
+
+    if response.status_code == 200:
+        return True
+    if response.status_code == 404:
+        return False
+    if response.status_code in (401, 403):
+        # treating this as a missing image would rebuild and push the image on every run
+        raise ValueError(
+            f"Registry {registry} denied access to {image} ({response.status_code}), "
+            f"log in with `docker login {registry}` to look up environment images."
+        )
+    response.raise_for_status()
+    return False
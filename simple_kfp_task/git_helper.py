@@ -1,6 +1,61 @@
 import os
 import sys
-from git import Repo
+import shutil
+import tempfile
+import functools
+from git import Repo, Git, GitCommandError
+from git.refs.symbolic import SymbolicReference
+
+_snapshot_cache = {}
+
+
+@functools.lru_cache(maxsize=256)
+def _is_commit_on_remote(working_dir, commit, remote, branch, remote_refs):
+    """
+    Checks if a commit is reachable from the refs of a remote.
+
+    The result is cached per commit and state of the remote refs (`remote_refs` is the
+    output of `git for-each-ref` for the remote), so it is recomputed once the remote refs move.
+    """
+    git = Git(working_dir)
+
+    # the target branch usually contains the commit, ancestry checks stop early
+    if branch and any(ref.endswith(f" refs/remotes/{remote}/{branch}") for ref in remote_refs):
+        try:
+            git.merge_base("--is-ancestor", commit, f"refs/remotes/{remote}/{branch}")
+            return True
+        except GitCommandError as e:
+            if e.status != 1:
+                return False
+
+    # otherwise look for any remote ref which contains the commit
+    try:
+        return bool(git.for_each_ref("--count=1", "--format=%(refname)", "--contains", commit, f"refs/remotes/{remote}"))
+    except GitCommandError:
+        return False
+
+
+class RepoSnapshot:
+    """
+    The state of a Git repository needed to submit a task, collected in a single pass.
+
+    Attributes:
+        working_dir (str): The root directory of the repository.
+        remote_url (str): The URL of the remote, or None if the remote does not exist.
+        branch (str): The branch the snapshot was taken for.
+        head_commit (str): The SHA hash of HEAD.
+        branch_on_remote (bool): True if the branch is available on the remote.
+        remote_commit (str): The SHA hash of the branch on the remote, or None if it is not available.
+    """
+
+    def __init__(self, working_dir, remote_url, branch, head_commit, branch_on_remote, remote_commit):
+        self.working_dir = working_dir
+        self.remote_url = remote_url
+        self.branch = branch
+        self.head_commit = head_commit
+        self.branch_on_remote = branch_on_remote
+        self.remote_commit = remote_commit
+
 
 class GitHelper:
     """
@@ -33,18 +88,97 @@ class GitHelper:
         except:
             return None
 
-    def is_git_dirty(self):
+    def is_git_dirty(self, include_untracked=False):
         """
         Checks if the Git repository has any uncommitted changes.
 
+        Args:
+            include_untracked (bool, optional): Whether untracked (not ignored) files count as changes. Defaults to False.
+
         Returns:
             bool: True if the repository is dirty, False otherwise.
         """
         try:
-            return self.repo.is_dirty()
+            untracked_files = "normal" if include_untracked else "no"
+            return bool(self.repo.git.status("--porcelain", f"--untracked-files={untracked_files}"))
         except:
             return False
 
+    def snapshot(self, remote='origin', branch=None):
+        """
+        Collects the repository state needed to submit a task.
+
+        The state is read from the refs and config files without starting git, and is cached
+        until HEAD, the index, the config or the refs of the branch change.
+
+        Args:
+            remote (str, optional): The name of the remote. Defaults to 'origin'.
+            branch (str, optional): The name of the branch. Defaults to None (current branch).
+
+        Returns:
+            RepoSnapshot: The state of the repository.
+        """
+        key = (self.repo.git_dir, remote, branch)
+        stamp = self._snapshot_stamp(remote, branch)
+        cached = _snapshot_cache.get(key)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+        if branch is None:
+            branch = self.get_current_branch()
+
+        try:
+            head_commit = SymbolicReference.dereference_recursive(self.repo, "HEAD")
+        except:
+            head_commit = None
+
+        remote_commit = None
+        try:
+            remote_ref = self.repo.remotes[remote].refs[branch]
+            remote_commit = SymbolicReference.dereference_recursive(self.repo, remote_ref.path)
+        except:
+            pass
+
+        snapshot = RepoSnapshot(
+            working_dir=self.repo.working_tree_dir,
+            remote_url=self.get_remote_url(remote),
+            branch=branch,
+            head_commit=head_commit,
+            branch_on_remote=remote_commit is not None,
+            remote_commit=remote_commit,
+        )
+        _snapshot_cache[key] = (stamp, snapshot)
+        return snapshot
+
+    def _snapshot_stamp(self, remote, branch):
+        git_dir = self.repo.git_dir
+        common_dir = self.repo.common_dir
+        paths = [
+            os.path.join(git_dir, "HEAD"),
+            os.path.join(git_dir, "index"),
+            os.path.join(common_dir, "config"),
+            os.path.join(common_dir, "packed-refs"),
+        ]
+        try:
+            with open(os.path.join(git_dir, "HEAD"), "r") as f:
+                head = f.read().strip()
+        except OSError:
+            head = None
+        if head and head.startswith("ref: "):
+            paths.append(os.path.join(common_dir, head[len("ref: "):]))
+            if branch is None:
+                branch = head[len("ref: refs/heads/"):]
+        if branch:
+            paths.append(os.path.join(common_dir, "refs", "remotes", remote, branch))
+
+        stamp = [head]
+        for path in paths:
+            try:
+                stamp.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
     def get_current_branch(self):
         """
         Retrieves the name of the current branch.
@@ -86,20 +220,38 @@ class GitHelper:
         except:
             return None
 
-    def build_git_diff(self, commit=None):
+    def build_git_diff(self, commit=None, include_untracked=False, remote='origin', branch=None):
         """
         Builds the diff between the specified commit and the current branch.
 
         Args:
-            commit (str, optional): The SHA hash of the commit to compare with. Defaults to None.
+            commit (str, optional): The SHA hash of the commit to compare with. Defaults to the branch on the remote.
+            include_untracked (bool, optional): Whether to include untracked (not ignored) files as binary diff. Defaults to False.
+            remote (str, optional): The name of the remote to compare with if no commit is given. Defaults to 'origin'.
+            branch (str, optional): The branch to compare with if no commit is given. Defaults to the current branch,
+                a detached HEAD has none.
 
         Returns:
             str: The diff between the specified commit and the current branch, or None if the diff cannot be generated.
         """
         try:
-            remote_branch = self.repo.remotes.origin.refs[self.repo.active_branch.name]
-            diff = self.repo.git.diff(commit if commit else remote_branch.commit)
-            return diff
+            # a given commit is diffed against directly, the branch does not have to exist on any remote
+            if not commit:
+                branch = branch or self.get_current_branch()
+                if branch is None:
+                    return None
+                commit = self.repo.remotes[remote].refs[branch].commit.hexsha
+            if not include_untracked:
+                return self.repo.git.diff(commit)
+
+            # mark untracked files as intent-to-add in a copy of the index, so they
+            # show up in the diff without touching the user's index
+            with tempfile.TemporaryDirectory() as tmpdir:
+                index_file = os.path.join(tmpdir, "index")
+                shutil.copyfile(os.path.join(self.repo.git_dir, "index"), index_file)
+                env = {"GIT_INDEX_FILE": index_file}
+                self.repo.git.add("--intent-to-add", "--all", env=env)
+                return self.repo.git.diff("--binary", commit, env=env)
         except Exception as e:
             return None
 
@@ -124,25 +276,73 @@ class GitHelper:
         except:
             return False
 
-    def is_commit_available_on_remote(self, commit):
+    def is_commit_available_on_remote(self, commit, remote='origin', branch=None):
         """
         Checks if the specified commit is available on the remote.
 
         Args:
             commit (str): The SHA hash of the commit.
+            remote (str, optional): The name of the remote. Defaults to 'origin'.
+            branch (str, optional): The branch expected to contain the commit, checked first. Defaults to None.
 
         Returns:
             bool: True if the commit is available on the remote, False otherwise.
         """
         try:
-            remote_branches = self.repo.remotes.origin.refs
-            for branch in remote_branches:
-                if commit in self.repo.git.rev_list(branch):
-                    return True
-            return False
+            commit = self.repo.git.rev_parse("--verify", "--quiet", f"{commit}^{{commit}}")
+            remote_refs = self.repo.git.for_each_ref("--format=%(objectname) %(refname)", f"refs/remotes/{remote}")
+            remote_refs = tuple(remote_refs.splitlines())
+            return _is_commit_on_remote(self.repo.working_dir, commit, remote, branch, remote_refs)
         except:
             return False
 
+    def get_pushed_ancestor(self, remote='origin', branch=None):
+        """
+        Finds the nearest ancestor of HEAD which is available on the remote.
+
+        Args:
+            remote (str, optional): The name of the remote. Defaults to 'origin'.
+            branch (str, optional): The remote branch preferred to contain the ancestor. Defaults to None.
+
+        Returns:
+            tuple: The SHA hash of the ancestor and the name of a remote branch containing it,
+                or None if HEAD itself is available on the remote.
+
+        Raises:
+            ValueError: If no ancestor of HEAD is available on the remote.
+        """
+        revisions = self.repo.git.rev_list("--boundary", "HEAD", "--not", f"--remotes={remote}").split()
+        if not revisions:
+            return None
+
+        boundary = [revision[1:] for revision in revisions if revision.startswith("-")]
+        if not boundary:
+            raise ValueError(f"No commit of the current branch is available on remote {remote}.")
+
+        ancestor = boundary[0]
+        remote_branches = self.repo.git.for_each_ref(
+            "--format=%(refname:lstrip=3)", "--contains", ancestor, f"refs/remotes/{remote}").split()
+        remote_branches = [remote_branch for remote_branch in remote_branches if remote_branch != "HEAD"]
+        if branch in remote_branches:
+            return ancestor, branch
+        return ancestor, remote_branches[0]
+
+    def build_git_bundle(self, remote='origin'):
+        """
+        Builds a thin bundle with the commits of HEAD which are missing on the remote.
+
+        Args:
+            remote (str, optional): The name of the remote. Defaults to 'origin'.
+
+        Returns:
+            bytes: The content of the bundle, its HEAD ref points to the local HEAD.
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            bundle_file = os.path.join(tmpdir, "git.bundle")
+            self.repo.git.bundle("create", bundle_file, "HEAD", "--not", f"--remotes={remote}")
+            with open(bundle_file, "rb") as f:
+                return f.read()
+
     def get_git_root(self, path):
         """
         Retrieves the root directory of the Git repository.
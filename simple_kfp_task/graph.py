@@ -0,0 +1,185 @@
+import os
+import re
+import datetime
+from collections import namedtuple
+from typing import List
+
+TaskGraphStep = namedtuple('TaskGraphStep', ['name', 'command', 'args', 'after', 'resources'])
+
+STEP_NAME_PATTERN = re.compile(r'^[a-z0-9]([a-z0-9-]*[a-z0-9])?$')
+GRAPH_PIPELINE_PARAMETERS = (
+    'remote_url', 'branch', 'commit', 'cwd', 'requirements', 'packages', 'git_diff', 'git_diff_url', 'git_diff_digest',
+    'git_bundle_url', 'git_bundle_digest', 'requirements_lock', 'container_image'
+)
+
+
+class TaskGraph:
+    """
+    Runs several commands of the repository as the steps of one KFP DAG.
+
+    The repository is checked out and the dependencies are installed once into a workspace volume created for the run,
+    which all steps share. A step runs after the steps it depends on, independent steps run in parallel. Each step writes
+    its outputs to `$STEP_OUTPUT_DIR`, later steps read them from `$WORKSPACE_DIR/outputs/<step>`. The pipeline is compiled
+    once per set of steps and options and cached like the pipeline of a task.
+
+    Example:
+        graph = TaskGraph(requirements='requirements.txt')
+        graph.step('preprocess', 'preprocess.py')
+        graph.step('train', 'train.py', after=['preprocess'], gpu_limit=1)
+        graph.step('evaluate', 'evaluate.py', after=['preprocess'])
+        graph.run()
+
+    Args:
+        workspace_size (str, optional): The size of the workspace volume. Defaults to '10Gi'.
+        workspace_storage_class (str, optional): The storage class of the workspace volume. Defaults to the cluster default.
+        workspace_access_mode (str, optional): The access mode of the workspace volume. Parallel steps scheduled on different
+            nodes need 'ReadWriteMany'. Defaults to 'ReadWriteOnce'.
+        **task_kwargs: The options shared by all steps, as accepted by `Task` (e.g. `requirements`, `packages`,
+            `container_image`, `diff_store`, `git_mirror_pvc`). The step resources given here are the defaults of the steps.
+    """
+
+    def __init__(self, workspace_size: str = '10Gi', workspace_storage_class: str = None,
+                 workspace_access_mode: str = 'ReadWriteOnce', **task_kwargs):
+        self.workspace_size = workspace_size
+        self.workspace_storage_class = workspace_storage_class
+        self.workspace_access_mode = workspace_access_mode
+        self.task_kwargs = task_kwargs
+        self.steps: List[TaskGraphStep] = []
+
+    def step(self, name: str, command: str, args: List[str] = None, after: List[str] = None, gpu_limit=None,
+             gpu_vendor=None, cpu_limit=None, cpu_request=None, memory_limit=None, memory_request=None):
+        """
+        Add a step to the graph.
+
+        Args:
+            name (str): The name of the step, lowercase alphanumeric characters and '-'.
+            command (str): The script to run, relative to the current working directory.
+            args (List[str], optional): The arguments to pass to the script. Defaults to None.
+            after (List[str], optional): The names of the steps to run after. Defaults to None.
+            gpu_limit (int, optional): The GPU limit of the step. Defaults to the graph's.
+            gpu_vendor (str, optional): The GPU vendor of the step. Defaults to the graph's.
+            cpu_limit (str, optional): The CPU limit of the step. Defaults to the graph's.
+            cpu_request (str, optional): The CPU request of the step. Defaults to the graph's.
+            memory_limit (str, optional): The memory limit of the step. Defaults to the graph's.
+            memory_request (str, optional): The memory request of the step. Defaults to the graph's.
+
+        Returns:
+            TaskGraph: The graph, so steps can be chained.
+
+        Raises:
+            ValueError: If the name is invalid or already used, or a step to run after does not exist.
+        """
+        if not STEP_NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid step name {name}, use lowercase alphanumeric characters and '-'.")
+        names = [step.name for step in self.steps]
+        if name in names:
+            raise ValueError(f"Step {name} already exists.")
+        for upstream in after or []:
+            if upstream not in names:
+                raise ValueError(f"Step {name} runs after {upstream}, which does not exist.")
+
+        defaults = {
+            'gpu_limit': 0,
+            'gpu_vendor': 'nvidia.com/gpu',
+            'cpu_limit': "1",
+            'cpu_request': "0.5",
+            'memory_limit': "2Gi",
+            'memory_request': "1Gi",
+        }
+        overrides = {
+            'gpu_limit': gpu_limit,
+            'gpu_vendor': gpu_vendor,
+            'cpu_limit': cpu_limit,
+            'cpu_request': cpu_request,
+            'memory_limit': memory_limit,
+            'memory_request': memory_request,
+        }
+        resources = tuple(
+            (key, value if value is not None else self.task_kwargs.get(key, default))
+            for (key, default), value in zip(defaults.items(), overrides.values())
+        )
+
+        self.steps.append(TaskGraphStep(
+            name=name,
+            command=command,
+            args=" ".join(args) if args else "",
+            after=tuple(after or []),
+            resources=resources
+        ))
+        return self
+
+    def run(self, kfp_client=None):
+        """
+        Run the graph as one KFP run.
+
+        Args:
+            kfp_client (kfp.Client, optional): An authenticated client to submit with. Defaults to the pooled client for the
+                graph's host and namespace.
+
+        Returns:
+            RunPipelineResult: The KFP run created for the graph.
+
+        Raises:
+            ValueError: If the graph has no steps or a command does not exist.
+            ValueError: If the environment image of the graph does not exist yet.
+            ValueError: If an option of the graph is not supported by task graphs.
+            ValueError: If the Git diff or bundle is in a local `file://` artifact store.
+        """
+        from simple_kfp_task.task import Task, RunPipelineResult
+        from simple_kfp_task.deploykf import get_kfp_client
+        from simple_kfp_task.pipeline import get_pipeline_package, get_pipeline_version
+
+        if not self.steps:
+            raise ValueError("The graph has no steps.")
+        for step in self.steps:
+            if not os.path.exists(step.command):
+                raise ValueError(f"Command {step.command} of step {step.name} does not exist.")
+
+        # the source snapshot, dependencies and options shared by all steps
+        task = Task(command=self.steps[0].command, **self.task_kwargs)
+        if task.env_image_dockerfile:
+            raise ValueError(f"Environment image {task.env_image} does not exist yet, run a task with it first to build it.")
+        task._check_remote_artifacts()
+
+        # the workspace is prepared once per run and always checked out in an init container, the options of the
+        # single task pipeline that do not apply to it are rejected instead of being ignored
+        options = task.pipeline_options()
+        del options["shape"]
+        sweep, replicas = options.pop("sweep"), options.pop("replicas")
+        if sweep is not None or replicas is not None:
+            raise ValueError("Task graphs do not support sweeps or several replicas.")
+        if options["env_cache_pvc"] or options["env_cache_host_path"]:
+            raise ValueError("Task graphs do not support the environment cache, the workspace is installed once per run.")
+        if options["cache_staleness"]:
+            raise ValueError("Task graphs do not support step caching.")
+
+        if kfp_client is None:
+            kfp_client = get_kfp_client(namespace=task.namespace, host=task.kfp_host, verify_ssl=task.verify_ssl)
+
+        pipeline_package = get_pipeline_package(
+            graph=(tuple(self.steps), self.workspace_size, self.workspace_storage_class, self.workspace_access_mode),
+            **options
+        )
+
+        arguments = task.pipeline_arguments()
+        arguments = {key: arguments[key] for key in GRAPH_PIPELINE_PARAMETERS}
+        run_name = task.run_name or f"simple_task_graph {datetime.datetime.now().strftime('%Y-%m-%d %H-%M-%S')}"
+
+        if task.register_pipeline:
+            pipeline_id, version_id = get_pipeline_version(kfp_client, pipeline_package)
+            experiment = kfp_client.create_experiment(name=task.experiment_name or 'Default', namespace=task.namespace)
+            run_info = kfp_client.run_pipeline(
+                experiment_id=experiment.id,
+                job_name=run_name,
+                params=arguments,
+                pipeline_id=pipeline_id,
+                version_id=version_id
+            )
+            return RunPipelineResult(kfp_client, run_info)
+
+        return kfp_client.create_run_from_pipeline_package(
+            pipeline_file=pipeline_package,
+            experiment_name=task.experiment_name,
+            run_name=run_name,
+            arguments=arguments
+        )
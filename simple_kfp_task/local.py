@@ -0,0 +1,318 @@
+import os
+import sys
+import gzip
+import time
+import base64
+import shlex
+import shutil
+import hashlib
+import platform
+import tempfile
+import subprocess
+from collections import namedtuple
+
+import requests
+
+LOCAL_VENV_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "simple-kfp-task", "venvs")
+POD_APP_PATH = '/app'
+
+LocalRunResult = namedtuple('LocalRunResult', ['exit_code', 'phases'])
+
+
+def rx_bytes() -> int:
+    """
+    Returns the bytes received on the non-loopback network interfaces of the host, 0 where /proc/net/dev does not exist.
+    """
+    try:
+        with open('/proc/net/dev', 'r') as f:
+            lines = f.readlines()[2:]
+    except OSError:
+        return 0
+    total = 0
+    for line in lines:
+        interface, _, counters = line.partition(':')
+        if interface.strip() != 'lo':
+            total += int(counters.split()[0])
+    return total
+
+
+def fetch_blob(url: str, verify_ssl: bool = True) -> bytes:
+    """
+    Download a blob of the artifact store, like the task pod does.
+
+    Args:
+        url (str): The file:// or http(s):// URL of the blob.
+        verify_ssl (bool, optional): Whether to verify the SSL certificate. Defaults to True.
+
+    Returns:
+        bytes: The content of the blob.
+    """
+    if url.startswith('file://'):
+        with open(url[len('file://'):], 'rb') as f:
+            return f.read()
+    response = requests.get(url, timeout=60, verify=verify_ssl)
+    response.raise_for_status()
+    return response.content
+
+
+def venv_key(requirements: str, packages: str, requirements_lock: str, cwd: str) -> str:
+    """
+    Compute the key a cached virtual environment is stored by, covering the dependencies and the Python interpreter,
+    like the key of the environment cache of the task pod.
+    """
+    digest = hashlib.sha256()
+    if requirements_lock:
+        digest.update(gzip.decompress(base64.b64decode(requirements_lock)))
+    else:
+        if requirements and os.path.exists(os.path.join(cwd, requirements)):
+            with open(os.path.join(cwd, requirements), 'rb') as f:
+                digest.update(f.read())
+        digest.update(packages.encode('utf-8'))
+    digest.update(f"{sys.executable}\n{sys.version}\n{platform.machine()}".encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+
+class LocalExecutor:
+    """
+    Runs a task on this machine the way its pod would, without a cluster.
+
+    The commit is checked out into a throwaway `git worktree` of the local repository, the local commits of a
+    Git bundle and the Git diff are applied, the requirements and packages are installed into a virtual environment
+    and the command runs in `cwd` with `INSIDE_KFP_FUNC_CONTAINER` set. The clone, fetch, apply, install and command
+    phases are timed like in the pod, so local and remote runs can be compared with `format_breakdown`. Bytes are
+    counted on the network interfaces of the host, so they include traffic of other processes.
+
+    Args:
+        task (Task): The task to run.
+        venv_cache (bool, optional): Reuse the virtual environment of the same dependencies from
+            '~/.cache/simple-kfp-task/venvs' instead of installing them for every run. Defaults to True.
+        venv_cache_dir (str, optional): The directory virtual environments are cached in.
+    """
+
+    def __init__(self, task, venv_cache: bool = True, venv_cache_dir: str = LOCAL_VENV_CACHE_DIR):
+        self.task = task
+        self.venv_cache = venv_cache
+        self.venv_cache_dir = venv_cache_dir
+        self.phases = []
+        self._phase_started = None
+        self._phase_rx_bytes = 0
+
+    def _log(self, message: str):
+        print(message, flush=True)
+
+    def _phase_start(self):
+        self._phase_started = time.time()
+        self._phase_rx_bytes = rx_bytes()
+
+    def _phase_end(self, phase: str, exit_code: int):
+        end = time.time()
+        self.phases.append({
+            'phase': phase,
+            'start': self._phase_started,
+            'end': end,
+            'seconds': round(end - self._phase_started, 3),
+            'exit_code': exit_code,
+            'bytes_downloaded': rx_bytes() - self._phase_rx_bytes,
+        })
+
+    @staticmethod
+    def _run(args, cwd: str, input: bytes = None, env: dict = None) -> int:
+        sys.stdout.flush()
+        return subprocess.run(args, cwd=cwd, input=input, env=env).returncode
+
+    def _app_path(self, app_dir: str, path: str) -> str:
+        """
+        Map a path of the pod, where the repository is checked out to /app, into the worktree.
+        """
+        if path == POD_APP_PATH or path.startswith(f'{POD_APP_PATH}/'):
+            return os.path.normpath(os.path.join(app_dir, os.path.relpath(path, POD_APP_PATH)))
+        return os.path.join(app_dir, path)
+
+    def _fetch_blob(self, url: str, digest: str, decompress: bool = False):
+        """
+        Download a blob and verify its digest.
+
+        Returns:
+            bytes: The content of the blob, or None if it could not be downloaded or does not match the digest.
+        """
+        try:
+            blob = fetch_blob(url, verify_ssl=self.task.verify_ssl)
+            blob = gzip.decompress(blob) if decompress else blob
+        except (OSError, requests.RequestException) as e:
+            self._log(f"failed to download {url}: {e}")
+            return None
+        if hashlib.sha256(blob).hexdigest() != digest:
+            self._log(f"digest mismatch of {url}")
+            return None
+        return blob
+
+    def _checkout(self, repo_dir: str, app_dir: str) -> int:
+        """
+        Check out the commit and the local commits of the Git bundle into the worktree.
+        """
+        task = self.task
+        if self._run(['git', 'cat-file', '-e', f'{task.commit}^{{commit}}'], cwd=repo_dir) != 0:
+            exit_code = self._run(['git', 'fetch', task.remote_url, task.commit], cwd=repo_dir)
+            if exit_code != 0:
+                return exit_code
+        exit_code = self._run(['git', 'checkout', '--quiet', '--force', '--detach', task.commit], cwd=app_dir)
+        if exit_code != 0 or not task.git_bundle_url:
+            return exit_code
+
+        bundle = self._fetch_blob(task.git_bundle_url, task.git_bundle_digest)
+        if bundle is None:
+            return 1
+        bundle_path = os.path.join(os.path.dirname(app_dir), 'git.bundle')
+        with open(bundle_path, 'wb') as f:
+            f.write(bundle)
+        exit_code = self._run(['git', 'fetch', bundle_path, 'HEAD'], cwd=app_dir)
+        if exit_code != 0:
+            return exit_code
+        return self._run(['git', 'checkout', '--quiet', '--detach', 'FETCH_HEAD'], cwd=app_dir)
+
+    def _apply(self, app_dir: str) -> int:
+        """
+        Apply the inline or stored Git diff to the worktree.
+        """
+        task = self.task
+        if task.git_diff:
+            git_diff = gzip.decompress(base64.b64decode(task.git_diff))
+        else:
+            git_diff = self._fetch_blob(task.git_diff_url, task.git_diff_digest, decompress=True)
+            if git_diff is None:
+                return 1
+        return self._run(['git', 'apply', '--verbose', '-'], cwd=app_dir, input=git_diff)
+
+    def _pip_install(self, python: str, cwd: str) -> int:
+        """
+        Install the lock if given, falling back to resolving the requirements and packages, like the pod.
+        """
+        task = self.task
+        packages = list(task.packages or [])
+        if task.requirements_lock:
+            lock_path = os.path.join(tempfile.mkdtemp(prefix='simple-kfp-task-lock-'), 'requirements.lock')
+            with open(lock_path, 'wb') as f:
+                f.write(gzip.decompress(base64.b64decode(task.requirements_lock)))
+            exit_code = self._run([python, '-m', 'pip', 'install', '--no-deps', '--require-hashes', '-r', lock_path], cwd=cwd)
+            shutil.rmtree(os.path.dirname(lock_path), ignore_errors=True)
+            if exit_code == 0:
+                return 0
+            self._log("dependency lock does not match this interpreter, resolving instead")
+        if task.requirements:
+            exit_code = self._run([python, '-m', 'pip', 'install', '-r', task.requirements], cwd=cwd)
+            if exit_code != 0:
+                return exit_code
+        if packages:
+            return self._run([python, '-m', 'pip', 'install', *packages], cwd=cwd)
+        return 0
+
+    def _install(self, run_dir: str, cwd: str):
+        """
+        Install the requirements and packages into a virtual environment, cached or created for this run.
+
+        Returns:
+            tuple: The exit code and the Python interpreter to run the command with.
+        """
+        task = self.task
+        if not task.requirements and not task.packages:
+            return 0, sys.executable
+
+        if not self.venv_cache:
+            venv_dir = os.path.join(run_dir, 'venv')
+            exit_code = self._run([sys.executable, '-m', 'venv', '--system-site-packages', venv_dir], cwd=cwd)
+            python = os.path.join(venv_dir, 'bin', 'python')
+            return exit_code or self._pip_install(python, cwd), python
+
+        key = venv_key(task.requirements, " ".join(task.packages or []), task.requirements_lock, cwd)
+        venv_dir = os.path.join(self.venv_cache_dir, key)
+        python = os.path.join(venv_dir, 'bin', 'python')
+        os.makedirs(self.venv_cache_dir, exist_ok=True)
+
+        try:
+            import fcntl
+        except ImportError:
+            fcntl = None
+
+        # the environment is built once under an exclusive lock, so concurrent runs never use a partial one
+        with open(f"{venv_dir}.lock", 'w') as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            if os.path.exists(os.path.join(venv_dir, '.complete')):
+                self._log(f"venv cache: using environment {key}")
+                return 0, python
+
+            self._log(f"venv cache: building environment {key}")
+            shutil.rmtree(venv_dir, ignore_errors=True)
+            exit_code = self._run([sys.executable, '-m', 'venv', '--system-site-packages', venv_dir], cwd=cwd)
+            exit_code = exit_code or self._pip_install(python, cwd)
+            if exit_code != 0:
+                shutil.rmtree(venv_dir, ignore_errors=True)
+                return exit_code, python
+            open(os.path.join(venv_dir, '.complete'), 'w').close()
+            return 0, python
+
+    def run(self) -> LocalRunResult:
+        """
+        Run the task.
+
+        Returns:
+            LocalRunResult: The exit code of the task and its phases, in the format of the phase-timings artifact of the pod.
+
+        Raises:
+            ValueError: If the task uses an environment image, a sweep or several replicas, which only run on KFP.
+        """
+        from simple_kfp_task.git_helper import GitHelper
+
+        task = self.task
+        if task.env_image:
+            raise ValueError("Tasks with an environment image only run on KFP.")
+        if task.sweep_variants is not None or task.replicas > 1:
+            raise ValueError("Sweeps and distributed tasks only run on KFP.")
+
+        repo_dir = GitHelper().repo.working_tree_dir
+        run_dir = tempfile.mkdtemp(prefix='simple-kfp-task-')
+        app_dir = os.path.join(run_dir, 'app')
+        self.phases = []
+
+        try:
+            self._phase_start()
+            exit_code = self._run(['git', 'worktree', 'add', '--quiet', '--detach', '--no-checkout', app_dir], cwd=repo_dir)
+            self._phase_end('clone', exit_code)
+            if exit_code != 0:
+                return LocalRunResult(1, self.phases)
+
+            self._phase_start()
+            exit_code = self._checkout(repo_dir, app_dir)
+            self._phase_end('fetch', exit_code)
+            if exit_code != 0:
+                return LocalRunResult(1, self.phases)
+
+            if task.git_diff or task.git_diff_url:
+                self._phase_start()
+                exit_code = self._apply(app_dir)
+                self._phase_end('apply', exit_code)
+                if exit_code != 0:
+                    return LocalRunResult(1, self.phases)
+
+            cwd = self._app_path(app_dir, task.cwd)
+            if not os.path.isdir(cwd):
+                self._log(f"cwd {task.cwd} does not exist in the checkout")
+                return LocalRunResult(1, self.phases)
+
+            self._phase_start()
+            exit_code, python = self._install(run_dir, cwd)
+            self._phase_end('install', exit_code)
+            if exit_code != 0:
+                return LocalRunResult(exit_code, self.phases)
+
+            env = dict(os.environ, INSIDE_KFP_FUNC_CONTAINER='true')
+            self._phase_start()
+            exit_code = self._run([python, task.command, *shlex.split(" ".join(task.args or []))], cwd=cwd, env=env)
+            self._phase_end('command', exit_code)
+            return LocalRunResult(exit_code, self.phases)
+        finally:
+            self._run(['git', 'worktree', 'remove', '--force', app_dir], cwd=repo_dir)
+            shutil.rmtree(run_dir, ignore_errors=True)
+            self._run(['git', 'worktree', 'prune'], cwd=repo_dir)
+            self._log('phases: ' + ', '.join(f"{phase['phase']} {phase['seconds']:.2f}s" for phase in self.phases))
+
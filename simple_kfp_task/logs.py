@@ -0,0 +1,374 @@
+import sys
+import json
+import time
+from typing import Optional
+
+import requests
+
+from simple_kfp_task.monitor import RUN_FINAL_STATES, is_transient_error
+
+LOG_FOLLOW_MIN_INTERVAL = 2.0
+LOG_FOLLOW_MAX_INTERVAL = 30.0
+LOG_FOLLOW_BACKOFF = 1.5
+LOG_FOLLOW_MAX_RETRIES = 5
+LOG_CONTAINER = 'main'
+POD_FINAL_PHASES = ('Succeeded', 'Failed', 'Error')
+POD_NAME_MAX_LENGTH = 253
+POD_NAME_HASH_LENGTH = 10
+
+
+def _fnv32a(data: str) -> int:
+    """
+    Computes the 32 bit FNV-1a hash Argo names pods by.
+    """
+    value = 0x811c9dc5
+    for byte in data.encode('utf-8'):
+        value = ((value ^ byte) * 0x01000193) & 0xffffffff
+    return value
+
+
+def pod_name(workflow: dict, node: dict) -> str:
+    """
+    Returns the name of the pod of a workflow node, for both the v1 (node id) and v2 (template and hash) pod name formats.
+
+    Args:
+        workflow (dict): The Argo workflow.
+        node (dict): The pod node of the workflow.
+
+    Returns:
+        str: The pod name.
+    """
+    annotations = workflow.get('metadata', {}).get('annotations', {})
+    if annotations.get('workflows.argoproj.io/pod-name-format') != 'v2':
+        return node['id']
+
+    workflow_name = workflow['metadata']['name']
+    if workflow_name == node['name']:
+        return workflow_name
+    prefix = f"{workflow_name}-{node['templateName']}"
+    prefix = prefix[:POD_NAME_MAX_LENGTH - POD_NAME_HASH_LENGTH - 1]
+    return f"{prefix}-{_fnv32a(node['name'])}"
+
+
+def workflow_pods(workflow: dict):
+    """
+    Lists the pods of a workflow running containers, in the order they started.
+
+    Pods of resource templates (e.g. creating the workspace volume) are left out.
+
+    Args:
+        workflow (dict): The Argo workflow.
+
+    Returns:
+        List[tuple]: The display name, pod name and phase of each pod.
+    """
+    resource_templates = {
+        template['name'] for template in workflow.get('spec', {}).get('templates', []) if 'resource' in template
+    }
+    nodes = [
+        node for node in workflow.get('status', {}).get('nodes', {}).values()
+        if node.get('type') == 'Pod' and node.get('templateName') not in resource_templates
+    ]
+    nodes.sort(key=lambda node: node.get('startedAt') or '')
+    return [(node.get('displayName', node['name']), pod_name(workflow, node), node.get('phase')) for node in nodes]
+
+
+def has_multiple_pods(workflow: dict) -> bool:
+    """
+    Checks if a workflow can run more than one pod with containers, from its spec, so the answer does not change
+    while the run progresses.
+
+    Args:
+        workflow (dict): The Argo workflow.
+
+    Returns:
+        bool: True if the workflow has several container templates or loops over one.
+    """
+    templates = workflow.get('spec', {}).get('templates', [])
+    container_templates = [template for template in templates if 'container' in template]
+    loops = [
+        task for template in templates for task in template.get('dag', {}).get('tasks', [])
+        if 'withParam' in task or 'withItems' in task
+    ]
+    return len(container_templates) > 1 or bool(loops)
+
+
+class KFPLogSource:
+    """
+    Reads pod logs through the log endpoint of the KFP UI, which uses the same host and credentials as the KFP API
+    and serves the archived log once the pod is gone.
+
+    The offset is the number of bytes already read. Only the bytes after it are requested with a `Range` header,
+    endpoints that ignore it return the whole log, which is sliced at the offset instead.
+
+    Args:
+        kfp_client (kfp.Client): The client whose host and credentials are used.
+    """
+
+    def __init__(self, kfp_client):
+        self.kfp_client = kfp_client
+        self.session = requests.Session()
+
+    def read(self, pod: str, namespace: str, offset=None):
+        """
+        Read the log of a pod written after an offset.
+
+        Args:
+            pod (str): The name of the pod.
+            namespace (str): The namespace of the pod.
+            offset (int, optional): The offset returned by the previous read. Defaults to the start of the log.
+
+        Returns:
+            tuple: The new text and the offset to continue from.
+
+        Raises:
+            requests.RequestException: If the log could not be read.
+        """
+        offset = offset or 0
+        config = self.kfp_client._existing_config
+        authorization = config.get_api_key_with_prefix('authorization')
+        headers = {'Authorization': authorization} if authorization else {}
+        if offset:
+            headers['Range'] = f"bytes={offset}-"
+        response = self.session.get(
+            f"{self.kfp_client._uihost}/k8s/pod/logs",
+            params={'podname': pod, 'podnamespace': namespace},
+            headers=headers,
+            timeout=30,
+            verify=config.verify_ssl
+        )
+        if response.status_code == 416:
+            # nothing was written after the offset
+            return '', offset
+        response.raise_for_status()
+        data = response.content if response.status_code == 206 else response.content[offset:]
+
+        # a character split at the end of the read is read again with the next call
+        end = len(data)
+        for size in range(1, min(4, len(data)) + 1):
+            byte = data[-size]
+            if byte < 0x80:
+                break
+            if byte >= 0xc0:
+                length = 2 if byte < 0xe0 else 3 if byte < 0xf0 else 4
+                if length > size:
+                    end = len(data) - size
+                break
+        return data[:end].decode('utf-8', errors='replace'), offset + end
+
+
+class KubernetesLogSource:
+    """
+    Reads pod logs through the Kubernetes API, which only returns the lines written since the offset.
+
+    The offset is the timestamp of the last line read and the number of lines read with that timestamp, as the API
+    only resumes at whole seconds.
+
+    Args:
+        core_api (kubernetes.client.CoreV1Api, optional): The API client. Defaults to one from the local kube config.
+    """
+
+    def __init__(self, core_api=None):
+        if core_api is None:
+            from kubernetes import client, config
+
+            config.load_kube_config()
+            core_api = client.CoreV1Api()
+        self.core_api = core_api
+
+    @staticmethod
+    def _timestamp_key(timestamp: str):
+        seconds, _, fraction = timestamp.rstrip('Z').partition('.')
+        return seconds, int(fraction.ljust(9, '0')[:9] or 0)
+
+    def read(self, pod: str, namespace: str, offset=None):
+        """
+        Read the log of a pod written after an offset.
+
+        Args:
+            pod (str): The name of the pod.
+            namespace (str): The namespace of the pod.
+            offset (tuple, optional): The offset returned by the previous read. Defaults to the start of the log.
+
+        Returns:
+            tuple: The new text and the offset to continue from.
+
+        Raises:
+            kubernetes.client.ApiException: If the log could not be read.
+        """
+        last_key, seen = offset or (None, 0)
+        kwargs = {'since_time': f"{last_key[0]}Z"} if last_key else {}
+        log = self.core_api.read_namespaced_pod_log(
+            pod, namespace, container=LOG_CONTAINER, timestamps=True, _preload_content=False, **kwargs
+        ).data.decode('utf-8', errors='replace')
+
+        # the API resumes at the start of the second of the last line, skip what was read before
+        skip = seen
+        lines = []
+        for line in log.splitlines(keepends=True):
+            if not line.endswith('\n'):
+                # the line is still being written, it is read again with the next call
+                break
+            timestamp, _, text = line.partition(' ')
+            key = self._timestamp_key(timestamp)
+            if last_key and key < last_key:
+                continue
+            if key == last_key and skip > 0:
+                skip -= 1
+                continue
+            seen = seen + 1 if key == last_key else 1
+            last_key = key
+            lines.append(text)
+        return ''.join(lines), (last_key, seen)
+
+
+class LogFollower:
+    """
+    Streams the logs of the pods of a KFP run to a file as they are produced.
+
+    Logs are read incrementally from the offset each pod was read to, so reconnecting after an error neither loses
+    nor repeats output. Transient errors of the KFP API (dropped connections, unavailable servers) are retried with
+    the growing poll interval. The run and the logs are polled from a single loop with an adaptive interval: it starts at
+    `min_interval`, grows by `backoff` while no new output arrives (up to `max_interval`) and resets on new output.
+
+    Args:
+        kfp_client (kfp.Client): The client the run was submitted with.
+        run_id (str): The id of the run.
+        output (file, optional): The file to write the logs to. Defaults to stdout.
+        source (KFPLogSource, optional): The log source. Defaults to the log endpoint of the KFP UI.
+        min_interval (float, optional): The initial poll interval in seconds. Defaults to 2.
+        max_interval (float, optional): The maximum poll interval in seconds. Defaults to 30.
+        backoff (float, optional): The factor the poll interval grows by. Defaults to 1.5.
+    """
+
+    def __init__(self, kfp_client, run_id: str, output=None, source=None, min_interval=LOG_FOLLOW_MIN_INTERVAL,
+                 max_interval=LOG_FOLLOW_MAX_INTERVAL, backoff=LOG_FOLLOW_BACKOFF):
+        self.kfp_client = kfp_client
+        self.run_id = run_id
+        self.output = output or sys.stdout
+        self.source = source or KFPLogSource(kfp_client)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.offsets = {}
+        self._done = set()
+        self._retries = {}
+        self._line_start = {}
+
+    def _write(self, prefix: str, pod: str, text: str):
+        for line in text.splitlines(keepends=True):
+            if self._line_start.get(pod, True):
+                self.output.write(prefix)
+            self.output.write(line)
+            self._line_start[pod] = line.endswith('\n')
+        self.output.flush()
+
+    def _read(self, pod: str, namespace: str, phase: str) -> str:
+        """
+        Read the new output of a pod and mark the pod done once it finished.
+
+        The log of a finished pod is complete, so it is read once more after the pod finished and not polled again.
+
+        Returns:
+            str: The new output of the pod.
+        """
+        try:
+            text, self.offsets[pod] = self.source.read(pod, namespace, self.offsets.get(pod))
+        except Exception as e:
+            # the offset is kept, so the next read resumes where this one would have
+            self._retries[pod] = self._retries.get(pod, 0) + 1
+            if phase in POD_FINAL_PHASES and self._retries[pod] >= LOG_FOLLOW_MAX_RETRIES:
+                print(f"giving up on the log of {pod}: {e}", file=sys.stderr)
+                self._done.add(pod)
+            return ''
+
+        self._retries.pop(pod, None)
+        if phase in POD_FINAL_PHASES:
+            self._done.add(pod)
+        return text
+
+    def follow(self, timeout: Optional[float] = None):
+        """
+        Stream the logs until the run reached a final state and all logs are drained.
+
+        Args:
+            timeout (float, optional): The timeout in seconds. Defaults to following forever.
+
+        Returns:
+            kfp_server_api.ApiRunDetail: The run detail of the finished run.
+
+        Raises:
+            TimeoutError: If the run did not finish before the timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        interval = self.min_interval
+
+        while True:
+            try:
+                run_detail = self.kfp_client.get_run(self.run_id)
+            except Exception as e:
+                if not is_transient_error(e):
+                    raise
+                # the offsets are kept, so the logs resume where they were once the API is back
+                print(f"lost the connection to KFP, retrying: {str(e).splitlines()[0] if str(e) else type(e).__name__}",
+                      file=sys.stderr)
+                interval = min(interval * self.backoff, self.max_interval)
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f"Run {self.run_id} did not finish in time.")
+                time.sleep(interval if deadline is None else max(0, min(interval, deadline - time.monotonic())))
+                continue
+
+            status = run_detail.run.status
+            workflow = json.loads(run_detail.pipeline_runtime.workflow_manifest or '{}')
+            namespace = workflow.get('metadata', {}).get('namespace')
+            pods = workflow_pods(workflow)
+            prefixed = has_multiple_pods(workflow)
+
+            new_output = False
+            for display_name, pod, phase in pods:
+                if pod in self._done or phase in (None, 'Pending', 'Skipped', 'Omitted'):
+                    continue
+                text = self._read(pod, namespace, phase)
+                if text:
+                    self._write(f"[{display_name}] " if prefixed else '', pod, text)
+                    new_output = True
+
+            finished = status is not None and status.lower() in RUN_FINAL_STATES
+            if finished and all(pod in self._done or phase not in POD_FINAL_PHASES for _, pod, phase in pods):
+                return run_detail
+
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Run {self.run_id} did not finish in time.")
+
+            interval = self.min_interval if new_output else min(interval * self.backoff, self.max_interval)
+            if finished:
+                # only the logs of finished pods are left to drain
+                interval = self.min_interval
+            time.sleep(interval if deadline is None else max(0, min(interval, deadline - time.monotonic())))
+
+
+def follow_run_logs(kfp_client, run_id: str, output=None, source: str = 'kfp', timeout: Optional[float] = None):
+    """
+    Stream the logs of the pods of a KFP run until it finished.
+
+    Args:
+        kfp_client (kfp.Client): The client the run was submitted with.
+        run_id (str): The id of the run.
+        output (file, optional): The file to write the logs to. Defaults to stdout.
+        source (str, optional): Read the logs through the KFP UI ('kfp') or the Kubernetes API with the local kube
+            config ('kubernetes'). Defaults to 'kfp'.
+        timeout (float, optional): The timeout in seconds. Defaults to following forever.
+
+    Returns:
+        kfp_server_api.ApiRunDetail: The run detail of the finished run.
+
+    Raises:
+        ValueError: If the log source is not supported.
+    """
+    if source == 'kfp':
+        log_source = KFPLogSource(kfp_client)
+    elif source == 'kubernetes':
+        log_source = KubernetesLogSource()
+    else:
+        raise ValueError(f"Unsupported log source {source}.")
+    return LogFollower(kfp_client, run_id, output=output, source=log_source).follow(timeout)
@@ -0,0 +1,227 @@
+import asyncio
+import weakref
+from typing import Optional
+
+RUN_FINAL_STATES = ('succeeded', 'failed', 'skipped', 'error')
+RUN_MONITOR_MAX_CONCURRENCY = 8
+RUN_MONITOR_MIN_INTERVAL = 2.0
+RUN_MONITOR_MAX_INTERVAL = 60.0
+RUN_MONITOR_BACKOFF = 1.5
+RUN_MONITOR_MAX_RETRIES = 5
+TRANSIENT_STATUS_CODES = (0, 429, 500, 502, 503, 504)
+
+_run_monitors = weakref.WeakKeyDictionary()
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    Checks if an error of the KFP API is transient, e.g. a dropped connection or an unavailable server, so the
+    request can be retried.
+
+    Args:
+        error (Exception): The error raised by the KFP client.
+
+    Returns:
+        bool: True if the request can be retried.
+    """
+    import urllib3
+    import requests
+    from kfp_server_api import ApiException
+
+    if isinstance(error, ApiException):
+        return error.status in TRANSIENT_STATUS_CODES
+    return isinstance(error, (urllib3.exceptions.HTTPError, requests.RequestException, ConnectionError, TimeoutError))
+
+
+class _WatchedRun:
+    """
+    Polling state of a single run watched by a RunMonitor.
+    """
+
+    def __init__(self, interval):
+        self.waiters = []
+        self.interval = interval
+        self.next_poll = 0.0
+        self.status = None
+        self.retries = 0
+
+
+class RunMonitor:
+    """
+    Waits on the completion of many KFP runs without blocking the event loop.
+
+    All runs watched by a monitor are polled from a single asyncio task. At most
+    `max_concurrency` `get_run` requests are in flight at once, and each run is polled
+    with an adaptive interval: it starts at `min_interval`, grows by `backoff` every time
+    the status is unchanged (up to `max_interval`) and resets whenever the status changes.
+    Transient errors of the KFP API (dropped connections, unavailable servers) are retried with
+    the growing interval, waiters only fail on other errors or after `max_retries` retries in a row.
+
+    Args:
+        kfp_client (kfp.Client): The client used to query the runs.
+        max_concurrency (int, optional): The maximum number of concurrent API requests. Defaults to 8.
+        min_interval (float, optional): The initial poll interval in seconds. Defaults to 2.
+        max_interval (float, optional): The maximum poll interval in seconds. Defaults to 60.
+        backoff (float, optional): The factor the poll interval grows by. Defaults to 1.5.
+        max_retries (int, optional): The number of transient errors in a row after which the waiters fail. Defaults to 5.
+    """
+
+    def __init__(
+        self,
+        kfp_client,
+        max_concurrency=RUN_MONITOR_MAX_CONCURRENCY,
+        min_interval=RUN_MONITOR_MIN_INTERVAL,
+        max_interval=RUN_MONITOR_MAX_INTERVAL,
+        backoff=RUN_MONITOR_BACKOFF,
+        max_retries=RUN_MONITOR_MAX_RETRIES
+    ):
+        self.kfp_client = kfp_client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._watched = {}
+        self._wakeup = asyncio.Event()
+        self._poll_task = None
+
+    async def wait(self, run_id: str, timeout: Optional[float] = None):
+        """
+        Wait for a run to reach a final state.
+
+        Args:
+            run_id (str): The id of the run.
+            timeout (float, optional): The timeout in seconds. Defaults to waiting forever.
+
+        Returns:
+            kfp_server_api.ApiRunDetail: The run detail of the finished run.
+
+        Raises:
+            asyncio.TimeoutError: If the run did not finish before the timeout.
+        """
+        waiter = asyncio.get_running_loop().create_future()
+        watched = self._watched.setdefault(run_id, _WatchedRun(self.min_interval))
+        watched.waiters.append(waiter)
+
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.create_task(self._poll_loop())
+        self._wakeup.set()
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        finally:
+            if not waiter.done():
+                waiter.cancel()
+            if run_id in self._watched and waiter in self._watched[run_id].waiters:
+                self._watched[run_id].waiters.remove(waiter)
+                if not self._watched[run_id].waiters:
+                    del self._watched[run_id]
+
+    async def _poll_loop(self):
+        loop = asyncio.get_running_loop()
+        while self._watched:
+            self._wakeup.clear()
+            now = loop.time()
+            due = [run_id for run_id, watched in self._watched.items() if watched.next_poll <= now]
+            await asyncio.gather(*(self._poll(run_id) for run_id in due))
+
+            if not self._watched:
+                break
+            delay = min(watched.next_poll for watched in self._watched.values()) - loop.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _poll(self, run_id: str):
+        loop = asyncio.get_running_loop()
+        try:
+            async with self._semaphore:
+                run_detail = await loop.run_in_executor(None, self.kfp_client.get_run, run_id)
+        except Exception as e:
+            watched = self._watched.get(run_id)
+            if watched is None or not is_transient_error(e) or watched.retries >= self.max_retries:
+                self._finish(run_id, error=e)
+                return
+            # a dropped connection or an unavailable server, retry with the growing interval
+            watched.retries += 1
+            watched.interval = min(watched.interval * self.backoff, self.max_interval)
+            watched.next_poll = loop.time() + watched.interval
+            return
+
+        watched = self._watched.get(run_id)
+        if watched is None:
+            return
+        watched.retries = 0
+
+        status = run_detail.run.status
+        if status is not None and status.lower() in RUN_FINAL_STATES:
+            self._finish(run_id, result=run_detail)
+            return
+
+        if status == watched.status:
+            watched.interval = min(watched.interval * self.backoff, self.max_interval)
+        else:
+            watched.interval = self.min_interval
+        watched.status = status
+        watched.next_poll = loop.time() + watched.interval
+
+    def _finish(self, run_id: str, result=None, error=None):
+        watched = self._watched.pop(run_id, None)
+        if watched is None:
+            return
+        for waiter in watched.waiters:
+            if waiter.done():
+                continue
+            if error is not None:
+                waiter.set_exception(error)
+            else:
+                waiter.set_result(result)
+
+
+def get_run_monitor(kfp_client) -> RunMonitor:
+    """
+    Get the run monitor of the running event loop for the given client.
+
+    Args:
+        kfp_client (kfp.Client): The client used to query the runs.
+
+    Returns:
+        RunMonitor: The shared run monitor.
+    """
+    loop = asyncio.get_running_loop()
+    monitors = _run_monitors.setdefault(loop, {})
+    if id(kfp_client) not in monitors:
+        monitors[id(kfp_client)] = RunMonitor(kfp_client)
+    return monitors[id(kfp_client)]
+
+
+class AsyncRun:
+    """
+    A submitted KFP run whose completion can be awaited.
+
+    Args:
+        run (RunPipelineResult): The run returned by the KFP client.
+        kfp_client (kfp.Client): The client the run was submitted with.
+    """
+
+    def __init__(self, run, kfp_client):
+        self.run = run
+        self.run_id = run.run_id
+        self.kfp_client = kfp_client
+
+    async def completion(self, timeout: Optional[float] = None):
+        """
+        Wait for the run to reach a final state.
+
+        Args:
+            timeout (float, optional): The timeout in seconds. Defaults to waiting forever.
+
+        Returns:
+            kfp_server_api.ApiRunDetail: The run detail of the finished run.
+        """
+        return await get_run_monitor(self.kfp_client).wait(self.run_id, timeout)
+
+    def __repr__(self):
+        return f'AsyncRun(run_id={self.run_id})'
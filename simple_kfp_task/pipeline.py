@@ -1,77 +1,331 @@
-from kfp import dsl
+import os
+import json
+import hashlib
+import inspect
+import tempfile
+import functools
+import threading
+import weakref
+from importlib import metadata
+from kfp import dsl, compiler
 from kubernetes import client as kubernetes_client
+from simple_kfp_task.distributed import RANK_LABEL, distributed_env, rank_service_manifest
 
+PIPELINE_TIMEOUT = 3600
+GIT_MIRROR_PATH = '/git-mirror'
+ENV_CACHE_PATH = '/env-cache'
+ENV_CACHE_MAX_SIZE_MB = 20480
+ENV_CACHE_MAX_AGE_DAYS = 14
+CHECKOUT_MODES = ('sidecar', 'init')
+WORKSPACE_PATH = '/workspace'
+SWEEP_PATH = f'{WORKSPACE_PATH}/sweep'
+SWEEP_SUMMARY_PATH = '/tmp/outputs/summary.json'
+PHASE_TIMINGS_PATH = '/tmp/outputs/phase_timings.json'
+PHASE_METRICS_PATH = '/mlpipeline-metrics.json'
+KANIKO_IMAGE = 'gcr.io/kaniko-project/executor:v1.23.2-debug'
+PIPELINE_NAME = 'simple-task-pipeline'
+PIPELINE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "simple-kfp-task", "pipelines")
 
-def run_command_op(name: str, container_image: str, command: str, args: str, cwd: str, branch: str, remote_url: str, requirements: str, packages: str, git_diff: str, commit: str):
+_pipeline_versions = weakref.WeakKeyDictionary()
+_pipeline_versions_lock = threading.Lock()
+
+
+def phase_timing_script():
     """
-    Run a command inside a container using Kubernetes.
+    Build the shell functions `phase_start` and `phase_end`, which record the wall time, exit code and bytes downloaded
+    of a phase of the task to /ipc/phases.
+
+    Bytes are counted on the network interfaces of the pod, which all its containers share, so the phases must not overlap.
+
+    Returns:
+        str: The shell script.
+    """
+    return """#
+# Record the phases of the task as lines of name, start, end, exit code and
+# bytes received by the pod in /ipc/phases
+#
+
+rx_bytes() {
+    tail -n +3 /proc/net/dev | sed 's/:/ /' | awk '$1 != "lo" { sum += $2 } END { printf "%d", sum }'
+}
+
+phase_start() {
+    phase_started=$(date +%s.%N) && \\
+    phase_rx_bytes=$(rx_bytes)
+}
+
+phase_end() {
+    echo "$1 $phase_started $(date +%s.%N) $2 $(( $(rx_bytes) - phase_rx_bytes ))" >> /ipc/phases
+}"""
+
+
+def git_clone_container(remote_url: str, branch: str, commit: str, git_diff: str, git_diff_url: str = '', git_diff_digest: str = '',
+                        git_bundle_url: str = '', git_bundle_digest: str = ''):
+    """
+    Build the container checking out the repository into /app, optionally applying a diff.
+
+    It signals completion through /ipc/git-clone and /ipc/git-apply and logs to /ipc/log.
 
     Args:
-        name (str): The name of the container operation.
-        container_image (str): The container image to use for the operation.
-        command (str): The command to run inside the container.
-        args (str): The arguments to pass to the command.
-        branch (str): The branch to clone from the remote repository.
         remote_url (str): The URL of the remote repository.
-        requirements (str): The path to the requirements file for installing Python dependencies.
-        packages (str): A space-separated string of additional packages to install.
-        git_diff (str): The base64-encoded diff to apply to the cloned repository.
+        branch (str): The branch to clone from the remote repository.
         commit (str): The commit to fetch from the remote repository.
+        git_diff (str): The base64-encoded diff to apply to the cloned repository.
+        git_diff_url (str): The URL of a gzip compressed diff in an artifact store, used instead of `git_diff`.
+        git_diff_digest (str): The SHA-256 digest of the uncompressed diff at `git_diff_url`.
+        git_bundle_url (str): The URL of a Git bundle with the commits to check out on top of `commit`.
+        git_bundle_digest (str): The SHA-256 digest of the bundle at `git_bundle_url`.
 
     Returns:
-        dsl.ContainerOp: The container operation object.
+        kubernetes_client.V1Container: The container, to be used as sidecar or init container.
     """
-    return dsl.ContainerOp(
-        name=name,
-        image=container_image,
-        sidecars=[
-            kubernetes_client.V1Container(
-                name='git-clone',
-                image='alpine/git:2.43.0',
-                command=['sh', '-c'],
-                args=[
-                    f"""
-touch /ipc/log && \
-git clone --progress --single-branch --branch {branch} {remote_url} /app --depth=1 > /ipc/log 2>&1 && \
-  cd /app && \
-  git fetch --depth=1 origin {commit} > /ipc/log 2>&1 && \
-  git checkout {commit} > /ipc/log 2>&1
+    return kubernetes_client.V1Container(
+        name='git-clone',
+        image='alpine/git:2.43.0',
+        command=['sh', '-c'],
+        args=[
+            f"""
+fetch_blob() {{
+    case "$1" in
+        file://*) cat "${{1#file://}}" ;;
+        *) wget -q -O - "$1" ;;
+    esac
+}}
+
+count_objects() {{
+    git -C "$1" count-objects -v | awk '/^(count|in-pack):/ {{ n += $2 }} END {{ print n }}'
+}}
+
+#
+# Clone using the shared mirror (if mounted) as reference, the mirror is
+# updated incrementally under a lock so concurrent runs can share it
+#
+
+git_clone() {{
+    if [ -d {GIT_MIRROR_PATH} ]; then
+        mirror={GIT_MIRROR_PATH}/$(echo '{remote_url}' | sha256sum | cut -c1-16).git
+        (
+            flock 9 && \
+            if [ -d "$mirror" ]; then
+                count_objects "$mirror" > /ipc/git-mirror-cached && \
+                git -C "$mirror" fetch --prune origin
+            else
+                echo 0 > /ipc/git-mirror-cached && \
+                rm -rf "$mirror.tmp" && \
+                git clone --mirror {remote_url} "$mirror.tmp" && \
+                git -C "$mirror.tmp" config gc.auto 0 && \
+                mv "$mirror.tmp" "$mirror"
+            fi
+        ) 9> "$mirror.lock" && \
+        git clone --progress --reference "$mirror" --single-branch --branch {branch} {remote_url} /app
+    else
+        git clone --progress --single-branch --branch {branch} {remote_url} /app --depth=1
+    fi
+}}
+
+#
+# Fetch and check out the commit, and the local commits from the bundle if given
+#
+
+git_fetch() {{
+    cd /app && \
+    if [ -d {GIT_MIRROR_PATH} ]; then
+        if ! git cat-file -e "{commit}^{{commit}}" 2> /dev/null; then
+            git fetch origin {commit}
+        fi && \
+        cached_objects=$(cat /ipc/git-mirror-cached) && \
+        fetched_objects=$(( $(count_objects "$mirror") - cached_objects + $(count_objects /app) )) && \
+        echo "git mirror: $cached_objects objects from cache, $fetched_objects objects fetched" | tee /ipc/git-mirror-stats
+    else
+        git fetch --depth=1 origin {commit}
+    fi && \
+    git checkout {commit} && \
+    if [ -n '{git_bundle_url}' ]; then
+        fetch_blob '{git_bundle_url}' > /ipc/git.bundle && \
+        echo "{git_bundle_digest}  /ipc/git.bundle" | sha256sum -c - && \
+        git fetch /ipc/git.bundle HEAD && \
+        git checkout FETCH_HEAD
+    fi
+}}
 
+{phase_timing_script()}
+
+date +%s.%N > /ipc/pod-start
+touch /ipc/log
+
+phase_start
+git_clone >> /ipc/log 2>&1
 git_clone_exit_code=$?
+phase_end clone $git_clone_exit_code
+
+if [ $git_clone_exit_code -eq 0 ]; then
+    phase_start
+    git_fetch >> /ipc/log 2>&1
+    git_clone_exit_code=$?
+    phase_end fetch $git_clone_exit_code
+fi
+
 echo $git_clone_exit_code > /ipc/git-clone
 if [ $git_clone_exit_code -ne 0 ]; then
     exit 1
 fi
 
-if [ -n "{git_diff}" ]; then
+if [ -n "{git_diff}" ] || [ -n '{git_diff_url}' ]; then
+    phase_start
     cd /app && \
-    echo '{git_diff}' | base64 -d | gunzip | git apply --verbose - > /ipc/log 2>&1
+    if [ -n "{git_diff}" ]; then
+        echo '{git_diff}' | base64 -d | gunzip | git apply --verbose - >> /ipc/log 2>&1
+    else
+        fetch_blob '{git_diff_url}' | gunzip > /ipc/git.diff && \
+        echo "{git_diff_digest}  /ipc/git.diff" | sha256sum -c - >> /ipc/log 2>&1 && \
+        git apply --verbose /ipc/git.diff >> /ipc/log 2>&1
+    fi
     git_apply_exit_code=$?
+    phase_end apply $git_apply_exit_code
     echo $git_apply_exit_code > /ipc/git-apply
     if [ $git_apply_exit_code -ne 0 ]; then
         exit 1
     fi
 fi
-                    """
-                ],
-                volume_mounts=[
-                    kubernetes_client.V1VolumeMount(
-                        name='app-volume', mount_path='/app'),
-                    kubernetes_client.V1VolumeMount(
-                        name='ipc-volume', mount_path='/ipc')
-                ],
+            """
+        ],
+        volume_mounts=[
+            kubernetes_client.V1VolumeMount(
+                name='app-volume', mount_path='/app'),
+            kubernetes_client.V1VolumeMount(
+                name='ipc-volume', mount_path='/ipc')
+        ],
+    )
+
+
+def install_requirements_script(requirements: str, packages: str, requirements_lock: str = ''):
+    """
+    Build the shell function `install_requirements`, which installs the requirements and packages of a task.
+
+    Args:
+        requirements (str): The path to the requirements file for installing Python dependencies.
+        packages (str): A space-separated string of additional packages to install.
+        requirements_lock (str): The base64-encoded lock of the requirements and packages, installed instead of them without resolving.
+
+    Returns:
+        str: The shell script.
+    """
+    return f"""#
+# Install the lock resolved on the client if given, pip then neither resolves
+# nor downloads anything beyond the pinned distributions
+#
+
+install_requirements() {{
+    if [ -n "{requirements_lock}" ]; then
+        echo '{requirements_lock}' | base64 -d | gunzip > /ipc/requirements.lock && \
+        pip install --no-deps --require-hashes -r /ipc/requirements.lock || {{
+            echo "dependency lock does not match the image, resolving instead" && \
+            if [ -n "{requirements}" ]; then pip install -r {requirements}; fi && \
+            if [ -n "{packages}" ]; then echo "{packages}" | xargs pip install; fi
+        }}
+    else
+        if [ -n "{requirements}" ]; then pip install -r {requirements}; fi && \
+        if [ -n "{packages}" ]; then echo "{packages}" | xargs pip install; fi
+    fi
+}}"""
+
+
+def run_command_op(name: str, container_image: str, command: str, args: str, cwd: str, branch: str, remote_url: str, requirements: str, packages: str, git_diff: str, commit: str, git_diff_url: str = '', git_diff_digest: str = '', git_bundle_url: str = '', git_bundle_digest: str = '', requirements_lock: str = ''):
+    """
+    Run a command inside a container using Kubernetes.
+
+    Args:
+        name (str): The name of the container operation.
+        container_image (str): The container image to use for the operation.
+        command (str): The command to run inside the container.
+        args (str): The arguments to pass to the command.
+        branch (str): The branch to clone from the remote repository.
+        remote_url (str): The URL of the remote repository.
+        requirements (str): The path to the requirements file for installing Python dependencies.
+        packages (str): A space-separated string of additional packages to install.
+        git_diff (str): The base64-encoded diff to apply to the cloned repository.
+        commit (str): The commit to fetch from the remote repository.
+        git_diff_url (str): The URL of a gzip compressed diff in an artifact store, used instead of `git_diff`.
+        git_diff_digest (str): The SHA-256 digest of the uncompressed diff at `git_diff_url`.
+        git_bundle_url (str): The URL of a Git bundle with the commits to check out on top of `commit`.
+        git_bundle_digest (str): The SHA-256 digest of the bundle at `git_bundle_url`.
+        requirements_lock (str): The base64-encoded lock of the requirements and packages, installed instead of them without resolving.
+
+    Returns:
+        dsl.ContainerOp: The container operation object.
+    """
+    op = dsl.ContainerOp(
+        name=name,
+        image=container_image,
+        sidecars=[
+            git_clone_container(
+                remote_url=remote_url,
+                branch=branch,
+                commit=commit,
+                git_diff=git_diff,
+                git_diff_url=git_diff_url,
+                git_diff_digest=git_diff_digest,
+                git_bundle_url=git_bundle_url,
+                git_bundle_digest=git_bundle_digest
             ),
         ],
         command=['sh', '-c'],
         arguments=[
             f"""
+{phase_timing_script()}
+
 #
-# Wait for the git clone to finish
+# Publish the phases as KFP metrics and as JSON artifact on every exit
 #
 
-touch /ipc/log
-tail -F /ipc/log &
-TAIL_PID=$!
+publish_phases() {{
+    touch /ipc/phases
+    python - <<'EOF'
+import os
+import json
+
+phases = []
+with open('/ipc/phases') as f:
+    for line in f:
+        phase, start, end, exit_code, bytes_downloaded = line.split()
+        phases.append({{
+            'phase': phase,
+            'start': float(start),
+            'end': float(end),
+            'seconds': round(float(end) - float(start), 3),
+            'exit_code': int(exit_code),
+            'bytes_downloaded': int(bytes_downloaded),
+        }})
+
+os.makedirs(os.path.dirname('{PHASE_TIMINGS_PATH}'), exist_ok=True)
+with open('{PHASE_TIMINGS_PATH}', 'w') as f:
+    json.dump(phases, f)
+
+metrics = []
+for phase in phases:
+    metrics.append({{'name': f"{{phase['phase']}}-seconds", 'numberValue': phase['seconds'], 'format': 'RAW'}})
+    metrics.append({{'name': f"{{phase['phase']}}-bytes", 'numberValue': phase['bytes_downloaded'], 'format': 'RAW'}})
+with open('{PHASE_METRICS_PATH}', 'w') as f:
+    json.dump({{'metrics': metrics}}, f)
+
+print('phases: ' + ', '.join(f"{{phase['phase']}} {{phase['seconds']:.2f}}s" for phase in phases))
+EOF
+}}
+trap publish_phases EXIT
+
+#
+# Wait for the git clone to finish. An init container has finished the checkout
+# before this container starts, so its full log is printed and nothing is
+# waited for, the sidecar runs concurrently and its log is followed
+#
+
+if [ -f /ipc/git-clone ]; then
+    cat /ipc/log
+else
+    touch /ipc/log
+    tail -n +1 -F /ipc/log &
+    TAIL_PID=$!
+fi
 
 until [ -f /ipc/git-clone ];
     do sleep 1;
@@ -81,26 +335,99 @@ if [ $(cat /ipc/git-clone) -ne 0 ]; then
     exit 1
 fi
 
+if [ -n "$TAIL_PID" ] && [ -f /ipc/git-mirror-stats ]; then
+    cat /ipc/git-mirror-stats
+fi
+
 #
 # Wait for the git apply to finish
 #
 
-if [ -n "{git_diff}" ]; then
+if [ -n "{git_diff}" ] || [ -n '{git_diff_url}' ]; then
     until [ -f /ipc/git-apply ]; do sleep 1; done
     if [ $(cat /ipc/git-apply) -ne 0 ]; then
         exit 1
     fi
 fi
 
-kill $TAIL_PID
+if [ -n "$TAIL_PID" ]; then
+    kill $TAIL_PID
+fi
+checkout_ready=$(date +%s.%N)
+
+{install_requirements_script(requirements, packages, requirements_lock)}
 
-cd {cwd} && \
-if [ -n "{requirements}" ]; then pip install -r {requirements}; fi && \
-if [ -n "{packages}" ]; then echo "{packages}" | xargs pip install; fi && \
+#
+# Use a virtual environment from the environment cache (if mounted), keyed by the
+# requirements, packages (or their lock) and image. It is built once under an
+# exclusive lock and used under a shared lock, so eviction never removes an
+# environment in use
+#
+
+use_env_cache() {{
+    env_key=$( (if [ -n "{requirements_lock}" ]; then echo '{requirements_lock}' | base64 -d | gunzip; else
+        if [ -n "{requirements}" ]; then cat {requirements}; fi; echo "{packages}"; fi
+        echo "{container_image}"; python -VV; uname -m) | sha256sum | cut -c1-32) && \
+    env_dir={ENV_CACHE_PATH}/$env_key && \
+    exec 8> "$env_dir.lock" && \
+    flock 8 && \
+    if [ -f "$env_dir/.complete" ]; then
+        echo "env cache: using environment $env_key"
+    else
+        echo "env cache: building environment $env_key" && \
+        rm -rf "$env_dir" && \
+        python -m venv --system-site-packages "$env_dir" && \
+        . "$env_dir/bin/activate" && \
+        install_requirements && \
+        touch "$env_dir/.complete" || {{ rm -rf "$env_dir"; return 1; }}
+    fi && \
+    flock -s 8 && \
+    touch "$env_dir/.last-used" && \
+    . "$env_dir/bin/activate"
+}}
+
+evict_env_cache() {{
+    find {ENV_CACHE_PATH} -mindepth 2 -maxdepth 2 -name .last-used -mtime +${{ENV_CACHE_MAX_AGE_DAYS:-{ENV_CACHE_MAX_AGE_DAYS}}} | while read used; do
+        flock -n "${{used%/.last-used}}.lock" rm -rf "${{used%/.last-used}}"
+    done
+    ls -1tr {ENV_CACHE_PATH}/*/.last-used 2> /dev/null | while read used; do
+        [ $(du -sm {ENV_CACHE_PATH} | cut -f1) -le ${{ENV_CACHE_MAX_SIZE_MB:-{ENV_CACHE_MAX_SIZE_MB}}} ] && break
+        flock -n "${{used%/.last-used}}.lock" rm -rf "${{used%/.last-used}}"
+    done
+}}
+
+cd {cwd} || exit 1
+
+phase_start
+if [ -d {ENV_CACHE_PATH} ] && [ -n "{requirements}{packages}" ]; then
+    if use_env_cache; then
+        evict_env_cache
+    else
+        echo "env cache: falling back to a plain install"
+        exec 8>&-
+        if [ -n "$VIRTUAL_ENV" ]; then deactivate; fi
+        install_requirements
+    fi
+else
+    install_requirements
+fi
+install_exit_code=$?
+phase_end install $install_exit_code
+if [ $install_exit_code -ne 0 ]; then
+    exit $install_exit_code
+fi
+
+echo "startup: checkout ready after $(echo "$checkout_ready $(cat /ipc/pod-start)" | awk '{{ printf "%.2f", $1 - $2 }}')s, script started after $(echo "$(date +%s.%N) $(cat /ipc/pod-start)" | awk '{{ printf "%.2f", $1 - $2 }}')s"
+
+phase_start
 python {command} {args}
+command_exit_code=$?
+phase_end command $command_exit_code
+exit $command_exit_code
             """
         ],
         container_kwargs={'working_dir': '/app'},
+        output_artifact_paths={'mlpipeline-metrics': PHASE_METRICS_PATH, 'phase-timings': PHASE_TIMINGS_PATH},
     ).add_volume(
         kubernetes_client.V1Volume(
             name="app-volume",
@@ -123,6 +450,65 @@ python {command} {args}
         name="MLFLOW_REGISTRY_URI", value="http://mlflow-server:5000"
     )).add_env_variable(kubernetes_client.V1EnvVar(
         name='INSIDE_KFP_FUNC_CONTAINER', value='true'))
+    return op
+
+
+def build_env_image_op(name: str, env_image: str, env_image_dockerfile: str, env_image_insecure: str):
+    """
+    Build an environment image with kaniko and push it to its registry.
+
+    Args:
+        name (str): The name of the container operation.
+        env_image (str): The reference the image is pushed to.
+        env_image_dockerfile (str): The base64-encoded Dockerfile of the image.
+        env_image_insecure (str): 'true' to push to a registry over plain HTTP.
+
+    Returns:
+        dsl.ContainerOp: The container operation object.
+    """
+    return dsl.ContainerOp(
+        name=name,
+        image=KANIKO_IMAGE,
+        command=['sh', '-c'],
+        arguments=[
+            f"""
+mkdir -p /workspace && \
+echo '{env_image_dockerfile}' | base64 -d > /workspace/Dockerfile && \
+cat /workspace/Dockerfile && \
+if [ "{env_image_insecure}" = "true" ]; then
+    insecure_flags="--insecure --insecure-pull --skip-tls-verify"
+fi && \
+/kaniko/executor --context dir:///workspace --dockerfile /workspace/Dockerfile \
+    --destination {env_image} --single-snapshot --cleanup $insecure_flags
+            """
+        ],
+    )
+
+
+def add_registry_secret(op: dsl.ContainerOp, secret_name: str):
+    """
+    Mount a docker config secret into the environment image build, so kaniko can push to the registry.
+
+    Args:
+        op (dsl.ContainerOp): The container operation, other operations than the image build are left untouched.
+        secret_name (str): The name of a secret of type `kubernetes.io/dockerconfigjson`.
+
+    Returns:
+        dsl.ContainerOp: The container operation object.
+    """
+    if op.human_name != 'Build Environment Image':
+        return op
+    return op.add_volume(
+        kubernetes_client.V1Volume(
+            name='registry-secret',
+            secret=kubernetes_client.V1SecretVolumeSource(
+                secret_name=secret_name,
+                items=[kubernetes_client.V1KeyToPath(key='.dockerconfigjson', path='config.json')])
+        )
+    ).add_volume_mount(
+        kubernetes_client.V1VolumeMount(
+            name='registry-secret', mount_path='/kaniko/.docker')
+    )
 
 
 @dsl.pipeline(
@@ -145,6 +531,14 @@ def simple_task_pipeline(
     memory_limit: str = '2Gi',
     memory_request: str = '1Gi',
     git_diff: str = '',
+    git_diff_url: str = '',
+    git_diff_digest: str = '',
+    git_bundle_url: str = '',
+    git_bundle_digest: str = '',
+    requirements_lock: str = '',
+    env_image: str = '',
+    env_image_dockerfile: str = '',
+    env_image_insecure: str = 'false',
     container_image: str = 'python:3.12.3-slim',
     volume_name=''
 ):
@@ -166,10 +560,27 @@ def simple_task_pipeline(
         memory_limit (str, optional): The memory limit for the task. Defaults to '2Gi'.
         memory_request (str, optional): The memory request for the task. Defaults to '1Gi'.
         git_diff (str, optional): The git diff to be applied. Defaults to ''.
+        git_diff_url (str, optional): The URL of a compressed git diff in an artifact store. Defaults to ''.
+        git_diff_digest (str, optional): The SHA-256 digest of the git diff at `git_diff_url`. Defaults to ''.
+        git_bundle_url (str, optional): The URL of a git bundle with unpushed commits. Defaults to ''.
+        git_bundle_digest (str, optional): The SHA-256 digest of the git bundle at `git_bundle_url`. Defaults to ''.
+        requirements_lock (str, optional): The base64-encoded lock of the requirements and packages. Defaults to ''.
+        env_image (str, optional): The prebuilt environment image used as container image. Defaults to ''.
+        env_image_dockerfile (str, optional): The base64-encoded Dockerfile to build `env_image` from, if it does not exist yet. Defaults to ''.
+        env_image_insecure (str, optional): 'true' if the registry of `env_image` is served over plain HTTP. Defaults to 'false'.
         container_image (str, optional): The container image to be used. Defaults to 'python:3.12.3-slim'.
         volume_name (str, optional): The name of the volume. Defaults to 'mlflow-pvc'.
     """
 
+    with dsl.Condition(env_image_dockerfile != ''):
+        build_env_image = build_env_image_op(
+            name="Build Environment Image",
+            env_image=env_image,
+            env_image_dockerfile=env_image_dockerfile,
+            env_image_insecure=env_image_insecure
+        )
+        build_env_image.execution_options.caching_strategy.max_cache_staleness = "P0D"
+
     with dsl.Condition(volume_name == ''):
         run_command_without_volume = run_command_op(
             name="Run Command Without Volume",
@@ -182,9 +593,15 @@ def simple_task_pipeline(
             requirements=requirements,
             packages=packages,
             git_diff=git_diff,
+            git_diff_url=git_diff_url,
+            git_diff_digest=git_diff_digest,
+            git_bundle_url=git_bundle_url,
+            git_bundle_digest=git_bundle_digest,
+            requirements_lock=requirements_lock,
             commit=commit
         )
 
+        run_command_without_volume.after(build_env_image)
         run_command_without_volume.add_resource_request(gpu_vendor, gpu_limit)
         run_command_without_volume.add_resource_limit(gpu_vendor, gpu_limit)
         run_command_without_volume.add_resource_request('cpu', cpu_request)
@@ -207,6 +624,11 @@ def simple_task_pipeline(
             requirements=requirements,
             packages=packages,
             git_diff=git_diff,
+            git_diff_url=git_diff_url,
+            git_diff_digest=git_diff_digest,
+            git_bundle_url=git_bundle_url,
+            git_bundle_digest=git_bundle_digest,
+            requirements_lock=requirements_lock,
             commit=commit
         ).add_volume(
             kubernetes_client.V1Volume(
@@ -220,6 +642,7 @@ def simple_task_pipeline(
             )
         )
 
+        run_command_with_volume.after(build_env_image)
         run_command_with_volume.add_resource_request(gpu_vendor, gpu_limit)
         run_command_with_volume.add_resource_limit(gpu_vendor, gpu_limit)
         run_command_with_volume.add_resource_request('cpu', cpu_request)
@@ -229,4 +652,937 @@ def simple_task_pipeline(
 
         run_command_with_volume.execution_options.caching_strategy.max_cache_staleness = "P0D"
 
-    dsl.get_pipeline_conf().set_timeout(3600)
+    dsl.get_pipeline_conf().set_timeout(PIPELINE_TIMEOUT)
+
+
+@functools.lru_cache(maxsize=None)
+def build_task_pipeline(volume: bool = False, gpu: bool = False, env_image_build: bool = False, replicas: int = 1):
+    """
+    Build a pipeline specialized for the shape of a task's configuration.
+
+    Unlike `simple_task_pipeline`, which contains a run step for each volume setting behind conditions, the
+    specialized pipeline contains a single run step with only the volume, GPU resources, image build and env
+    variables the configuration needs. It takes the same parameters, so the same arguments can be passed.
+    Pipelines are cached by shape.
+
+    With several replicas, the pipeline runs one step per rank, each with the same checkout, command and resources.
+    The pod of each rank is addressed by a headless service created first, and the rendezvous settings of
+    `distributed_env` are passed to each rank.
+
+    Args:
+        volume (bool, optional): Whether the task mounts a volume. Defaults to False.
+        gpu (bool, optional): Whether the task requests GPUs. Defaults to False.
+        env_image_build (bool, optional): Whether the environment image of the task is built first. Defaults to False.
+        replicas (int, optional): The number of pods running the task together. Defaults to 1.
+
+    Returns:
+        Callable: The pipeline function.
+    """
+    @dsl.pipeline(
+        name='Simple Task Pipeline',
+        description='A simple pipeline that clones a Git repository, creates a virtual environment, runs pip, and executes a script.'
+    )
+    def simple_task_pipeline(
+        remote_url: str = 'https://github.com/your/repo.git',
+        branch: str = 'main',
+        commit: str = 'HEAD',
+        command: str = 'script.py',
+        args: str = '',
+        cwd: str = '/app',
+        requirements: str = '',
+        packages: str = '',
+        gpu_limit: int = 0,
+        gpu_vendor='nvidia.com/gpu',
+        cpu_limit: str = "1",
+        cpu_request: str = "0.5",
+        memory_limit: str = '2Gi',
+        memory_request: str = '1Gi',
+        git_diff: str = '',
+        git_diff_url: str = '',
+        git_diff_digest: str = '',
+        git_bundle_url: str = '',
+        git_bundle_digest: str = '',
+        requirements_lock: str = '',
+        env_image: str = '',
+        env_image_dockerfile: str = '',
+        env_image_insecure: str = 'false',
+        container_image: str = 'python:3.12.3-slim',
+        volume_name=''
+    ):
+        if env_image_build:
+            build_env_image = build_env_image_op(
+                name="Build Environment Image",
+                env_image=env_image,
+                env_image_dockerfile=env_image_dockerfile,
+                env_image_insecure=env_image_insecure
+            )
+            build_env_image.execution_options.caching_strategy.max_cache_staleness = "P0D"
+
+        rank_services = []
+        if replicas > 1:
+            rank_services = [
+                dsl.ResourceOp(
+                    name=f"Create Rank {rank} Service",
+                    k8s_resource=rank_service_manifest(rank),
+                    action='create'
+                ) for rank in range(replicas)
+            ]
+
+        for rank in range(replicas):
+            if replicas > 1:
+                name = f"Run Command Rank {rank}"
+            else:
+                name = "Run Command With Volume" if volume else "Run Command Without Volume"
+
+            run_command = run_command_op(
+                name=name,
+                container_image=container_image,
+                command=command,
+                args=args,
+                cwd=cwd,
+                remote_url=remote_url,
+                branch=branch,
+                requirements=requirements,
+                packages=packages,
+                git_diff=git_diff,
+                git_diff_url=git_diff_url,
+                git_diff_digest=git_diff_digest,
+                git_bundle_url=git_bundle_url,
+                git_bundle_digest=git_bundle_digest,
+                requirements_lock=requirements_lock,
+                commit=commit
+            )
+
+            if env_image_build:
+                run_command.after(build_env_image)
+
+            if replicas > 1:
+                run_command.after(*rank_services).add_pod_label(RANK_LABEL, str(rank))
+                for env_name, env_value in distributed_env(rank, replicas).items():
+                    run_command.add_env_variable(kubernetes_client.V1EnvVar(name=env_name, value=env_value))
+
+            if volume:
+                run_command.add_volume(
+                    kubernetes_client.V1Volume(
+                        name="data-volume",
+                        persistent_volume_claim=kubernetes_client.V1PersistentVolumeClaimVolumeSource(
+                            claim_name=volume_name)
+                    )
+                ).add_volume_mount(
+                    kubernetes_client.V1VolumeMount(
+                        name="data-volume", mount_path='/volume'
+                    )
+                )
+
+            if gpu:
+                run_command.add_resource_request(gpu_vendor, gpu_limit)
+                run_command.add_resource_limit(gpu_vendor, gpu_limit)
+            run_command.add_resource_request('cpu', cpu_request)
+            run_command.add_resource_limit('cpu', cpu_limit)
+            run_command.add_resource_request('memory', memory_request)
+            run_command.add_resource_limit('memory', memory_limit)
+
+            run_command.execution_options.caching_strategy.max_cache_staleness = "P0D"
+
+        dsl.get_pipeline_conf().set_timeout(PIPELINE_TIMEOUT)
+
+    return simple_task_pipeline
+
+
+def workspace_mounts(volume_name: str):
+    """
+    Build the mounts of a task graph workspace, which holds the checkout in /app and the IPC files in /ipc.
+
+    Args:
+        volume_name (str): The name of the workspace volume.
+
+    Returns:
+        List[kubernetes_client.V1VolumeMount]: The volume mounts.
+    """
+    return [
+        kubernetes_client.V1VolumeMount(name=volume_name, mount_path='/app', sub_path='app'),
+        kubernetes_client.V1VolumeMount(name=volume_name, mount_path='/ipc', sub_path='ipc'),
+    ]
+
+
+def prepare_workspace_op(name: str, workspace, container_image: str, cwd: str, branch: str, remote_url: str, requirements: str,
+                         packages: str, git_diff: str, commit: str, git_diff_url: str = '', git_diff_digest: str = '',
+                         git_bundle_url: str = '', git_bundle_digest: str = '', requirements_lock: str = ''):
+    """
+    Check out the repository into a task graph workspace and install the dependencies into a virtual environment in it.
+
+    Args:
+        name (str): The name of the container operation.
+        workspace (dsl.PipelineVolume): The workspace volume.
+        container_image (str): The container image the steps run in.
+        cwd (str): The working directory the requirements path is relative to.
+        branch (str): The branch to clone from the remote repository.
+        remote_url (str): The URL of the remote repository.
+        requirements (str): The path to the requirements file for installing Python dependencies.
+        packages (str): A space-separated string of additional packages to install.
+        git_diff (str): The base64-encoded diff to apply to the cloned repository.
+        commit (str): The commit to fetch from the remote repository.
+        git_diff_url (str): The URL of a gzip compressed diff in an artifact store, used instead of `git_diff`.
+        git_diff_digest (str): The SHA-256 digest of the uncompressed diff at `git_diff_url`.
+        git_bundle_url (str): The URL of a Git bundle with the commits to check out on top of `commit`.
+        git_bundle_digest (str): The SHA-256 digest of the bundle at `git_bundle_url`.
+        requirements_lock (str): The base64-encoded lock of the requirements and packages.
+
+    Returns:
+        dsl.ContainerOp: The container operation object.
+    """
+    git_clone = git_clone_container(
+        remote_url=remote_url,
+        branch=branch,
+        commit=commit,
+        git_diff=git_diff,
+        git_diff_url=git_diff_url,
+        git_diff_digest=git_diff_digest,
+        git_bundle_url=git_bundle_url,
+        git_bundle_digest=git_bundle_digest
+    )
+    git_clone.volume_mounts = workspace_mounts(workspace.name)
+
+    op = dsl.ContainerOp(
+        name=name,
+        image=container_image,
+        init_containers=[git_clone],
+        command=['sh', '-c'],
+        arguments=[
+            f"""
+cat /ipc/log
+
+{install_requirements_script(requirements, packages, requirements_lock)}
+
+python -m venv --system-site-packages {WORKSPACE_PATH}/venv && \
+. {WORKSPACE_PATH}/venv/bin/activate && \
+cd {cwd} && \
+install_requirements
+            """
+        ],
+    ).add_pvolumes({WORKSPACE_PATH: workspace})
+    for volume_mount in workspace_mounts(workspace.name):
+        op.add_volume_mount(volume_mount)
+    return op
+
+
+def run_step_op(name: str, workspace, container_image: str, command: str, args: str, cwd: str):
+    """
+    Run a command of a task graph step in the checkout and virtual environment of the workspace.
+
+    The step writes its outputs to `$STEP_OUTPUT_DIR` (/workspace/outputs/<step>), where later steps read them.
+
+    Args:
+        name (str): The name of the step.
+        workspace (dsl.PipelineVolume): The workspace volume.
+        container_image (str): The container image to use for the operation.
+        command (str): The command to run inside the container.
+        args (str): The arguments to pass to the command.
+        cwd (str): The working directory of the command.
+
+    Returns:
+        dsl.ContainerOp: The container operation object.
+    """
+    op = dsl.ContainerOp(
+        name=name,
+        image=container_image,
+        command=['sh', '-c'],
+        arguments=[
+            f"""
+mkdir -p "$STEP_OUTPUT_DIR" && \
+. {WORKSPACE_PATH}/venv/bin/activate && \
+cd {cwd} && \
+python {command} {args}
+            """
+        ],
+    ).add_pvolumes({WORKSPACE_PATH: workspace})
+    for volume_mount in workspace_mounts(workspace.name):
+        op.add_volume_mount(volume_mount)
+    return op.add_env_variable(kubernetes_client.V1EnvVar(
+        name='WORKSPACE_DIR', value=WORKSPACE_PATH
+    )).add_env_variable(kubernetes_client.V1EnvVar(
+        name='STEP_OUTPUT_DIR', value=f'{WORKSPACE_PATH}/outputs/{name}'
+    )).add_env_variable(kubernetes_client.V1EnvVar(
+        name="MLFLOW_TRACKING_URI", value="http://mlflow-server:5000"
+    )).add_env_variable(kubernetes_client.V1EnvVar(
+        name="MLFLOW_REGISTRY_URI", value="http://mlflow-server:5000"
+    )).add_env_variable(kubernetes_client.V1EnvVar(
+        name='INSIDE_KFP_FUNC_CONTAINER', value='true'))
+
+
+def build_graph_pipeline(steps: tuple, workspace_size: str = '10Gi', workspace_storage_class: str = None,
+                         workspace_access_mode: str = 'ReadWriteOnce'):
+    """
+    Build a pipeline running the steps of a task graph as a DAG.
+
+    The repository is checked out and the dependencies are installed once into a workspace volume created for the run,
+    the steps then run in it, each after the steps it depends on, independent steps in parallel.
+
+    Args:
+        steps (tuple): The steps of the graph, each with `name`, `command`, `args`, `after` and `resources`.
+        workspace_size (str, optional): The size of the workspace volume. Defaults to '10Gi'.
+        workspace_storage_class (str, optional): The storage class of the workspace volume. Defaults to the cluster default.
+        workspace_access_mode (str, optional): The access mode of the workspace volume, parallel steps on different nodes
+            need 'ReadWriteMany'. Defaults to 'ReadWriteOnce'.
+
+    Returns:
+        Callable: The pipeline function.
+    """
+    @dsl.pipeline(
+        name='Simple Task Graph',
+        description='A pipeline that clones a Git repository, installs the dependencies once and runs several scripts as a DAG.'
+    )
+    def simple_task_graph(
+        remote_url: str = 'https://github.com/your/repo.git',
+        branch: str = 'main',
+        commit: str = 'HEAD',
+        cwd: str = '/app',
+        requirements: str = '',
+        packages: str = '',
+        git_diff: str = '',
+        git_diff_url: str = '',
+        git_diff_digest: str = '',
+        git_bundle_url: str = '',
+        git_bundle_digest: str = '',
+        requirements_lock: str = '',
+        container_image: str = 'python:3.12.3-slim'
+    ):
+        workspace = dsl.VolumeOp(
+            name="Create Workspace",
+            resource_name="workspace",
+            size=workspace_size,
+            storage_class=workspace_storage_class,
+            modes=[workspace_access_mode],
+            set_owner_reference=True
+        ).volume
+
+        prepare_workspace = prepare_workspace_op(
+            name="Prepare Workspace",
+            workspace=workspace,
+            container_image=container_image,
+            cwd=cwd,
+            remote_url=remote_url,
+            branch=branch,
+            requirements=requirements,
+            packages=packages,
+            git_diff=git_diff,
+            git_diff_url=git_diff_url,
+            git_diff_digest=git_diff_digest,
+            git_bundle_url=git_bundle_url,
+            git_bundle_digest=git_bundle_digest,
+            requirements_lock=requirements_lock,
+            commit=commit
+        )
+        prepare_workspace.execution_options.caching_strategy.max_cache_staleness = "P0D"
+
+        step_ops = {}
+        for step in steps:
+            step_op = run_step_op(
+                name=step.name,
+                workspace=workspace,
+                container_image=container_image,
+                command=step.command,
+                args=step.args,
+                cwd=cwd
+            ).after(prepare_workspace, *(step_ops[upstream] for upstream in step.after))
+
+            resources = dict(step.resources)
+            if int(resources['gpu_limit'] or 0) > 0:
+                step_op.add_resource_request(resources['gpu_vendor'], resources['gpu_limit'])
+                step_op.add_resource_limit(resources['gpu_vendor'], resources['gpu_limit'])
+            step_op.add_resource_request('cpu', resources['cpu_request'])
+            step_op.add_resource_limit('cpu', resources['cpu_limit'])
+            step_op.add_resource_request('memory', resources['memory_request'])
+            step_op.add_resource_limit('memory', resources['memory_limit'])
+            step_op.execution_options.caching_strategy.max_cache_staleness = "P0D"
+            step_ops[step.name] = step_op
+
+        dsl.get_pipeline_conf().set_timeout(PIPELINE_TIMEOUT)
+
+    return simple_task_graph
+
+
+def run_variant_op(name: str, workspace, container_image: str, command: str, args: str, cwd: str, index: str):
+    """
+    Run a variant of a parameter sweep in the checkout and virtual environment of the workspace.
+
+    The exit status of the command is recorded in `/workspace/sweep/<index>/exit_code` instead of failing the step,
+    so the summary runs after all variants. The command may write a JSON object of metrics to `$SWEEP_METRICS_PATH`.
+
+    Args:
+        name (str): The name of the container operation.
+        workspace (dsl.PipelineVolume): The workspace volume.
+        container_image (str): The container image to use for the operation.
+        command (str): The command to run inside the container.
+        args (str): The arguments of the variant.
+        cwd (str): The working directory of the command.
+        index (str): The index of the variant.
+
+    Returns:
+        dsl.ContainerOp: The container operation object.
+    """
+    op = dsl.ContainerOp(
+        name=name,
+        image=container_image,
+        command=['sh', '-c'],
+        arguments=[
+            f"""
+mkdir -p "$STEP_OUTPUT_DIR" && \
+. {WORKSPACE_PATH}/venv/bin/activate && \
+cd {cwd} || exit 1
+
+python {command} {args}
+exit_code=$?
+echo $exit_code > "$STEP_OUTPUT_DIR/exit_code"
+echo "variant {index} exited with $exit_code"
+            """
+        ],
+    ).add_pvolumes({WORKSPACE_PATH: workspace})
+    for volume_mount in workspace_mounts(workspace.name):
+        op.add_volume_mount(volume_mount)
+    return op.add_env_variable(kubernetes_client.V1EnvVar(
+        name='WORKSPACE_DIR', value=WORKSPACE_PATH
+    )).add_env_variable(kubernetes_client.V1EnvVar(
+        name='STEP_OUTPUT_DIR', value=f'{SWEEP_PATH}/{index}'
+    )).add_env_variable(kubernetes_client.V1EnvVar(
+        name='SWEEP_INDEX', value=str(index)
+    )).add_env_variable(kubernetes_client.V1EnvVar(
+        name='SWEEP_METRICS_PATH', value=f'{SWEEP_PATH}/{index}/metrics.json'
+    )).add_env_variable(kubernetes_client.V1EnvVar(
+        name="MLFLOW_TRACKING_URI", value="http://mlflow-server:5000"
+    )).add_env_variable(kubernetes_client.V1EnvVar(
+        name="MLFLOW_REGISTRY_URI", value="http://mlflow-server:5000"
+    )).add_env_variable(kubernetes_client.V1EnvVar(
+        name='INSIDE_KFP_FUNC_CONTAINER', value='true'))
+
+
+def summarize_sweep_op(name: str, workspace, container_image: str, sweep: str):
+    """
+    Collect the exit status and metrics of all variants of a parameter sweep into a summary.
+
+    The summary is a JSON list with the index, arguments, exit code and metrics of each variant, passed on as the
+    `summary` output. The step fails if a variant failed, after writing the summary.
+
+    Args:
+        name (str): The name of the container operation.
+        workspace (dsl.PipelineVolume): The workspace volume.
+        container_image (str): The container image to use for the operation.
+        sweep (str): The JSON list of variants of the sweep.
+
+    Returns:
+        dsl.ContainerOp: The container operation object.
+    """
+    return dsl.ContainerOp(
+        name=name,
+        image=container_image,
+        command=['sh', '-c'],
+        arguments=[
+            f"""
+python - <<'EOF'
+import os
+import json
+
+summary = []
+for variant in json.loads(os.environ['SWEEP']):
+    output_dir = os.path.join('{SWEEP_PATH}', str(variant['index']))
+    try:
+        with open(os.path.join(output_dir, 'exit_code')) as f:
+            exit_code = int(f.read())
+    except (OSError, ValueError):
+        exit_code = None
+    try:
+        with open(os.path.join(output_dir, 'metrics.json')) as f:
+            metrics = json.load(f)
+    except (OSError, ValueError):
+        metrics = {{}}
+    summary.append({{'index': variant['index'], 'args': variant['args'], 'exit_code': exit_code, 'metrics': metrics}})
+    print(variant['index'], exit_code, variant['args'], json.dumps(metrics), sep='\\t')
+
+os.makedirs(os.path.dirname('{SWEEP_SUMMARY_PATH}'), exist_ok=True)
+with open('{SWEEP_SUMMARY_PATH}', 'w') as f:
+    json.dump(summary, f)
+
+failed = [variant['index'] for variant in summary if variant['exit_code'] != 0]
+if failed:
+    raise SystemExit(f'variants {{failed}} failed')
+EOF
+            """
+        ],
+        file_outputs={'summary': SWEEP_SUMMARY_PATH},
+    ).add_pvolumes({WORKSPACE_PATH: workspace}).add_env_variable(kubernetes_client.V1EnvVar(
+        name='SWEEP', value=sweep))
+
+
+@functools.lru_cache(maxsize=None)
+def build_sweep_pipeline(volume: bool = False, gpu: bool = False, env_image_build: bool = False, parallelism: int = None,
+                         workspace_size: str = '10Gi', workspace_storage_class: str = None,
+                         workspace_access_mode: str = 'ReadWriteOnce'):
+    """
+    Build a pipeline running a parameter sweep of a task in a single run.
+
+    The repository is checked out and the dependencies are installed once into a workspace volume created for the run,
+    then the variants given by the `sweep` parameter, a JSON list of `{"index": ..., "args": ...}` objects, fan out with
+    `dsl.ParallelFor` and a summary of their exit status and metrics is collected. The pipeline takes the parameters
+    of `simple_task_pipeline` plus `sweep`, the `args` parameter is unused. Pipelines are cached by their settings.
+
+    Args:
+        volume (bool, optional): Whether the variants mount a volume. Defaults to False.
+        gpu (bool, optional): Whether the variants request GPUs. Defaults to False.
+        env_image_build (bool, optional): Whether the environment image of the task is built first. Defaults to False.
+        parallelism (int, optional): The maximum number of variants running at once. Defaults to None, no limit.
+        workspace_size (str, optional): The size of the workspace volume. Defaults to '10Gi'.
+        workspace_storage_class (str, optional): The storage class of the workspace volume. Defaults to the cluster default.
+        workspace_access_mode (str, optional): The access mode of the workspace volume, variants on different nodes
+            need 'ReadWriteMany'. Defaults to 'ReadWriteOnce'.
+
+    Returns:
+        Callable: The pipeline function.
+    """
+    @dsl.pipeline(
+        name='Simple Task Sweep',
+        description='A pipeline that clones a Git repository, installs the dependencies once and runs a script for each variant of a sweep.'
+    )
+    def simple_task_sweep(
+        remote_url: str = 'https://github.com/your/repo.git',
+        branch: str = 'main',
+        commit: str = 'HEAD',
+        command: str = 'script.py',
+        args: str = '',
+        cwd: str = '/app',
+        requirements: str = '',
+        packages: str = '',
+        gpu_limit: int = 0,
+        gpu_vendor='nvidia.com/gpu',
+        cpu_limit: str = "1",
+        cpu_request: str = "0.5",
+        memory_limit: str = '2Gi',
+        memory_request: str = '1Gi',
+        git_diff: str = '',
+        git_diff_url: str = '',
+        git_diff_digest: str = '',
+        git_bundle_url: str = '',
+        git_bundle_digest: str = '',
+        requirements_lock: str = '',
+        env_image: str = '',
+        env_image_dockerfile: str = '',
+        env_image_insecure: str = 'false',
+        container_image: str = 'python:3.12.3-slim',
+        volume_name='',
+        sweep: str = '[]'
+    ):
+        workspace = dsl.VolumeOp(
+            name="Create Workspace",
+            resource_name="workspace",
+            size=workspace_size,
+            storage_class=workspace_storage_class,
+            modes=[workspace_access_mode],
+            set_owner_reference=True
+        ).volume
+
+        prepare_workspace = prepare_workspace_op(
+            name="Prepare Workspace",
+            workspace=workspace,
+            container_image=container_image,
+            cwd=cwd,
+            remote_url=remote_url,
+            branch=branch,
+            requirements=requirements,
+            packages=packages,
+            git_diff=git_diff,
+            git_diff_url=git_diff_url,
+            git_diff_digest=git_diff_digest,
+            git_bundle_url=git_bundle_url,
+            git_bundle_digest=git_bundle_digest,
+            requirements_lock=requirements_lock,
+            commit=commit
+        )
+        prepare_workspace.execution_options.caching_strategy.max_cache_staleness = "P0D"
+
+        if env_image_build:
+            build_env_image = build_env_image_op(
+                name="Build Environment Image",
+                env_image=env_image,
+                env_image_dockerfile=env_image_dockerfile,
+                env_image_insecure=env_image_insecure
+            )
+            build_env_image.execution_options.caching_strategy.max_cache_staleness = "P0D"
+            prepare_workspace.after(build_env_image)
+
+        with dsl.ParallelFor(sweep, parallelism=parallelism) as variant:
+            run_variant = run_variant_op(
+                name="Run Variant",
+                workspace=workspace,
+                container_image=container_image,
+                command=command,
+                args=variant.args,
+                cwd=cwd,
+                index=variant.index
+            ).after(prepare_workspace)
+
+            if volume:
+                run_variant.add_volume(
+                    kubernetes_client.V1Volume(
+                        name="data-volume",
+                        persistent_volume_claim=kubernetes_client.V1PersistentVolumeClaimVolumeSource(
+                            claim_name=volume_name)
+                    )
+                ).add_volume_mount(
+                    kubernetes_client.V1VolumeMount(
+                        name="data-volume", mount_path='/volume'
+                    )
+                )
+
+            if gpu:
+                run_variant.add_resource_request(gpu_vendor, gpu_limit)
+                run_variant.add_resource_limit(gpu_vendor, gpu_limit)
+            run_variant.add_resource_request('cpu', cpu_request)
+            run_variant.add_resource_limit('cpu', cpu_limit)
+            run_variant.add_resource_request('memory', memory_request)
+            run_variant.add_resource_limit('memory', memory_limit)
+            run_variant.execution_options.caching_strategy.max_cache_staleness = "P0D"
+
+        summarize_sweep = summarize_sweep_op(
+            name="Summarize Sweep",
+            workspace=workspace,
+            container_image=container_image,
+            sweep=sweep
+        ).after(run_variant)
+        summarize_sweep.execution_options.caching_strategy.max_cache_staleness = "P0D"
+
+        dsl.get_pipeline_conf().set_timeout(PIPELINE_TIMEOUT)
+
+    return simple_task_sweep
+
+
+def cache_volume(name: str, pvc_name: str = None, host_path: str = None):
+    """
+    Build a volume shared between runs, backed by a persistent volume claim or a host path.
+
+    Args:
+        name (str): The name of the volume.
+        pvc_name (str, optional): The name of the persistent volume claim. Defaults to None.
+        host_path (str, optional): The host path, used if no claim is given. Defaults to None.
+
+    Returns:
+        kubernetes_client.V1Volume: The volume.
+    """
+    if pvc_name:
+        return kubernetes_client.V1Volume(
+            name=name,
+            persistent_volume_claim=kubernetes_client.V1PersistentVolumeClaimVolumeSource(
+                claim_name=pvc_name)
+        )
+    return kubernetes_client.V1Volume(
+        name=name,
+        host_path=kubernetes_client.V1HostPathVolumeSource(
+            path=host_path, type='DirectoryOrCreate')
+    )
+
+
+def add_git_mirror(op: dsl.ContainerOp, pvc_name: str = None, host_path: str = None):
+    """
+    Mount a shared Git mirror volume into the git-clone sidecar or init container of an operation.
+
+    Args:
+        op (dsl.ContainerOp): The container operation.
+        pvc_name (str, optional): The name of the persistent volume claim holding the mirror. Defaults to None.
+        host_path (str, optional): The host path holding the mirror, used if no claim is given. Defaults to None.
+
+    Returns:
+        dsl.ContainerOp: The container operation object.
+    """
+    containers = [container for container in op.sidecars + op.init_containers if container.name == 'git-clone']
+    if not containers:
+        return op
+    op.add_volume(cache_volume('git-mirror', pvc_name=pvc_name, host_path=host_path))
+    for container in containers:
+        container.volume_mounts.append(kubernetes_client.V1VolumeMount(
+            name='git-mirror', mount_path=GIT_MIRROR_PATH))
+    return op
+
+
+def use_init_checkout(op: dsl.ContainerOp):
+    """
+    Run the git-clone sidecar of an operation as an init container instead.
+
+    The checkout then finishes before the main container starts, which neither polls
+    for it nor loses its log.
+
+    Args:
+        op (dsl.ContainerOp): The container operation.
+
+    Returns:
+        dsl.ContainerOp: The container operation object.
+    """
+    for sidecar in list(op.sidecars):
+        if sidecar.name == 'git-clone':
+            op.sidecars.remove(sidecar)
+            op.init_containers.append(sidecar)
+    return op
+
+
+def set_cache_staleness(op: dsl.ContainerOp, max_cache_staleness: str):
+    """
+    Let KFP reuse the result of a run step which was executed with the same template within the staleness window.
+
+    Args:
+        op (dsl.ContainerOp): The container operation, other operations than the run steps are left untouched.
+        max_cache_staleness (str): The staleness window as ISO 8601 duration, e.g. 'P7D'.
+
+    Returns:
+        dsl.ContainerOp: The container operation object.
+    """
+    if op.human_name.startswith('Run Command'):
+        op.execution_options.caching_strategy.max_cache_staleness = max_cache_staleness
+    return op
+
+
+def add_env_cache(op: dsl.ContainerOp, pvc_name: str = None, host_path: str = None,
+                  max_size_mb: int = ENV_CACHE_MAX_SIZE_MB, max_age_days: int = ENV_CACHE_MAX_AGE_DAYS):
+    """
+    Mount a shared environment cache volume into the main container of an operation.
+
+    Args:
+        op (dsl.ContainerOp): The container operation, resource operations (e.g. the workspace volume) are left untouched.
+        pvc_name (str, optional): The name of the persistent volume claim holding the cache. Defaults to None.
+        host_path (str, optional): The host path holding the cache, used if no claim is given. Defaults to None.
+        max_size_mb (int, optional): The size above which least recently used environments are evicted. Defaults to 20480.
+        max_age_days (int, optional): The number of days after which unused environments are evicted. Defaults to 14.
+
+    Returns:
+        dsl.ContainerOp: The container operation object.
+    """
+    if not isinstance(op, dsl.ContainerOp):
+        return op
+    return op.add_volume(
+        cache_volume('env-cache', pvc_name=pvc_name, host_path=host_path)
+    ).add_volume_mount(
+        kubernetes_client.V1VolumeMount(
+            name='env-cache', mount_path=ENV_CACHE_PATH)
+    ).add_env_variable(kubernetes_client.V1EnvVar(
+        name='ENV_CACHE_MAX_SIZE_MB', value=str(max_size_mb)
+    )).add_env_variable(kubernetes_client.V1EnvVar(
+        name='ENV_CACHE_MAX_AGE_DAYS', value=str(max_age_days)))
+
+
+def pipeline_conf(git_mirror_pvc: str = None, git_mirror_host_path: str = None,
+                  env_cache_pvc: str = None, env_cache_host_path: str = None,
+                  env_cache_max_size_mb: int = ENV_CACHE_MAX_SIZE_MB, env_cache_max_age_days: int = ENV_CACHE_MAX_AGE_DAYS,
+                  env_image_registry_secret: str = None, checkout_mode: str = 'sidecar',
+                  cache_staleness: str = None):
+    """
+    Build the configuration of the simple task pipeline for the given compile-time options.
+
+    Args:
+        git_mirror_pvc (str, optional): The persistent volume claim of a shared Git mirror. Defaults to None.
+        git_mirror_host_path (str, optional): The host path of a shared Git mirror. Defaults to None.
+        env_cache_pvc (str, optional): The persistent volume claim of a shared environment cache. Defaults to None.
+        env_cache_host_path (str, optional): The host path of a shared environment cache. Defaults to None.
+        env_cache_max_size_mb (int, optional): The size limit of the environment cache. Defaults to 20480.
+        env_cache_max_age_days (int, optional): The number of days unused environments are kept. Defaults to 14.
+        env_image_registry_secret (str, optional): The docker config secret used to push environment images. Defaults to None.
+        checkout_mode (str, optional): Check out the repository in a 'sidecar' next to the main container or in an 'init' container
+            before it. Defaults to 'sidecar'.
+        cache_staleness (str, optional): The ISO 8601 duration for which results of identical run steps are reused.
+            Defaults to None, which always reruns the step.
+
+    Returns:
+        dsl.PipelineConf: The pipeline configuration.
+
+    Raises:
+        ValueError: If the checkout mode is not supported.
+    """
+    if checkout_mode not in CHECKOUT_MODES:
+        raise ValueError(f"Unsupported checkout mode {checkout_mode}.")
+
+    conf = dsl.PipelineConf()
+    conf.set_timeout(PIPELINE_TIMEOUT)
+    if git_mirror_pvc or git_mirror_host_path:
+        conf.add_op_transformer(functools.partial(
+            add_git_mirror, pvc_name=git_mirror_pvc, host_path=git_mirror_host_path))
+    if env_cache_pvc or env_cache_host_path:
+        conf.add_op_transformer(functools.partial(
+            add_env_cache, pvc_name=env_cache_pvc, host_path=env_cache_host_path,
+            max_size_mb=env_cache_max_size_mb, max_age_days=env_cache_max_age_days))
+    if env_image_registry_secret:
+        conf.add_op_transformer(functools.partial(add_registry_secret, secret_name=env_image_registry_secret))
+    if cache_staleness:
+        conf.add_op_transformer(functools.partial(set_cache_staleness, max_cache_staleness=cache_staleness))
+    # applied last, so the transformers above still find the git-clone sidecar
+    if checkout_mode == 'init':
+        conf.add_op_transformer(use_init_checkout)
+    return conf
+
+
+def compile_pipeline(package_path: str, shape: tuple = None, sweep: tuple = None, replicas: int = None, graph: tuple = None,
+                     **options):
+    """
+    Compile the simple task pipeline into a package.
+
+    Args:
+        package_path (str): The path of the package file to write.
+        shape (tuple, optional): The (volume, gpu, env_image_build) shape to specialize the pipeline for with
+            `build_task_pipeline`. Defaults to None, which compiles the generic `simple_task_pipeline`.
+        sweep (tuple, optional): The (parallelism, workspace_size, workspace_storage_class, workspace_access_mode)
+            settings to compile a sweep pipeline of the shape with `build_sweep_pipeline`. Defaults to None.
+        replicas (int, optional): The number of pods running the task of the shape together. Defaults to None, a single pod.
+        graph (tuple, optional): The (steps, workspace_size, workspace_storage_class, workspace_access_mode) settings
+            to compile a task graph pipeline with `build_graph_pipeline` instead. Defaults to None.
+        **options: The compile-time options passed to `pipeline_conf`.
+    """
+    if graph is not None:
+        pipeline_func = build_graph_pipeline(*graph)
+    elif sweep is not None:
+        pipeline_func = build_sweep_pipeline(*(shape or (False, False, False)), *sweep)
+    elif shape is None:
+        pipeline_func = simple_task_pipeline
+    else:
+        pipeline_func = build_task_pipeline(*shape, replicas=replicas or 1)
+    compiler.Compiler().compile(pipeline_func, package_path, pipeline_conf=pipeline_conf(**options))
+
+
+@functools.lru_cache(maxsize=None)
+def package_source_digest() -> str:
+    """
+    Compute the digest of the sources of the simple_kfp_task package.
+
+    The compiled pipeline depends on this module and on the modules it imports (e.g. `distributed`), so all of them
+    are covered.
+
+    Returns:
+        str: The hex encoded digest.
+    """
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(package_dir)):
+        if name.endswith('.py'):
+            digest.update(name.encode('utf-8'))
+            with open(os.path.join(package_dir, name), 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def pipeline_package_key(shape: tuple = None, sweep: tuple = None, replicas: int = None, graph: tuple = None,
+                         **options) -> str:
+    """
+    Compute the key a compiled pipeline package is cached by.
+
+    The key covers the library version, the sources of the package (so editable installs never use
+    a stale package), the shape, the sweep settings, the replicas, the task graph and the compile-time options.
+
+    Args:
+        shape (tuple, optional): The shape the pipeline is specialized for. Defaults to None.
+        sweep (tuple, optional): The settings of a sweep pipeline. Defaults to None.
+        replicas (int, optional): The number of pods of a distributed pipeline. Defaults to None.
+        graph (tuple, optional): The settings of a task graph pipeline. Defaults to None.
+        **options: The compile-time options passed to `pipeline_conf`.
+
+    Returns:
+        str: The cache key.
+    """
+    try:
+        version = metadata.version('simple-kfp-task')
+    except metadata.PackageNotFoundError:
+        version = 'dev'
+
+    # fill in the defaults, so omitted and explicitly passed default options share a package
+    options = inspect.signature(pipeline_conf).bind(**options)
+    options.apply_defaults()
+
+    digest = hashlib.sha256(package_source_digest().encode('utf-8'))
+    digest.update(json.dumps([shape, sweep, replicas, graph, options.arguments], sort_keys=True).encode('utf-8'))
+    return f"{version}-{digest.hexdigest()[:16]}"
+
+
+def get_pipeline_package(cache_dir: str = PIPELINE_CACHE_DIR, shape: tuple = None, sweep: tuple = None, replicas: int = None,
+                         graph: tuple = None, **options) -> str:
+    """
+    Get the compiled simple task pipeline package for the given compile-time options, compiling it only once.
+
+    Packages are cached in '~/.cache/simple-kfp-task/pipelines' by `pipeline_package_key`.
+
+    Args:
+        cache_dir (str, optional): The directory the packages are cached in.
+        shape (tuple, optional): The shape to specialize the pipeline for. Defaults to None, the generic pipeline.
+        sweep (tuple, optional): The settings of a sweep pipeline. Defaults to None.
+        replicas (int, optional): The number of pods of a distributed pipeline. Defaults to None.
+        graph (tuple, optional): The settings of a task graph pipeline. Defaults to None.
+        **options: The compile-time options passed to `pipeline_conf`.
+
+    Returns:
+        str: The path of the pipeline package.
+    """
+    package_path = os.path.join(cache_dir, f"{PIPELINE_NAME}-{pipeline_package_key(shape, sweep, replicas, graph, **options)}.yaml")
+    if not os.path.exists(package_path):
+        os.makedirs(cache_dir, exist_ok=True)
+        # compile to a temporary file first, so concurrent compilations never expose partial packages
+        with tempfile.NamedTemporaryFile(dir=cache_dir, suffix='.yaml', delete=False) as f:
+            compile_pipeline(f.name, shape, sweep, replicas, graph, **options)
+        os.replace(f.name, package_path)
+    return package_path
+
+
+def find_pipeline_version(kfp_client, pipeline_id: str, version_name: str):
+    """
+    Find a version of a pipeline by name, newest versions first.
+
+    Args:
+        kfp_client (kfp.Client): The client to list the versions with.
+        pipeline_id (str): The id of the pipeline.
+        version_name (str): The name of the version.
+
+    Returns:
+        str: The id of the version, or None if the pipeline has no version of the name.
+    """
+    page_token = ''
+    while True:
+        response = kfp_client.list_pipeline_versions(
+            pipeline_id, page_token=page_token, page_size=100, sort_by='created_at desc')
+        for version in response.versions or []:
+            if version.name == version_name:
+                return version.id
+        page_token = response.next_page_token
+        if not page_token:
+            return None
+
+
+def get_pipeline_version(kfp_client, package_path: str):
+    """
+    Get the pipeline version of a pipeline package, uploading it to KFP only once.
+
+    Versions are named by the digest of the package and belong to the pipeline 'simple-task-pipeline'. The first
+    package creates the pipeline and is its default version, which KFP names after the pipeline, so the description
+    of the pipeline records the package of the default version. Known versions are looked up by name, so every package
+    is uploaded once per KFP instance.
+
+    Args:
+        kfp_client (kfp.Client): The client to look up and upload the version with.
+        package_path (str): The path of the pipeline package.
+
+    Returns:
+        tuple: The pipeline id and the version id.
+    """
+    with open(package_path, 'rb') as f:
+        version_name = f"{PIPELINE_NAME}-{hashlib.sha256(f.read()).hexdigest()[:16]}"
+
+    with _pipeline_versions_lock:
+        known_versions = _pipeline_versions.setdefault(kfp_client, {})
+        if version_name in known_versions:
+            return known_versions[version_name]
+
+        pipeline_id = kfp_client.get_pipeline_id(PIPELINE_NAME)
+        if pipeline_id is None:
+            pipeline = kfp_client.upload_pipeline(package_path, pipeline_name=PIPELINE_NAME, description=version_name)
+            pipeline_id, version_id = pipeline.id, pipeline.default_version.id
+        else:
+            version_id = find_pipeline_version(kfp_client, pipeline_id, version_name)
+            if version_id is None:
+                pipeline = kfp_client.get_pipeline(pipeline_id)
+                if pipeline.description == version_name and pipeline.default_version:
+                    version_id = pipeline.default_version.id
+            if version_id is None:
+                version_id = kfp_client.upload_pipeline_version(
+                    package_path, pipeline_version_name=version_name, pipeline_id=pipeline_id).id
+
+        known_versions[version_name] = (pipeline_id, version_id)
+        return pipeline_id, version_id
@@ -0,0 +1,74 @@
+import os
+import json
+import shlex
+import itertools
+from typing import List, Union
+
+
+def _format_args(point: dict) -> List[str]:
+    """
+    Formats a point of a sweep as command line arguments, keys without leading '-' become `--key`.
+
+    A `True` value passes the key as a flag, `False` and `None` leave it out.
+    """
+    args = []
+    for key, value in point.items():
+        if value is False or value is None:
+            continue
+        args.append(key if key.startswith('-') else f'--{key}')
+        if value is not True:
+            args.append(str(value))
+    return args
+
+
+def expand_sweep(sweep: Union[dict, list]) -> List[List[str]]:
+    """
+    Expands a sweep into the arguments of its variants.
+
+    A sweep is either a grid, a dict mapping argument names to a list of values, which expands into the cartesian
+    product (`{"lr": [0.1, 0.01], "epochs": 10}` -> `--lr 0.1 --epochs 10`, `--lr 0.01 --epochs 10`), or a list of
+    argument sets, each a list of arguments, a command line string or a dict of argument names and values.
+
+    Args:
+        sweep (Union[dict, list]): The grid or the list of argument sets.
+
+    Returns:
+        List[List[str]]: The arguments of each variant.
+
+    Raises:
+        ValueError: If the sweep is empty or not a grid or a list.
+    """
+    if isinstance(sweep, dict):
+        values = [value if isinstance(value, list) else [value] for value in sweep.values()]
+        variants = [_format_args(dict(zip(sweep, point))) for point in itertools.product(*values)]
+    elif isinstance(sweep, list):
+        variants = []
+        for arg_set in sweep:
+            if isinstance(arg_set, dict):
+                variants.append(_format_args(arg_set))
+            elif isinstance(arg_set, str):
+                variants.append(shlex.split(arg_set))
+            else:
+                variants.append([str(arg) for arg in arg_set])
+    else:
+        raise ValueError("A sweep is either a grid of argument values or a list of argument sets.")
+
+    if not variants:
+        raise ValueError("The sweep has no variants.")
+    return variants
+
+
+def load_sweep(value: str) -> Union[dict, list]:
+    """
+    Loads a sweep from a JSON file or a JSON string.
+
+    Args:
+        value (str): The path of a JSON file or the JSON of the sweep.
+
+    Returns:
+        Union[dict, list]: The sweep.
+    """
+    if os.path.exists(value):
+        with open(value, 'r') as f:
+            return json.load(f)
+    return json.loads(value)
@@ -1,12 +1,50 @@
 import os
-from simple_kfp_task.deploykf import create_kfp_client
-from typing import Callable
-from simple_kfp_task.pipeline import simple_task_pipeline
-from simple_kfp_task.utils import encode_string_to_base64, get_caller_filename
-from simple_kfp_task.git_helper import GitHelper
+import sys
+import json
+import shlex
+import base64
+import asyncio
+import datetime
+import functools
+import hashlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from simple_kfp_task.monitor import AsyncRun, RUN_MONITOR_MAX_CONCURRENCY
+from typing import Callable, List
+from simple_kfp_task.utils import encode_string_to_base64, compress_string, sha256_digest, get_caller_filename
+from simple_kfp_task.dependency_lock import LOCK_PLATFORM, get_lock, python_version_from_image
+from simple_kfp_task.sweep import expand_sweep
+
+# kfp, the kubernetes client and GitPython are slow to import, they are imported
+# where they are used so `import simple_kfp_task` and `--help` stay fast
 
 GIT_DIFF_MAX_LENGTH = 10000
+GIT_DIFF_STORE_COMPRESSION_LEVEL = 6
 PIP_PACKAGE_NAME = "simple-kfp-task-stub"
+RUN_MANY_MAX_WORKERS = 8
+
+TaskRunResult = namedtuple('TaskRunResult', ['task', 'run', 'error'])
+
+
+class RunPipelineResult:
+    """
+    A run submitted by pipeline version, with the same interface as the result of `kfp.Client.create_run_from_pipeline_package`.
+
+    Args:
+        kfp_client (kfp.Client): The client the run was submitted with.
+        run_info (kfp_server_api.ApiRun): The submitted run.
+    """
+
+    def __init__(self, kfp_client, run_info):
+        self._client = kfp_client
+        self.run_info = run_info
+        self.run_id = run_info.id
+
+    def wait_for_run_completion(self, timeout=None):
+        return self._client.wait_for_run_completion(self.run_id, timeout or datetime.timedelta.max)
+
+    def __repr__(self):
+        return f'RunPipelineResult(run_id={self.run_id})'
 
 
 class Task:
@@ -35,11 +73,60 @@ class Task:
         memory_limit (str, optional): The memory limit for the task. Defaults to "2Gi".
         memory_request (str, optional): The memory request for the task. Defaults to "1Gi".
         volume_name (str, optional): The name of the volume to be used for the task. Defaults to None.
+        diff_store (str, optional): The URL of an artifact store (`s3://`, `http(s)://` or `file://`, which only local runs can read)
+            to upload the Git diff including untracked files to, instead of passing it inline. Defaults to None.
+        git_bundle (bool, optional): Ship the local commits missing on the remote as a thin Git bundle through the diff store,
+            so the branch does not need to be pushed. Defaults to False.
+        git_mirror_pvc (str, optional): The persistent volume claim of a shared Git mirror the clone uses as reference. Defaults to None.
+        git_mirror_host_path (str, optional): The host path of a shared Git mirror, used if no claim is given. Defaults to None.
+        env_cache_pvc (str, optional): The persistent volume claim of a shared cache of virtual environments. Defaults to None.
+        env_cache_host_path (str, optional): The host path of a shared cache of virtual environments, used if no claim is given. Defaults to None.
+        env_cache_max_size_mb (int, optional): The size above which least recently used environments are evicted. Defaults to 20480.
+        env_cache_max_age_days (int, optional): The number of days after which unused environments are evicted. Defaults to 14.
+        lock_dependencies (bool, optional): Resolve the requirements and packages on the client into a pinned lock with hashes,
+            which the pod installs without resolving. Defaults to False.
+        lock_python_version (str, optional): The Python version to resolve the lock for. Defaults to the version in the tag of
+            the container image, or the local version if the tag has none.
+        lock_platform (Union[str, List[str]], optional): The platform to resolve the lock for, including the older manylinux
+            tags compatible with it, or a list of platform tags. Defaults to 'manylinux_2_28_x86_64'.
+        env_image_repository (str, optional): The repository of prebuilt environment images. The task runs in the image tagged
+            with the fingerprint of the container image, requirements and packages, which is built once in the pipeline if it
+            does not exist yet. Defaults to None.
+        env_image_insecure (bool, optional): Whether the registry of the environment images is served over plain HTTP. Defaults to False.
+        env_image_verify_ssl (bool, optional): Whether to verify the certificate of the registry of the environment images, independent
+            of `verify_ssl`. Defaults to True.
+        env_image_registry_secret (str, optional): The docker config secret used to push environment images. Defaults to None.
+        checkout_mode (str, optional): Check out the repository in a 'sidecar' next to the main container or in an 'init'
+            container before it, which avoids polling and keeps the full checkout log. Defaults to 'sidecar'.
+        cache_staleness (str, optional): Reuse the result of an identical earlier run within this ISO 8601 duration, e.g. 'P7D'.
+            KFP caches the run step by its rendered template, so every pipeline argument (commit, Git diff, diff and bundle
+            URLs, command, arguments, dependencies, image and resources) must be the same. Artifact store URLs are
+            content-addressed and presigned S3 URLs are reused for six days, a diff resubmitted after that misses the cache.
+            Defaults to None, which always reruns.
+        no_cache (bool, optional): Rerun the task even if `cache_staleness` is set. Defaults to False.
+        register_pipeline (bool, optional): Upload the compiled pipeline once as a pipeline version and submit runs by
+            pipeline and version id with only the arguments, instead of uploading the package with every run. Defaults to False.
+        sweep (Union[dict, list], optional): Run a variant of the command for each argument set of a sweep in a single run,
+            which checks out the code and installs the dependencies once, see `expand_sweep`. The arguments of a variant are
+            appended to `args`. Defaults to None.
+        sweep_parallelism (int, optional): The maximum number of variants running at once. Defaults to None, no limit.
+        sweep_workspace_size (str, optional): The size of the workspace volume of a sweep. Defaults to '10Gi'.
+        sweep_workspace_storage_class (str, optional): The storage class of the workspace volume of a sweep. Defaults to None.
+        sweep_workspace_access_mode (str, optional): The access mode of the workspace volume of a sweep, variants on
+            different nodes need 'ReadWriteMany'. Defaults to 'ReadWriteOnce'.
+        replicas (int, optional): Run the task as a coordinated group of this many pods with the same checkout, command and
+            resources. Each pod gets the rendezvous settings `MASTER_ADDR`, `MASTER_PORT`, `WORLD_SIZE` and `RANK` for
+            torch.distributed and a `TF_CONFIG` for TensorFlow. Step caching is disabled for distributed tasks. Defaults to 1.
 
     Raises:
         ValueError: If the command is not provided or does not exist.
         ValueError: If the branch is not available on the remote repository.
-        ValueError: If the Git diff is too long. Please commit and push your changes first.
+        ValueError: If a Git bundle is requested without a diff store.
+        ValueError: If the requirements file to lock or to build an environment image from does not exist.
+        ValueError: If the Git diff is too long and no diff store is used. Please commit and push your changes first.
+        ValueError: If the Git diff of the uncommitted changes cannot be built.
+        ValueError: If the sweep has no variants.
+        ValueError: If the number of replicas is invalid or combined with a sweep.
 
     """
 
@@ -67,7 +154,32 @@ class Task:
         cpu_request="0.5",
         memory_limit="2Gi",
         memory_request="1Gi",
-        volume_name=None
+        volume_name=None,
+        diff_store=None,
+        git_bundle=False,
+        git_mirror_pvc=None,
+        git_mirror_host_path=None,
+        env_cache_pvc=None,
+        env_cache_host_path=None,
+        env_cache_max_size_mb=20480,
+        env_cache_max_age_days=14,
+        lock_dependencies=False,
+        lock_python_version=None,
+        lock_platform=LOCK_PLATFORM,
+        env_image_repository=None,
+        env_image_insecure=False,
+        env_image_verify_ssl=True,
+        env_image_registry_secret=None,
+        checkout_mode='sidecar',
+        cache_staleness=None,
+        no_cache=False,
+        register_pipeline=False,
+        sweep=None,
+        sweep_parallelism=None,
+        sweep_workspace_size='10Gi',
+        sweep_workspace_storage_class=None,
+        sweep_workspace_access_mode='ReadWriteOnce',
+        replicas=1
     ):
         self.namespace = namespace
         self.run_name = run_name
@@ -90,10 +202,38 @@ class Task:
         self.memory_limit = memory_limit
         self.memory_request = memory_request
         self.volume_name = volume_name
+        self.diff_store = diff_store
+        self.git_bundle = git_bundle
+        self.git_mirror_pvc = git_mirror_pvc
+        self.git_mirror_host_path = git_mirror_host_path
+        self.env_cache_pvc = env_cache_pvc
+        self.env_cache_host_path = env_cache_host_path
+        self.env_cache_max_size_mb = env_cache_max_size_mb
+        self.env_cache_max_age_days = env_cache_max_age_days
+        self.lock_dependencies = lock_dependencies
+        self.lock_python_version = lock_python_version
+        self.lock_platform = lock_platform
+        self.env_image_repository = env_image_repository
+        self.env_image_insecure = env_image_insecure
+        self.env_image_verify_ssl = env_image_verify_ssl
+        self.env_image_registry_secret = env_image_registry_secret
+        self.checkout_mode = checkout_mode
+        self.cache_staleness = cache_staleness
+        self.no_cache = no_cache
+        self.register_pipeline = register_pipeline
+        self.sweep = sweep
+        self.sweep_parallelism = sweep_parallelism
+        self.sweep_workspace_size = sweep_workspace_size
+        self.sweep_workspace_storage_class = sweep_workspace_storage_class
+        self.sweep_workspace_access_mode = sweep_workspace_access_mode
+        self.replicas = int(replicas or 1)
         self.kfp_host = kfp_host
         self.verify_ssl = verify_ssl
 
+        from simple_kfp_task.git_helper import GitHelper
+
         git_helper = GitHelper()
+        snapshot = git_helper.snapshot(remote=self.remote, branch=self.branch)
 
         if self.func:
             self.command = os.path.relpath(get_caller_filename(), os.getcwd())
@@ -103,7 +243,7 @@ class Task:
                 self.packages.append(PIP_PACKAGE_NAME)
 
         if not self.cwd:
-            self.cwd = f'/app/{git_helper.get_git_root(os.getcwd())}'
+            self.cwd = f'/app/{os.path.relpath(os.getcwd(), snapshot.working_dir)}'
 
         if not self.command:
             raise ValueError("Command is required.")
@@ -112,23 +252,179 @@ class Task:
             raise ValueError(f"Command {self.command} does not exist.")
         
         if self.remote_url is None:
-            self.remote_url = git_helper.get_remote_url(self.remote)
+            self.remote_url = snapshot.remote_url
 
         if not self.branch:
-            self.branch = git_helper.get_current_branch()
+            self.branch = snapshot.branch
+
+        if self.git_bundle and not self.diff_store:
+            raise ValueError("A diff store is required to ship a Git bundle.")
+
+        self.sweep_variants = expand_sweep(self.sweep) if self.sweep is not None else None
+
+        if self.replicas < 1:
+            raise ValueError(f"Invalid number of replicas {self.replicas}.")
+        if self.replicas > 1 and self.sweep_variants is not None:
+            raise ValueError("A sweep cannot run with several replicas.")
 
-        if not git_helper.is_branch_available_on_remote(remote=self.remote, branch=self.branch):
+        lock = None
+        self.requirements_lock = None
+        if self.lock_dependencies and (self.requirements or self.packages):
+            lock = self._resolve_lock()
+            self.requirements_lock = encode_string_to_base64(lock)
+
+        self.env_image = None
+        self.env_image_dockerfile = None
+        if self.env_image_repository and (self.requirements or self.packages):
+            self._select_env_image(lock)
+
+        # the pod checks out the nearest pushed ancestor and fetches the local commits from the bundle
+        bundle_base = None
+        if self.git_bundle and not self.commit:
+            bundle_base = git_helper.get_pushed_ancestor(remote=self.remote, branch=self.branch)
+
+        self.git_diff = None
+        self.git_diff_url = None
+        self.git_diff_digest = None
+        self.git_bundle_url = None
+        self.git_bundle_digest = None
+
+        if bundle_base:
+            self.commit, self.branch = bundle_base
+            git_bundle = git_helper.build_git_bundle(remote=self.remote)
+            self.git_bundle_digest = hashlib.sha256(git_bundle).hexdigest()
+            self.git_bundle_url = self._upload_artifact(self.git_bundle_digest, git_bundle)
+            if git_helper.is_git_dirty(include_untracked=True):
+                self._upload_git_diff(git_helper.build_git_diff(
+                    snapshot.head_commit, include_untracked=True, remote=self.remote, branch=self.branch))
+            return
+
+        if not snapshot.branch_on_remote:
             raise ValueError(f"Branch {self.branch} is not available on remote")
 
         if not self.commit:
-            self.commit = git_helper.get_last_commit_on_remote()
+            self.commit = snapshot.remote_commit
 
-        self.git_diff = None
-        if not git_helper.is_commit_available_on_remote(self.commit) or git_helper.is_git_dirty():
-            self.git_diff = encode_string_to_base64(git_helper.build_git_diff())
+        commit_on_remote = self.commit == snapshot.remote_commit or git_helper.is_commit_available_on_remote(
+            self.commit, remote=self.remote, branch=self.branch)
+        if self.diff_store:
+            if not commit_on_remote or git_helper.is_git_dirty(include_untracked=True):
+                self._upload_git_diff(git_helper.build_git_diff(
+                    snapshot.remote_commit, include_untracked=True, remote=self.remote, branch=self.branch))
+        elif not commit_on_remote or git_helper.is_git_dirty():
+            git_diff = git_helper.build_git_diff(snapshot.remote_commit, remote=self.remote, branch=self.branch)
+            if git_diff is None:
+                raise ValueError(f"Could not build the Git diff against {snapshot.remote_commit} on remote {self.remote}.")
+            self.git_diff = encode_string_to_base64(git_diff)
 
         if self.git_diff and len(self.git_diff) > GIT_DIFF_MAX_LENGTH:
-            raise ValueError(f"Git diff is too long {len(self.git_diff)}. Please commit and push your changes first.")
+            raise ValueError(f"Git diff is too long {len(self.git_diff)}. Please commit and push your changes first or use a diff store.")
+
+    def _resolve_lock(self):
+        """
+        Resolve the requirements and packages into a pinned lock, reusing a cached lock for the same inputs and target.
+
+        Returns:
+            str: The lock in requirements file format.
+
+        """
+        python_version = self.lock_python_version or python_version_from_image(self.container_image) \
+            or f"{sys.version_info.major}.{sys.version_info.minor}"
+        return get_lock(self._read_requirements(), list(self.packages or []), python_version, platform=self.lock_platform)
+
+    def _read_requirements(self):
+        """
+        Read the requirements file of the task.
+
+        Returns:
+            str: The content of the requirements file, empty if the task has none.
+
+        """
+        if not self.requirements:
+            return ""
+        if not os.path.exists(self.requirements):
+            raise ValueError(f"Requirements file {self.requirements} does not exist.")
+        with open(self.requirements, "r") as f:
+            return f.read()
+
+    def _select_env_image(self, lock: str = None):
+        """
+        Run the task in the prebuilt environment image for its dependencies instead of installing them in the pod.
+
+        If the image does not exist in the registry yet, its Dockerfile is passed to the pipeline, which builds it before running the task.
+
+        Args:
+            lock (str, optional): The lock of the requirements and packages, installed instead of them if given.
+
+        Raises:
+            ValueError: If the registry denies access to the environment image.
+
+        """
+        from simple_kfp_task.env_image import ENV_IMAGE_TAG_PREFIX, build_env_dockerfile, env_image_fingerprint, image_exists
+
+        if lock:
+            dockerfile = build_env_dockerfile(self.container_image, lock, [], locked=True)
+        else:
+            dockerfile = build_env_dockerfile(self.container_image, self._read_requirements(), list(self.packages or []))
+
+        self.env_image = f"{self.env_image_repository}:{ENV_IMAGE_TAG_PREFIX}{env_image_fingerprint(dockerfile)}"
+        if not image_exists(self.env_image, insecure=self.env_image_insecure, verify_ssl=self.env_image_verify_ssl):
+            self.env_image_dockerfile = base64.b64encode(dockerfile.encode('utf-8')).decode('utf-8')
+
+        # the dependencies are part of the image, so the install phase is skipped
+        self.container_image = self.env_image
+        self.requirements = None
+        self.packages = []
+        self.requirements_lock = None
+
+    def _upload_git_diff(self, git_diff: str):
+        """
+        Upload the compressed Git diff to the diff store, unless it is already present.
+
+        Args:
+            git_diff (str): The Git diff to upload, None if it could not be built.
+
+        Raises:
+            ValueError: If the Git diff could not be built.
+
+        """
+        if git_diff is None:
+            raise ValueError(f"Could not build the Git diff of the uncommitted changes for remote {self.remote}, "
+                             f"check that the remote exists and the commit is available locally.")
+        self.git_diff_digest = sha256_digest(git_diff)
+        self.git_diff_url = self._upload_artifact(
+            self.git_diff_digest, compress_string(git_diff, level=GIT_DIFF_STORE_COMPRESSION_LEVEL))
+
+    def _upload_artifact(self, digest: str, data: bytes):
+        """
+        Upload a blob to the diff store, unless it is already present.
+
+        Args:
+            digest (str): The digest the blob is stored under.
+            data (bytes): The content of the blob.
+
+        Returns:
+            str: The URL the pod downloads the blob from.
+
+        """
+        from simple_kfp_task.artifact_store import get_artifact_store
+
+        return get_artifact_store(self.diff_store, verify_ssl=self.verify_ssl).upload(digest, data)
+
+    def _check_remote_artifacts(self):
+        """
+        Check that the task pod can download the Git diff and bundle, which it cannot from a local `file://` artifact store.
+
+        Raises:
+            ValueError: If the Git diff or bundle is in a local artifact store.
+
+        """
+        for url in (self.git_diff_url, self.git_bundle_url):
+            if url and url.startswith('file://'):
+                raise ValueError(
+                    f"The artifact store {self.diff_store} is a local directory the task pod cannot read, "
+                    "use it for local runs only or use an s3:// or http(s):// store."
+                )
 
     @classmethod
     def init(cls, **kwargs):
@@ -144,40 +440,271 @@ class Task:
         """
         return cls(**kwargs)
 
-    def run(self):
+    def run(self, kfp_client=None, pipeline_package=None, executor='kfp', venv_cache=True):
         """
         Run the task using the provided configuration.
 
+        Args:
+            kfp_client (kfp.Client, optional): An authenticated client to submit with. Defaults to the pooled client for the task's host and namespace.
+            pipeline_package (str, optional): The path to an already compiled `simple_task_pipeline` package. Defaults to the package
+                compiled once per library version and compile-time options.
+            executor (str, optional): Submit the task to KFP ('kfp') or run it on this machine in a temporary Git worktree
+                the way the pod would ('local'), see `LocalExecutor`. Defaults to 'kfp'.
+            venv_cache (bool, optional): Reuse the virtual environment of the same dependencies for local runs. Defaults to True.
+
         Returns:
-            kfp_client.create_run_from_pipeline_func: The KFP run created for the task.
+            RunPipelineResult: The KFP run created for the task, or the `LocalRunResult` of a local run.
+
+        Raises:
+            ValueError: If the executor is not supported.
+            ValueError: If the Git diff or bundle of a KFP run is in a local `file://` artifact store.
 
         """
-        kfp_client = create_kfp_client(namespace=self.namespace, host=self.kfp_host, verify_ssl=self.verify_ssl)
-        return kfp_client.create_run_from_pipeline_func(
-            pipeline_func=simple_task_pipeline,
+        if executor == 'local':
+            from simple_kfp_task.local import LocalExecutor
+
+            return LocalExecutor(self, venv_cache=venv_cache).run()
+        if executor != 'kfp':
+            raise ValueError(f"Unsupported executor {executor}.")
+        self._check_remote_artifacts()
+
+        from simple_kfp_task.deploykf import get_kfp_client
+        from simple_kfp_task.distributed import check_distributed_package
+        from simple_kfp_task.pipeline import simple_task_pipeline, get_pipeline_package, get_pipeline_version
+
+        if kfp_client is None:
+            kfp_client = get_kfp_client(namespace=self.namespace, host=self.kfp_host, verify_ssl=self.verify_ssl)
+
+        if pipeline_package is None:
+            pipeline_package = get_pipeline_package(**self.pipeline_options())
+
+        if self.replicas > 1:
+            check_distributed_package(pipeline_package, self.replicas, gpu=int(self.gpu_limit or 0) > 0)
+
+        run_name = self.run_name or f"{simple_task_pipeline.__name__} {datetime.datetime.now().strftime('%Y-%m-%d %H-%M-%S')}"
+
+        if self.register_pipeline:
+            pipeline_id, version_id = get_pipeline_version(kfp_client, pipeline_package)
+            experiment = kfp_client.create_experiment(name=self.experiment_name or 'Default', namespace=self.namespace)
+            run_info = kfp_client.run_pipeline(
+                experiment_id=experiment.id,
+                job_name=run_name,
+                params=self.pipeline_arguments(),
+                pipeline_id=pipeline_id,
+                version_id=version_id
+            )
+            return RunPipelineResult(kfp_client, run_info)
+
+        return kfp_client.create_run_from_pipeline_package(
+            pipeline_file=pipeline_package,
             experiment_name=self.experiment_name,
-            run_name=self.run_name,
-            arguments={
-                "command": self.command if self.command else "",
-                "args": " ".join(self.args) if self.args else "",
-                "cwd": self.cwd,
-                "remote_url": self.remote_url,
-                "branch": self.branch,
-                "commit": self.commit,
-                "git_diff": self.git_diff if self.git_diff else "",
-                "requirements": self.requirements if self.requirements else "",
-                "packages": " ".join(self.packages) if self.packages else "",
-                "gpu_limit": self.gpu_limit,
-                "gpu_vendor": self.gpu_vendor,
-                "cpu_limit": self.cpu_limit,
-                "cpu_request": self.cpu_request,
-                "memory_limit": self.memory_limit,
-                "memory_request": self.memory_request,
-                "volume_name": self.volume_name if self.volume_name else "",
-                "container_image": self.container_image
-            }
+            run_name=run_name,
+            arguments=self.pipeline_arguments()
+        )
+
+    @classmethod
+    def run_many(cls, tasks: List["Task"], max_workers=RUN_MANY_MAX_WORKERS):
+        """
+        Submit several tasks at once.
+
+        The pipeline package is looked up once per set of compile-time options and the pooled client for each
+        (host, namespace, verify_ssl) is authenticated up front, the runs are then submitted concurrently from a thread pool.
+
+        Args:
+            tasks (List[Task]): The tasks to submit.
+            max_workers (int, optional): The maximum number of concurrent submissions. Defaults to 8.
+
+        Returns:
+            List[TaskRunResult]: One result per task in input order, holding either the run or the error raised while submitting it.
+
+        """
+        from simple_kfp_task.deploykf import get_kfp_client
+
+        # authenticate serially, so a login prompt is never raised from several threads
+        for task in tasks:
+            get_kfp_client(namespace=task.namespace, host=task.kfp_host, verify_ssl=task.verify_ssl)
+
+        def submit(task, pipeline_package):
+            try:
+                kfp_client = get_kfp_client(namespace=task.namespace, host=task.kfp_host, verify_ssl=task.verify_ssl)
+                return TaskRunResult(task, task.run(kfp_client=kfp_client, pipeline_package=pipeline_package), None)
+            except Exception as e:
+                return TaskRunResult(task, None, e)
+
+        pipeline_packages = cls._pipeline_packages(tasks)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(submit, tasks, pipeline_packages))
+
+    async def run_async(self, kfp_client=None, pipeline_package=None):
+        """
+        Run the task without blocking the event loop.
+
+        Args:
+            kfp_client (kfp.Client, optional): An authenticated client to submit with. Defaults to the pooled client for the task's host and namespace.
+            pipeline_package (str, optional): The path to an already compiled `simple_task_pipeline` package. Defaults to the package
+                compiled once per library version and compile-time options.
+
+        Returns:
+            AsyncRun: The KFP run created for the task, use `await run.completion()` to wait for it.
+
+        """
+        from simple_kfp_task.deploykf import get_kfp_client
+
+        loop = asyncio.get_running_loop()
+        if kfp_client is None:
+            kfp_client = await loop.run_in_executor(
+                None, functools.partial(get_kfp_client, namespace=self.namespace, host=self.kfp_host, verify_ssl=self.verify_ssl))
+        run = await loop.run_in_executor(
+            None, functools.partial(self.run, kfp_client=kfp_client, pipeline_package=pipeline_package))
+        return AsyncRun(run, kfp_client)
+
+    @classmethod
+    async def run_many_async(cls, tasks: List["Task"], max_concurrency=RUN_MONITOR_MAX_CONCURRENCY):
+        """
+        Submit several tasks at once without blocking the event loop.
+
+        Like `run_many`, the pipeline package is looked up once per set of compile-time options and the pooled clients are authenticated up front.
+
+        Args:
+            tasks (List[Task]): The tasks to submit.
+            max_concurrency (int, optional): The maximum number of concurrent submissions. Defaults to 8.
+
+        Returns:
+            List[TaskRunResult]: One result per task in input order, holding either an `AsyncRun` or the error raised while submitting it.
+
+        """
+        from simple_kfp_task.deploykf import get_kfp_client
+
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        def authenticate():
+            return [get_kfp_client(namespace=task.namespace, host=task.kfp_host, verify_ssl=task.verify_ssl) for task in tasks]
+
+        async def submit(task, kfp_client, pipeline_package):
+            try:
+                async with semaphore:
+                    return TaskRunResult(task, await task.run_async(kfp_client=kfp_client, pipeline_package=pipeline_package), None)
+            except Exception as e:
+                return TaskRunResult(task, None, e)
+
+        # the pool lock and the authentication block, the clients are resolved off the event loop before submitting
+        kfp_clients = await loop.run_in_executor(None, authenticate)
+
+        pipeline_packages = await loop.run_in_executor(None, cls._pipeline_packages, tasks)
+        return list(await asyncio.gather(*map(submit, tasks, kfp_clients, pipeline_packages)))
+
+    @staticmethod
+    def _pipeline_packages(tasks: List["Task"]):
+        """
+        Get the pipeline package of each task, compiling it at most once per distinct set of compile-time options.
+
+        Args:
+            tasks (List[Task]): The tasks to get the pipeline packages for.
+
+        Returns:
+            List[str]: The path of the pipeline package for each task.
+
+        """
+        from simple_kfp_task.pipeline import get_pipeline_package
+
+        pipeline_packages = {}
+        for task in tasks:
+            key = tuple(sorted(task.pipeline_options().items()))
+            if key not in pipeline_packages:
+                pipeline_packages[key] = get_pipeline_package(**task.pipeline_options())
+        return [pipeline_packages[tuple(sorted(task.pipeline_options().items()))] for task in tasks]
+
+    def pipeline_options(self):
+        """
+        Build the compile-time options of `simple_task_pipeline` for this task.
+
+        Returns:
+            dict: The options passed to `get_pipeline_package`.
+
+        """
+        return {
+            "git_mirror_pvc": self.git_mirror_pvc,
+            "git_mirror_host_path": self.git_mirror_host_path,
+            "env_cache_pvc": self.env_cache_pvc,
+            "env_cache_host_path": self.env_cache_host_path,
+            "env_cache_max_size_mb": self.env_cache_max_size_mb,
+            "env_cache_max_age_days": self.env_cache_max_age_days,
+            "env_image_registry_secret": self.env_image_registry_secret,
+            "checkout_mode": self.checkout_mode,
+            "cache_staleness": None if self.no_cache or self.replicas > 1 else self.cache_staleness,
+            "shape": self.pipeline_shape(),
+            "sweep": self.pipeline_sweep(),
+            "replicas": self.replicas if self.replicas > 1 else None
+        }
+
+    def pipeline_shape(self):
+        """
+        Build the configuration shape the pipeline of this task is specialized for.
+
+        Returns:
+            tuple: Whether the task mounts a volume, requests GPUs and builds its environment image.
+
+        """
+        return (bool(self.volume_name), int(self.gpu_limit or 0) > 0, bool(self.env_image_dockerfile))
+
+    def pipeline_sweep(self):
+        """
+        Build the settings of the sweep pipeline of this task.
+
+        Returns:
+            tuple: The parallelism and the workspace size, storage class and access mode, or None if the task is no sweep.
+
+        """
+        if self.sweep_variants is None:
+            return None
+        return (
+            int(self.sweep_parallelism) if self.sweep_parallelism else None,
+            self.sweep_workspace_size,
+            self.sweep_workspace_storage_class,
+            self.sweep_workspace_access_mode
         )
 
-   
-    
-    
\ No newline at end of file
+    def pipeline_arguments(self):
+        """
+        Build the arguments passed to `simple_task_pipeline` for this task.
+
+        Returns:
+            dict: The pipeline arguments.
+
+        """
+        arguments = {
+            "command": self.command if self.command else "",
+            "args": " ".join(self.args) if self.args else "",
+            "cwd": self.cwd,
+            "remote_url": self.remote_url,
+            "branch": self.branch,
+            "commit": self.commit,
+            "git_diff": self.git_diff if self.git_diff else "",
+            "git_diff_url": self.git_diff_url if self.git_diff_url else "",
+            "git_diff_digest": self.git_diff_digest if self.git_diff_digest else "",
+            "git_bundle_url": self.git_bundle_url if self.git_bundle_url else "",
+            "git_bundle_digest": self.git_bundle_digest if self.git_bundle_digest else "",
+            "requirements_lock": self.requirements_lock if self.requirements_lock else "",
+            "env_image": self.env_image if self.env_image else "",
+            "env_image_dockerfile": self.env_image_dockerfile if self.env_image_dockerfile else "",
+            "env_image_insecure": "true" if self.env_image_insecure else "false",
+            "requirements": self.requirements if self.requirements else "",
+            "packages": " ".join(self.packages) if self.packages else "",
+            "gpu_limit": self.gpu_limit,
+            "gpu_vendor": self.gpu_vendor,
+            "cpu_limit": self.cpu_limit,
+            "cpu_request": self.cpu_request,
+            "memory_limit": self.memory_limit,
+            "memory_request": self.memory_request,
+            "volume_name": self.volume_name if self.volume_name else "",
+            "container_image": self.container_image
+        }
+        if self.sweep_variants is not None:
+            # the arguments of a variant are passed through the shell of the step, quote them
+            arguments["sweep"] = json.dumps([
+                {"index": index, "args": shlex.join(list(self.args or []) + variant)}
+                for index, variant in enumerate(self.sweep_variants)
+            ])
+        return arguments
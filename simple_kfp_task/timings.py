@@ -0,0 +1,95 @@
+import statistics
+from typing import Dict, List
+
+PHASES = ('clone', 'fetch', 'apply', 'install', 'command')
+
+
+def run_phase_timings(run) -> Dict[str, dict]:
+    """
+    Collects the phase timings of a run from its KFP metrics (`<phase>-seconds` and `<phase>-bytes`).
+
+    Timings of several pods of the run (e.g. the ranks of a distributed task) are summed, so they add up to pod time.
+
+    Args:
+        run (kfp_server_api.ApiRun): The run.
+
+    Returns:
+        Dict[str, dict]: The seconds and bytes downloaded of each phase the run recorded.
+    """
+    timings = {}
+    for metric in run.metrics or []:
+        phase, _, unit = (metric.name or '').rpartition('-')
+        if phase not in PHASES or unit not in ('seconds', 'bytes'):
+            continue
+        timing = timings.setdefault(phase, {'seconds': 0.0, 'bytes': 0})
+        timing[unit] += metric.number_value or 0
+    return {phase: timings[phase] for phase in PHASES if phase in timings}
+
+
+def phases_timings(phases: List[dict]) -> Dict[str, dict]:
+    """
+    Collects the phase timings from the phases of a phase-timings artifact or a local run.
+
+    Args:
+        phases (List[dict]): The phases, each with its `phase`, `seconds` and `bytes_downloaded`.
+
+    Returns:
+        Dict[str, dict]: The seconds and bytes downloaded of each phase, like `run_phase_timings`.
+    """
+    timings = {}
+    for phase in phases:
+        if phase['phase'] not in PHASES:
+            continue
+        timing = timings.setdefault(phase['phase'], {'seconds': 0.0, 'bytes': 0})
+        timing['seconds'] += phase['seconds']
+        timing['bytes'] += phase['bytes_downloaded']
+    return {phase: timings[phase] for phase in PHASES if phase in timings}
+
+
+def format_breakdown(timings: Dict[str, dict]) -> str:
+    """
+    Formats the phase timings of a run as a table with the share of each phase.
+
+    Args:
+        timings (Dict[str, dict]): The phase timings, as returned by `run_phase_timings`.
+
+    Returns:
+        str: The table.
+    """
+    total = sum(timing['seconds'] for timing in timings.values())
+    lines = [f"{'phase':<10}{'seconds':>10}{'share':>8}{'MB':>10}"]
+    for phase, timing in timings.items():
+        share = timing['seconds'] / total * 100 if total else 0
+        lines.append(f"{phase:<10}{timing['seconds']:>10.2f}{share:>7.1f}%{timing['bytes'] / 1e6:>10.2f}")
+    lines.append(f"{'total':<10}{total:>10.2f}{100 if total else 0:>7.1f}%"
+                 f"{sum(timing['bytes'] for timing in timings.values()) / 1e6:>10.2f}")
+    return "\n".join(lines)
+
+
+def format_aggregate(runs_timings: List[Dict[str, dict]]) -> str:
+    """
+    Formats the phase timings of many runs as a table with the number of runs, mean, median, 90th percentile and
+    total seconds and the share of the total time of each phase.
+
+    Args:
+        runs_timings (List[Dict[str, dict]]): The phase timings of each run.
+
+    Returns:
+        str: The table.
+    """
+    seconds = {phase: [timings[phase]['seconds'] for timings in runs_timings if phase in timings] for phase in PHASES}
+    downloaded = {phase: [timings[phase]['bytes'] for timings in runs_timings if phase in timings] for phase in PHASES}
+    total = sum(sum(values) for values in seconds.values())
+
+    lines = [f"{'phase':<10}{'runs':>6}{'mean':>10}{'median':>10}{'p90':>10}{'total':>12}{'share':>8}{'mean MB':>10}"]
+    for phase in PHASES:
+        values = sorted(seconds[phase])
+        if not values:
+            continue
+        p90 = values[min(len(values) - 1, int(round(0.9 * (len(values) - 1))))]
+        share = sum(values) / total * 100 if total else 0
+        lines.append(
+            f"{phase:<10}{len(values):>6}{statistics.mean(values):>10.2f}{statistics.median(values):>10.2f}"
+            f"{p90:>10.2f}{sum(values):>12.2f}{share:>7.1f}%{statistics.mean(downloaded[phase]) / 1e6:>10.2f}"
+        )
+    return "\n".join(lines)
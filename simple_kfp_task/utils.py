@@ -1,4 +1,5 @@
 import base64
+import hashlib
 import zlib
 import inspect
 import inspect
@@ -15,15 +16,43 @@ def encode_string_to_base64(input_string: str):
     Returns:
         str: The base64 encoded string.
     """
-    if not input_string.endswith('\n'):
-        input_string += '\n'
-    input_bytes = zlib.compress(
-        input_string.encode('utf-8'), level=9, wbits=16 + 15)
+    input_bytes = compress_string(input_string, level=9)
     base64_bytes = base64.b64encode(input_bytes)
     base64_string = base64_bytes.decode('utf-8')
     return base64_string
 
 
+def compress_string(input_string: str, level: int = 9):
+    """
+    Compresses a string to gzip format, terminating it with a newline.
+
+    Args:
+        input_string (str): The string to be compressed.
+        level (int, optional): The zlib compression level. Defaults to 9.
+
+    Returns:
+        bytes: The gzip compressed string.
+    """
+    if not input_string.endswith('\n'):
+        input_string += '\n'
+    return zlib.compress(input_string.encode('utf-8'), level=level, wbits=16 + 15)
+
+
+def sha256_digest(input_string: str):
+    """
+    Returns the SHA-256 digest of a string, terminating it with a newline like `compress_string`.
+
+    Args:
+        input_string (str): The string to be hashed.
+
+    Returns:
+        str: The hex encoded digest.
+    """
+    if not input_string.endswith('\n'):
+        input_string += '\n'
+    return hashlib.sha256(input_string.encode('utf-8')).hexdigest()
+
+
 def get_caller_filename():
     """
     Returns the filename of the caller function.